@@ -1,5 +1,6 @@
 from flask import Flask
-from .extensions import db, jwt, init_celery, migrate 
+from .extensions import db, jwt, init_celery, migrate, cache, event_bus, compress, password_hasher
+from .utils.json_provider import FastJSONProvider
 from . import models
 from .api import register_blueprints 
 from flask_cors import CORS
@@ -9,6 +10,7 @@ def create_app(config_object='config.Config'):
     
     # 1. Tải cấu hình
     app.config.from_object(config_object)
+    app.json = FastJSONProvider(app) # orjson nếu có, datetime -> ISO 8601
     
     # 2. Khởi tạo Extensions
     db.init_app(app)
@@ -16,11 +18,20 @@ def create_app(config_object='config.Config'):
     
     # Khởi tạo Celery 
     init_celery(app) 
+    from . import tasks # Đăng ký các Celery task
     
     migrate.init_app(app, db)
+    cache.init_app(app)
+    event_bus.init_app(app)
+    compress.init_app(app)
+    password_hasher.init_app(app)
+
+    from .services.module_events import module_event_buffer
+    module_event_buffer.init_app(app)
     
     # KÍCH HOẠT CORS CHO TOÀN BỘ ỨNG DỤNG 
-    CORS(app, resources={r"/*": {"origins": "*"}}) 
+    # expose_headers: cho phép JS ở origin khác đọc tổng số kết quả tìm kiếm khóa học
+    CORS(app, resources={r"/*": {"origins": "*"}}, expose_headers=['X-Total-Count'])
     
     # 3. Đăng ký Blueprints (Routes/API)
     register_blueprints(app)
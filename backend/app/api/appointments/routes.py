@@ -1,17 +1,105 @@
-from flask import request, jsonify
+from flask import request, jsonify, current_app, Response, stream_with_context
 from . import appointment_bp
 from app.services.appointment_service import AppointmentService
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt 
-from app.utils.decorators import role_required 
+from app.services.schedule_service import ScheduleService
+from flask_jwt_extended import jwt_required
+from app.utils.decorators import role_required, current_claims
 import logging
 from app.utils.errors import BusinessError, NotFoundError
 
 # --- ROUTE LẤY DANH SÁCH CHUYÊN VIÊN ---
 @appointment_bp.route('/counselors', methods=['GET'])
 def get_counselors():
-    """Lấy danh sách các chuyên viên tư vấn."""
-    counselors = AppointmentService.get_available_counselors()
-    return jsonify(counselors), 200
+    """Lấy danh sách các chuyên viên tư vấn (có cache, hỗ trợ If-None-Match => 304)."""
+    body, etag = AppointmentService.get_counselor_directory()
+
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.no_cache = True # Client luôn xác thực lại bằng ETag
+    return response.make_conditional(request)
+
+# --- ROUTE LẤY KHUNG GIỜ TRỐNG CỦA CHUYÊN VIÊN ---
+@appointment_bp.route('/counselors/<int:counselor_user_id>/free-slots', methods=['GET'])
+def get_counselor_free_slots(counselor_user_id):
+    """Lấy các khung giờ 1 tiếng còn trống của chuyên viên (?from=&to= dạng ISO 8601)."""
+    try:
+        result = AppointmentService.get_free_slots(
+            counselor_user_id=counselor_user_id,
+            from_str=request.args.get('from'),
+            to_str=request.args.get('to')
+        )
+        return jsonify(result), 200
+
+    except NotFoundError as e:
+        return jsonify({
+            "error_code": e.error_code,
+            "message": e.message
+        }), 404
+
+    except BusinessError as e:
+        return jsonify({
+            "error_code": e.error_code,
+            "message": e.message
+        }), 400
+
+# --- ROUTE KHUNG GIỜ TRỐNG SỚM NHẤT THEO CHUYÊN MÔN ---
+@appointment_bp.route('/counselors/next-available', methods=['GET'])
+def get_next_available_slot():
+    """Tìm khung giờ trống sớm nhất (?specialization= để lọc theo chuyên môn)."""
+    slot = ScheduleService.next_available_slot(request.args.get('specialization'))
+    if not slot:
+        return jsonify({
+            "error_code": "NO_AVAILABLE_SLOT",
+            "message": "Không còn khung giờ trống phù hợp."
+        }), 404
+    return jsonify(slot), 200
+
+# --- ROUTE LỊCH LÀM VIỆC CỦA CHUYÊN VIÊN ---
+@appointment_bp.route('/counselors/<int:counselor_user_id>/schedule', methods=['GET'])
+def get_counselor_schedule(counselor_user_id):
+    """Lấy lịch làm việc hàng tuần và các ngày ngoại lệ của chuyên viên."""
+    try:
+        return jsonify(ScheduleService.get_schedule(counselor_user_id)), 200
+    except NotFoundError as e:
+        return jsonify({
+            "error_code": e.error_code,
+            "message": e.message
+        }), 404
+
+@appointment_bp.route('/counselors/<int:counselor_user_id>/schedule', methods=['PUT'])
+@jwt_required()
+@role_required(['admin', 'counselor'])
+def update_counselor_schedule(counselor_user_id):
+    """Thay thế lịch làm việc (Admin hoặc chính chuyên viên đó)."""
+    data = request.get_json() or {}
+    if not isinstance(data, dict):
+        return jsonify({
+            "error_code": "INVALID_SCHEDULE_FORMAT",
+            "message": "Body phải là object JSON có weekly và exceptions."
+        }), 400
+
+    try:
+        schedule = ScheduleService.update_schedule(
+            counselor_user_id=counselor_user_id,
+            weekly=data.get('weekly', []),
+            exceptions=data.get('exceptions', []),
+            current_user_id=current_claims().user_id,
+            role=current_claims().role
+        )
+        return jsonify({"data": schedule}), 200
+
+    except NotFoundError as e:
+        return jsonify({
+            "error_code": e.error_code,
+            "message": e.message
+        }), 404
+
+    except BusinessError as e:
+        return jsonify({
+            "error_code": e.error_code,
+            "message": e.message
+        }), 400
 
 # Thiết lập logger
 logger = logging.getLogger(__name__)
@@ -20,10 +108,10 @@ logger = logging.getLogger(__name__)
 @appointment_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_my_appointments():
-    current_user_id = int(get_jwt_identity())
-    try:
-        current_user_role = get_jwt()['role']
-    except Exception:
+    claims = current_claims()
+    current_user_id = claims.user_id
+    current_user_role = claims.role
+    if not current_user_role:
         return jsonify({"msg": "Token không hợp lệ hoặc thiếu claim role"}), 401
 
     # Query params
@@ -31,13 +119,27 @@ def get_my_appointments():
     limit = request.args.get('limit', default=10, type=int)
 
     try:
-        result = AppointmentService.get_appointments_by_role(
-            user_id=current_user_id,
-            role=current_user_role,
-            page=page,
-            limit=limit
-        )
+        # Có tham số cursor (kể cả rỗng cho trang đầu) => phân trang keyset
+        if 'cursor' in request.args:
+            result = AppointmentService.get_appointments_by_cursor(
+                user_id=current_user_id,
+                role=current_user_role,
+                cursor=request.args.get('cursor'),
+                limit=limit
+            )
+        else:
+            result = AppointmentService.get_appointments_by_role(
+                user_id=current_user_id,
+                role=current_user_role,
+                page=page,
+                limit=limit
+            )
         return jsonify(result), 200
+    except BusinessError as e:
+        return jsonify({
+            "error_code": e.error_code,
+            "message": e.message
+        }), 400
     except Exception:
         return jsonify({
             "error_code": "INTERNAL_SERVER_ERROR",
@@ -50,7 +152,7 @@ def get_my_appointments():
 @role_required('user')
 def book_appointment():
     data = request.get_json()
-    current_user_id = int(get_jwt_identity())
+    current_user_id = current_claims().user_id
 
     required_fields = ['counselor_user_id', 'start_time', 'reason']
     if not all(field in data for field in required_fields):
@@ -99,8 +201,9 @@ def update_appointment_status(appointment_id):
     if status not in ['pending', 'confirmed', 'canceled', 'completed']:
         return jsonify({"msg": "Trạng thái không hợp lệ"}), 400
 
-    current_user_id = int(get_jwt_identity())
-    current_role = get_jwt().get('role')
+    claims = current_claims()
+    current_user_id = claims.user_id
+    current_role = claims.role
 
     try:
         updated_appointment = AppointmentService.update_status(
@@ -130,3 +233,78 @@ def update_appointment_status(appointment_id):
             "error_code": "INTERNAL_SERVER_ERROR",
             "message": "Lỗi hệ thống."
         }), 500
+
+
+# --- ROUTE CẬP NHẬT TRẠNG THÁI HÀNG LOẠT ---
+@appointment_bp.route('/status/batch', methods=['POST'])
+@jwt_required()
+@role_required(['admin', 'counselor'])
+def update_appointment_status_batch():
+    """Cập nhật trạng thái nhiều lịch hẹn: {"items": [{"appointment_id", "status"}]}."""
+    data = request.get_json() or {}
+
+    try:
+        result = AppointmentService.update_status_batch(
+            items=data.get('items'),
+            current_user_id=current_claims().user_id,
+            role=current_claims().role
+        )
+        return jsonify(result), 200
+
+    except BusinessError as e:
+        return jsonify({
+            "error_code": e.error_code,
+            "message": e.message
+        }), 400
+
+    except Exception:
+        return jsonify({
+            "error_code": "INTERNAL_SERVER_ERROR",
+            "message": "Lỗi hệ thống."
+        }), 500
+
+
+# --- ROUTE XUẤT DỮ LIỆU LỊCH HẸN (STREAM) ---
+@appointment_bp.route('/export', methods=['GET'])
+@jwt_required()
+@role_required(['admin'])
+def export_appointments():
+    """Xuất lịch hẹn: ?format=ndjson|csv|ics&from=&to= (Chỉ Admin)."""
+    try:
+        chunks, mimetype, filename = AppointmentService.export_appointments(
+            fmt=request.args.get('format', 'ndjson'),
+            from_str=request.args.get('from'),
+            to_str=request.args.get('to')
+        )
+    except BusinessError as e:
+        return jsonify({
+            "error_code": e.error_code,
+            "message": e.message
+        }), 400
+
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+# --- ROUTE STREAM SỰ KIỆN LỊCH HẸN (SSE) ---
+@appointment_bp.route('/stream', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string']) # EventSource không gửi được header => ?jwt=
+def stream_appointments():
+    """Đẩy các thay đổi lịch hẹn (tạo mới, đổi trạng thái) theo phạm vi vai trò."""
+    try:
+        events = AppointmentService.stream_appointment_events(
+            user_id=current_claims().user_id,
+            role=current_claims().role,
+            heartbeat_interval=current_app.config.get('SSE_HEARTBEAT_INTERVAL', 15)
+        )
+    except BusinessError as e:
+        return jsonify({
+            "error_code": e.error_code,
+            "message": e.message
+        }), 403
+
+    response = Response(events, mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no' # Tắt buffer của reverse proxy (nginx)
+    return response
@@ -1,8 +1,17 @@
-from flask import request, jsonify
+from flask import request, jsonify, current_app
 from . import auth_bp
 from app.services.user_service import UserService
+from app.services.profile_service import ProfileService
+from app.utils.errors import NotFoundError
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.utils.decorators import role_required
+from app.utils.passwords import HashingBusyError
+
+def _busy_response(error):
+    """503 + Retry-After khi pool băm mật khẩu quá tải."""
+    response = jsonify({"error_code": error.error_code, "msg": error.message})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
 
 @auth_bp.route('/register', methods=['POST'])
 def register():
@@ -25,6 +34,8 @@ def register():
         }), 201
     except ValueError as e:
         return jsonify({"msg": str(e)}), 409 # Conflict
+    except HashingBusyError as e:
+        return _busy_response(e)
     except Exception as e:
         return jsonify({"msg": "Lỗi hệ thống", "error": str(e)}), 500
 
@@ -44,18 +55,25 @@ def login():
         return jsonify(auth_data), 200
     except ValueError as e:
         return jsonify({"msg": str(e)}), 401 # Unauthorized
+    except HashingBusyError as e:
+        return _busy_response(e)
 
 @auth_bp.route('/profile', methods=['GET'])
 @jwt_required() # Yêu cầu JWT hợp lệ để truy cập
 def get_profile():
-    """Endpoint Lấy thông tin hồ sơ (Cần JWT)."""
-    current_user_id = get_jwt_identity()
-    # Logic lấy thông tin người dùng từ DB dựa trên current_user_id
-    
-    return jsonify({
-        "msg": "Truy cập thành công",
-        "user_id": current_user_id
-    }), 200
+    """Endpoint Lấy hồ sơ tổng hợp (người dùng, hồ sơ chuyên viên, khóa học, lịch hẹn sắp tới); hỗ trợ If-None-Match => 304."""
+    current_user_id = int(get_jwt_identity())
+
+    try:
+        body, etag = ProfileService.get_profile(current_user_id)
+    except NotFoundError as e:
+        return jsonify({"error_code": e.error_code, "msg": e.message}), 404
+
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.private = True # Dữ liệu riêng của từng người dùng
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 @auth_bp.route('/counselor-profile', methods=['POST'])
 @jwt_required()
@@ -1,6 +1,11 @@
-from flask import request, jsonify
+from flask import request, jsonify, current_app
 from . import course_bp
 from app.services.course_service import CourseService
+from app.services.course_catalog import course_catalog
+from app.services.course_import import import_courses
+from app.services.course_analytics import CourseAnalyticsService
+from app.services.course_recommendations import CourseRecommendationService
+from app.utils.errors import NotFoundError
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.extensions import db
 from app.utils.decorators import role_required
@@ -15,11 +20,27 @@ def get_courses():
     search_term = request.args.get('search')
 
     try:
-        courses = CourseService.get_all_courses(
-            target_audience=target,
-            search_term=search_term
-        )
-        return jsonify(courses), 200
+        if search_term:
+            # Tìm kiếm: xếp theo mức độ liên quan, phân trang (?page=&limit=), tổng số ở header
+            page = max(request.args.get('page', default=1, type=int), 1)
+            limit = min(max(request.args.get('limit', default=20, type=int), 1), 100)
+            courses, total = CourseService.search_courses(
+                search_term,
+                target_audience=target,
+                page=page,
+                limit=limit
+            )
+            response = jsonify(courses)
+            response.headers['X-Total-Count'] = str(total)
+            return response, 200
+
+        # Danh mục render sẵn trong bộ nhớ; If-None-Match khớp => 304, không chạm DB
+        body, etag = course_catalog.get(target)
+        response = current_app.response_class(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
     except Exception as e:
         print(f"LỖI TẢI KHÓA HỌC: {e}")
         return jsonify({"msg": "Lỗi hệ thống khi tải khóa học"}), 500
@@ -45,6 +66,68 @@ def create_course():
     except Exception as e:
         return jsonify({"msg": "Lỗi tạo khóa học", "error": str(e)}), 500
     
+@course_bp.route('/import', methods=['POST'])
+@jwt_required()
+@role_required(['admin'])
+def import_courses_route():
+    """Nhập khóa học hàng loạt từ body NDJSON (mỗi dòng một khóa học); ?batch_size= tùy chọn."""
+    batch_size = request.args.get('batch_size', type=int)
+    if batch_size is not None and batch_size < 1:
+        return jsonify({"msg": "batch_size không hợp lệ"}), 400
+
+    try:
+        # Đọc body theo từng dòng, không nạp toàn bộ vào bộ nhớ
+        report = import_courses(request.stream, batch_size=batch_size)
+        return jsonify(report), 200
+    except Exception as e:
+        db.session.rollback()
+        print(f"LỖI NHẬP KHÓA HỌC: {e}")
+        return jsonify({"msg": "Lỗi hệ thống khi nhập khóa học"}), 500
+
+@course_bp.route('/analytics', methods=['GET'])
+@jwt_required()
+@role_required(['admin'])
+def get_all_course_analytics():
+    """Phễu học (đăng ký -> tới module k -> hoàn thành) của tất cả khóa học."""
+    try:
+        return jsonify(CourseAnalyticsService.get_all_funnels()), 200
+    except Exception as e:
+        print(f"LỖI THỐNG KÊ KHÓA HỌC: {e}")
+        return jsonify({"message": "Lỗi server nội bộ khi tải thống kê"}), 500
+
+@course_bp.route('/<int:course_id>/analytics', methods=['GET'])
+@jwt_required()
+@role_required(['admin'])
+def get_course_analytics(course_id):
+    """Phễu học của một khóa học (đọc từ bảng tổng hợp)."""
+    try:
+        return jsonify(CourseAnalyticsService.get_course_funnel(course_id)), 200
+    except NotFoundError as e:
+        return jsonify({"error_code": e.error_code, "message": e.message}), 404
+    except Exception as e:
+        print(f"LỖI THỐNG KÊ KHÓA HỌC: {e}")
+        return jsonify({"message": "Lỗi server nội bộ khi tải thống kê"}), 500
+
+@course_bp.route('/<int:course_id>/recommendations', methods=['GET'])
+@jwt_required(optional=True)
+def get_course_recommendations(course_id):
+    """Gợi ý "học viên hoàn thành khóa này cũng học..." (bỏ các khóa người dùng đã đăng ký)."""
+    user_id = get_jwt_identity()
+    limit = min(max(request.args.get('limit', default=5, type=int), 1), 20)
+
+    try:
+        courses = CourseRecommendationService.get_recommendations(
+            course_id,
+            user_id=int(user_id) if user_id else None,
+            limit=limit
+        )
+        return jsonify(courses), 200
+    except NotFoundError as e:
+        return jsonify({"error_code": e.error_code, "message": e.message}), 404
+    except Exception as e:
+        print(f"LỖI GỢI Ý KHÓA HỌC: {e}")
+        return jsonify({"message": "Lỗi server nội bộ khi tải gợi ý"}), 500
+
 @course_bp.route('/register', methods=['POST'])
 @jwt_required() 
 def register_for_course():
@@ -79,9 +162,11 @@ def register_for_course():
 def get_my_course_progress():
     """Endpoint Lấy tiến trình tất cả các khóa học đã đăng ký của User."""
     user_id = int(get_jwt_identity())
+    # ?detailed=true: thêm tổng số module, vị trí module hiện tại và phần trăm hoàn thành
+    detailed = request.args.get('detailed', '').lower() in ('1', 'true', 'yes')
 
     try:
-        progress_list = CourseService.get_user_course_progress(user_id)
+        progress_list = CourseService.get_user_course_progress(user_id, detailed=detailed)
         
         return jsonify({
             "message": "Lấy tiến trình khóa học thành công",
@@ -118,14 +203,45 @@ def complete_module_route(course_id):
 @course_bp.route('/<int:course_id>', methods=['GET'])
 @jwt_required(optional=True)  
 def get_course_detail(course_id):
+    """Chi tiết khóa học: mặc định chỉ dàn ý module; ?include_content=true để kèm toàn bộ nội dung."""
     user_id = get_jwt_identity()
+    include_content = request.args.get('include_content', 'false').lower() == 'true'
 
     try:
-        detail = CourseService.get_course_details_with_user(course_id, user_id)
+        detail = CourseService.get_course_details_with_user(course_id, user_id, include_content=include_content)
         return jsonify(detail), 200
 
     except ValueError as e:
         return jsonify({"message": str(e)}), 404
     except Exception as e:
         print("ERROR GET COURSE DETAIL:", e)
-        return jsonify({"message": "Internal server error"}), 500
\ No newline at end of file
+        return jsonify({"message": "Internal server error"}), 500
+
+@course_bp.route('/<int:course_id>/modules/<int:module_id>', methods=['GET'])
+def get_module_content(course_id, module_id):
+    """Nội dung một module; ETag mạnh (If-None-Match => 304) và bản nén gzip/brotli tính sẵn."""
+    try:
+        body, etag, variants = CourseService.get_module_content(course_id, module_id)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 404
+    except Exception as e:
+        print("ERROR GET MODULE CONTENT:", e)
+        return jsonify({"message": "Internal server error"}), 500
+
+    # Chọn bản nén client chấp nhận với quality cao nhất (ưu tiên br khi bằng nhau)
+    encoding = None
+    best_quality = 0
+    for candidate in ('br', 'gzip'):
+        quality = request.accept_encodings[candidate]
+        if candidate in variants and quality > best_quality:
+            encoding, best_quality = candidate, quality
+
+    response = current_app.response_class(variants[encoding] if encoding else body, mimetype='application/json')
+    if encoding:
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    # ETag mạnh phải khác nhau giữa các bản mã hóa
+    response.set_etag(f"{etag}.{encoding}" if encoding else etag)
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
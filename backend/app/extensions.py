@@ -2,12 +2,33 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 from celery import Celery
 from flask_migrate import Migrate
+from .utils.cache import Cache
+from .utils.event_bus import EventBus
+from .utils.compression import Compress
+from .utils.passwords import PasswordHasher
+
+# Đối tượng lược đồ tạo bằng DDL riêng theo dialect, autogenerate/compare_metadata không so sánh được:
+# bảng FTS5 của SQLite (và các bảng phụ của nó), chỉ mục chỉ có trên PostgreSQL (ddl_if)
+SQLITE_FTS_TABLE_PREFIX = 'courses_fts'
+POSTGRESQL_ONLY_INDEXES = {'ix_courses_search_tsv', 'ix_courses_search_trgm'}
+
+def include_schema_object(obj, name, type_, reflected, compare_to):
+    if type_ == 'table' and reflected and name.startswith(SQLITE_FTS_TABLE_PREFIX):
+        return False
+    # Chỉ bỏ qua khi CSDL không có chỉ mục (SQLite); trên PostgreSQL vẫn so sánh bình thường
+    if type_ == 'index' and name in POSTGRESQL_ONLY_INDEXES and compare_to is None:
+        return False
+    return True
 
 # Khởi tạo các đối tượng Extensions
 db = SQLAlchemy()
 jwt = JWTManager()
 celery = Celery() # Khởi tạo đối tượng Celery cơ bản
-migrate = Migrate()
+migrate = Migrate(include_object=include_schema_object) # Lọc đối tượng riêng theo dialect khi autogenerate
+cache = Cache() # Cache dùng chung (memory/redis)
+event_bus = EventBus() # Pub/sub sự kiện (memory/redis)
+compress = Compress() # Nén gzip/brotli response
+password_hasher = PasswordHasher() # Băm mật khẩu trên pool có giới hạn
 
 # Hàm cấu hình Celery để đảm bảo nó chạy trong bối cảnh Flask
 def init_celery(app):
@@ -19,7 +40,26 @@ def init_celery(app):
         task_serializer='json',
         accept_content=['json'],
         timezone='Asia/Ho_Chi_Minh', # Đặt múi giờ cho Celery
-        enable_utc=False
+        enable_utc=False,
+        # Chạy task đồng bộ (kiểm thử, không cần RabbitMQ)
+        task_always_eager=app.config.get('CELERY_TASK_ALWAYS_EAGER', False),
+        task_eager_propagates=app.config.get('CELERY_TASK_ALWAYS_EAGER', False),
+        # Quét outbox định kỳ phòng khi việc đẩy task sau commit bị lỗi
+        beat_schedule={
+            'dispatch-appointment-outbox': {
+                'task': 'appointments.dispatch_outbox',
+                'schedule': app.config.get('OUTBOX_DISPATCH_INTERVAL', 30.0),
+            },
+            # Tính lại bảng phễu khóa học cho trang thống kê của admin
+            'refresh-course-analytics': {
+                'task': 'courses.refresh_analytics',
+                'schedule': app.config.get('COURSE_ANALYTICS_REFRESH_INTERVAL', 600.0),
+            },
+            'refresh-course-recommendations': {
+                'task': 'courses.refresh_recommendations',
+                'schedule': app.config.get('COURSE_RECOMMENDATION_REFRESH_INTERVAL', 3600.0),
+            },
+        }
     )
     
     # Tạo class ContextTask để Celery có thể truy cập config và extensions của Flask
@@ -1,8 +1,13 @@
 from .role import Role
 from .user import User
 from .counselor import CounselorProfile
+from .schedule import CounselorSchedule, CounselorScheduleException
 from .appointment import Appointment
+from .outbox import AppointmentOutbox
 from .course import Course
 from .course_module import CourseModule
 from .course_progress import UserCourseProgress
+from .module_event import ModuleCompletionEvent
+from .course_analytics import CourseFunnelSummary, CourseFunnelStep
+from .course_recommendation import CourseRecommendation
 # Các models khác sẽ được thêm vào đây sau
\ No newline at end of file
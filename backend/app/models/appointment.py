@@ -1,5 +1,10 @@
 from ..extensions import db
 from datetime import datetime
+from sqlalchemy import DDL, event, text
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
+
+# Tên ràng buộc chống trùng lịch đã xác nhận (PostgreSQL)
+OVERLAP_CONSTRAINT_NAME = 'ex_appointments_confirmed_no_overlap'
 
 class Appointment(db.Model):
     __tablename__ = 'appointments'
@@ -23,6 +28,35 @@ class Appointment(db.Model):
     
     # Mối quan hệ N-1 với User
     user = db.relationship('User', backref=db.backref('booked_appointments', lazy='dynamic'))
+
+    __table_args__ = (
+        # Kiểm tra trùng lịch / danh sách lịch của chuyên viên
+        db.Index('ix_appointments_counselor_status_time', 'counselor_id', 'status', 'start_time', 'end_time'),
+        # Danh sách lịch của người dùng
+        db.Index('ix_appointments_user_start', 'user_id', 'start_time'),
+        # Sắp xếp / phân trang keyset theo (start_time, id)
+        db.Index('ix_appointments_start_id', 'start_time', 'id'),
+        # PostgreSQL: không cho 2 lịch 'confirmed' của cùng chuyên viên chồng giờ nhau.
+        # Kiểm tra khi commit (DEFERRED) để một lô vừa hủy A vừa xác nhận B trùng giờ không phụ thuộc thứ tự UPDATE.
+        # Tạo trên CSDL đã có bằng migration 0002 (autogenerate không nhận ra ràng buộc EXCLUDE).
+        ExcludeConstraint(
+            ('counselor_id', '='),
+            (text('tsrange(start_time, end_time)'), '&&'),
+            name=OVERLAP_CONSTRAINT_NAME,
+            using='gist',
+            where=text("status = 'confirmed'"),
+            deferrable=True,
+            initially='DEFERRED'
+        ).ddl_if(dialect='postgresql'),
+    )
     
     def __repr__(self):
-        return f'<Appointment ID:{self.id} Status:{self.status}>'
\ No newline at end of file
+        return f'<Appointment ID:{self.id} Status:{self.status}>'
+
+
+# ExcludeConstraint với '=' trên cột integer cần extension btree_gist
+event.listen(
+    Appointment.__table__,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS btree_gist').execute_if(dialect='postgresql')
+)
@@ -12,7 +12,7 @@ class CounselorProfile(db.Model):
     specialization = db.Column(db.String(128)) # Chuyên môn 
     bio = db.Column(db.Text) # Giới thiệu ngắn
 
-    # Lịch làm việc (Chúng ta sẽ dùng một bảng Schedule riêng sau, đây là thông tin chung)
+    # Lịch làm việc: xem CounselorSchedule / CounselorScheduleException (app/models/schedule.py)
     
     # Mối quan hệ N-1 với Appointment
     appointments = db.relationship('Appointment', backref='counselor_assigned', lazy='dynamic')
@@ -1,5 +1,7 @@
 from ..extensions import db
+from ..utils.text import fold_diacritics
 from datetime import datetime
+from sqlalchemy import DDL, event, func, literal_column
 
 class Course(db.Model):
     __tablename__ = 'courses'
@@ -12,9 +14,30 @@ class Course(db.Model):
     
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Tiêu đề + mô tả đã bỏ dấu, dùng cho tìm kiếm toàn văn
+    search_text = db.Column(db.Text)
     
     # Mối quan hệ 1-N với CourseModule 
     modules = db.relationship('CourseModule', backref='course', lazy='dynamic')
+
+    __table_args__ = (
+        # PostgreSQL: full-text (tsvector) và trigram trên văn bản đã bỏ dấu
+        db.Index(
+            'ix_courses_search_tsv',
+            func.to_tsvector(literal_column("'simple'"), func.coalesce(search_text, '')),
+            postgresql_using='gin'
+        ).ddl_if(dialect='postgresql'),
+        db.Index(
+            'ix_courses_search_trgm',
+            search_text,
+            postgresql_using='gin',
+            postgresql_ops={'search_text': 'gin_trgm_ops'}
+        ).ddl_if(dialect='postgresql'),
+    )
+
+    def update_search_text(self):
+        self.search_text = fold_diacritics(f"{self.title or ''} {self.description or ''}")
     
     def to_dict(self):
         return {
@@ -25,4 +48,18 @@ class Course(db.Model):
         }
         
     def __repr__(self):
-        return f'<Course {self.title} ({self.target_audience})>'
\ No newline at end of file
+        return f'<Course {self.title} ({self.target_audience})>'
+
+
+# PostgreSQL: index trigram cần extension pg_trgm (CSDL đã có bảng: migration 0003)
+event.listen(
+    Course.__table__,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql')
+)
+# SQLite: bảng FTS5 song song (rowid = courses.id)
+event.listen(
+    Course.__table__,
+    'after_create',
+    DDL("CREATE VIRTUAL TABLE IF NOT EXISTS courses_fts USING fts5(search_text)").execute_if(dialect='sqlite')
+)
@@ -0,0 +1,38 @@
+from ..extensions import db
+from datetime import datetime
+
+class CourseFunnelSummary(db.Model):
+    """Tổng hợp phễu học của một khóa học (tính lại định kỳ từ user_course_progress)."""
+    __tablename__ = 'course_funnel_summaries'
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), primary_key=True)
+
+    enrolled = db.Column(db.Integer, default=0, nullable=False)
+    completed = db.Column(db.Integer, default=0, nullable=False)
+    refreshed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def to_dict(self):
+        return {
+            'course_id': self.course_id,
+            'enrolled': self.enrolled,
+            'completed': self.completed,
+            'refreshed_at': self.refreshed_at
+        }
+
+
+class CourseFunnelStep(db.Model):
+    """Một bước của phễu: số học viên đã tới module (reached) và đang dừng ở module đó (current)."""
+    __tablename__ = 'course_funnel_steps'
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), primary_key=True)
+    module_position = db.Column(db.Integer, primary_key=True) # 1-based
+
+    module_id = db.Column(db.Integer, db.ForeignKey('course_modules.id'), nullable=False)
+    reached = db.Column(db.Integer, default=0, nullable=False)
+    current = db.Column(db.Integer, default=0, nullable=False)
+
+    def to_dict(self):
+        return {
+            'module_id': self.module_id,
+            'module_position': self.module_position,
+            'reached': self.reached,
+            'current': self.current
+        }
@@ -1,5 +1,14 @@
+import gzip
+import hashlib
+import json
+
 from ..extensions import db
 
+try:
+    import brotli
+except ImportError: # brotli là tùy chọn; thiếu thì chỉ phục vụ gzip/identity
+    brotli = None
+
 class CourseModule(db.Model):
     __tablename__ = 'course_modules'
     id = db.Column(db.Integer, primary_key=True)
@@ -8,8 +17,14 @@ class CourseModule(db.Model):
     content = db.Column(db.Text) # Nội dung bài học (HTML/Markdown)
     module_order = db.Column(db.Integer, default=1) # Thứ tự bài học
 
-    # Mối quan hệ N-1 với Course 
-    
+    # Body JSON của nội dung module, tính sẵn khi ghi (xem update_content_variants).
+    # Các bản nén để deferred: chỉ nạp khi thực sự phục vụ nội dung.
+    content_etag = db.Column(db.String(64))
+    content_gzip = db.deferred(db.Column(db.LargeBinary))
+    content_br = db.deferred(db.Column(db.LargeBinary))
+
+    # Mối quan hệ N-1 với Course
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -19,5 +34,25 @@ class CourseModule(db.Model):
             'module_order': self.module_order
         }
 
+    def to_outline_dict(self):
+        """Như to_dict nhưng không kèm nội dung (dùng cho danh sách module)."""
+        return {
+            'id': self.id,
+            'course_id': self.course_id,
+            'title': self.title,
+            'module_order': self.module_order
+        }
+
+    def render_content(self):
+        """Body JSON (bytes) trả về ở GET /api/courses/<id>/modules/<module_id>."""
+        return json.dumps(self.to_dict(), ensure_ascii=False, sort_keys=True).encode('utf-8')
+
+    def update_content_variants(self):
+        """Tính lại ETag và các bản nén gzip/brotli; gọi sau mỗi lần ghi module (khi đã có id)."""
+        body = self.render_content()
+        self.content_etag = hashlib.sha256(body).hexdigest()
+        self.content_gzip = gzip.compress(body, compresslevel=9, mtime=0)
+        self.content_br = brotli.compress(body, quality=11) if brotli else None
+
     def __repr__(self):
-        return f'<Module {self.title} in Course {self.course_id}>'
\ No newline at end of file
+        return f'<Module {self.title} in Course {self.course_id}>'
@@ -25,5 +25,5 @@ class UserCourseProgress(db.Model):
             'course_id': self.course_id,
             'last_module_id': self.last_module_id, 
             'is_completed': self.is_completed,
-            'completion_date': self.completion_date.isoformat() if self.completion_date else None
+            'completion_date': self.completion_date
         }
\ No newline at end of file
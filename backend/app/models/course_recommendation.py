@@ -0,0 +1,11 @@
+from ..extensions import db
+
+class CourseRecommendation(db.Model):
+    """Top-k khóa học liên quan (đồng hoàn thành/đăng ký) của mỗi khóa học, tính sẵn định kỳ."""
+    __tablename__ = 'course_recommendations'
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True) # 1 = liên quan nhất
+
+    recommended_course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    learners = db.Column(db.Integer, nullable=False) # Số học viên hoàn thành course_id và đã học khóa được gợi ý
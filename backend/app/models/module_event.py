@@ -0,0 +1,36 @@
+from ..extensions import db
+from datetime import datetime
+
+class ModuleCompletionEvent(db.Model):
+    """Nhật ký (chỉ ghi thêm) mỗi lần người dùng hoàn thành một module."""
+    __tablename__ = 'module_completion_events'
+    id = db.Column(db.Integer, primary_key=True)
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
+    module_id = db.Column(db.Integer, db.ForeignKey('course_modules.id'), nullable=False)
+    module_position = db.Column(db.Integer, nullable=False) # Vị trí module trong khóa học (1-based)
+    completed_course = db.Column(db.Boolean, default=False, nullable=False) # Module cuối cùng
+
+    completed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # Thời gian học từng module = hiệu completed_at liên tiếp của cùng user/khóa học
+        db.Index('ix_module_events_user_course', 'user_id', 'course_id', 'completed_at'),
+        # Điểm rời bỏ theo module
+        db.Index('ix_module_events_course_module', 'course_id', 'module_id'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'course_id': self.course_id,
+            'module_id': self.module_id,
+            'module_position': self.module_position,
+            'completed_course': self.completed_course,
+            'completed_at': self.completed_at
+        }
+
+    def __repr__(self):
+        return f'<ModuleCompletionEvent User:{self.user_id} Module:{self.module_id}>'
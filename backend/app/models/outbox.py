@@ -0,0 +1,23 @@
+from ..extensions import db
+from datetime import datetime
+
+class AppointmentOutbox(db.Model):
+    """Sự kiện lịch hẹn chờ gửi thông báo (ghi cùng transaction với thay đổi lịch hẹn)."""
+    __tablename__ = 'appointment_outbox'
+    id = db.Column(db.Integer, primary_key=True)
+
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointments.id'), nullable=False)
+    event_type = db.Column(db.String(32), nullable=False) # created, status_changed
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    processed_at = db.Column(db.DateTime, nullable=True)
+
+    # Mối quan hệ N-1 với Appointment (cho phép ghi outbox trước khi lịch hẹn có id)
+    appointment = db.relationship('Appointment')
+
+    # Dispatcher luôn đọc các sự kiện chưa xử lý theo thứ tự id
+    __table_args__ = (db.Index('ix_appointment_outbox_pending', 'processed_at', 'id'),)
+
+    def __repr__(self):
+        return f'<AppointmentOutbox {self.event_type} Appointment:{self.appointment_id}>'
@@ -0,0 +1,48 @@
+from ..extensions import db
+
+class CounselorSchedule(db.Model):
+    """Giờ làm việc hàng tuần của chuyên viên (giờ địa phương)."""
+    __tablename__ = 'counselor_schedules'
+    id = db.Column(db.Integer, primary_key=True)
+
+    # Khóa ngoại: Hồ sơ chuyên viên
+    counselor_id = db.Column(db.Integer, db.ForeignKey('counselor_profiles.id'), nullable=False, index=True)
+
+    weekday = db.Column(db.Integer, nullable=False) # 0 = Thứ Hai ... 6 = Chủ Nhật
+    start_hour = db.Column(db.Integer, nullable=False) # Giờ bắt đầu (0-23)
+    end_hour = db.Column(db.Integer, nullable=False) # Giờ kết thúc (1-24, không bao gồm)
+
+    def to_dict(self):
+        return {
+            'weekday': self.weekday,
+            'start_hour': self.start_hour,
+            'end_hour': self.end_hour
+        }
+
+    def __repr__(self):
+        return f'<CounselorSchedule {self.counselor_id} weekday={self.weekday} {self.start_hour}-{self.end_hour}>'
+
+
+class CounselorScheduleException(db.Model):
+    """Ngoại lệ theo ngày: nghỉ (cả ngày hoặc vài giờ) hoặc làm thêm giờ."""
+    __tablename__ = 'counselor_schedule_exceptions'
+    id = db.Column(db.Integer, primary_key=True)
+
+    counselor_id = db.Column(db.Integer, db.ForeignKey('counselor_profiles.id'), nullable=False, index=True)
+
+    date = db.Column(db.Date, nullable=False)
+    # Để trống start_hour/end_hour nghĩa là áp dụng cho cả ngày
+    start_hour = db.Column(db.Integer, nullable=True)
+    end_hour = db.Column(db.Integer, nullable=True)
+    is_available = db.Column(db.Boolean, nullable=False, default=False)
+
+    def to_dict(self):
+        return {
+            'date': self.date,
+            'start_hour': self.start_hour,
+            'end_hour': self.end_hour,
+            'is_available': self.is_available
+        }
+
+    def __repr__(self):
+        return f'<CounselorScheduleException {self.counselor_id} {self.date} available={self.is_available}>'
@@ -1,5 +1,4 @@
-from ..extensions import db
-from werkzeug.security import generate_password_hash, check_password_hash 
+from ..extensions import db, password_hasher
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -15,12 +14,15 @@ class User(db.Model):
     # Mối quan hệ 1-1 với CounselorProfile
     profile = db.relationship('CounselorProfile', backref='counselor', uselist=False)
 
-    # Phương thức bảo mật
+    # Phương thức bảo mật (băm qua pool có giới hạn, có thể raise HashingBusyError)
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self.password_hash)
 
     def __repr__(self):
         return f'<User {self.email}>'
\ No newline at end of file
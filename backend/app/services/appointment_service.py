@@ -1,93 +1,179 @@
-from app.extensions import db
+from flask import current_app
+from app.extensions import db, cache, event_bus
 from app.models.counselor import CounselorProfile
-from app.models.appointment import Appointment
+from app.models.appointment import Appointment, OVERLAP_CONSTRAINT_NAME
 from app.models.user import User
-from app.models.role import Role
+from sqlalchemy import and_, or_, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
+from bisect import bisect_left
 from datetime import datetime, timedelta, timezone
+import base64
+import csv
+import io
+import hashlib
+import json
 from app.utils.errors import BusinessError, NotFoundError
+from app.services.role_registry import role_registry
+from app.services.slot_index import SLOT_DURATION, slot_index, to_naive_utc
+from app.services.schedule_grid import schedule_grid
+from app.services.notification_service import NotificationService
+from app.services.profile_service import ProfileService
+from app.tasks.notifications import schedule_outbox_dispatch
+
+# Giới hạn khoảng thời gian khi tra cứu khung giờ trống
+MAX_FREE_SLOT_RANGE = timedelta(days=31)
+
+# Kênh pub/sub cho sự kiện lịch hẹn (SSE)
+APPOINTMENT_EVENTS_CHANNEL = 'appointments'
+
+# Số dòng đọc mỗi lô khi xuất dữ liệu
+EXPORT_BATCH_SIZE = 500
+
+# Khóa cache danh bạ chuyên viên
+COUNSELOR_DIRECTORY_CACHE_KEY = 'counselors:directory'
+
+# Số lịch hẹn tối đa mỗi trang khi phân trang keyset
+MAX_CURSOR_PAGE_SIZE = 100
+
+# Số lịch hẹn tối đa trong một lần cập nhật hàng loạt
+MAX_STATUS_BATCH_SIZE = 200
 
 class AppointmentService:
-   
+
+   # Luồng chuyển trạng thái hợp lệ theo vai trò
+   ALLOWED_TRANSITIONS = {
+      'pending': {
+         'counselor': ['confirmed', 'canceled'],
+         'admin': ['confirmed', 'canceled']
+      },
+      'confirmed': {
+         'admin': ['completed', 'canceled']
+      }
+   }
+
    # '''Dịch vụ quản lý lịch hẹn tư vấn.'''
    @staticmethod
-   def _map_appointment_to_dict(appointment, current_user_id, role):
-        user = User.query.get(appointment.user_id)
-        counselor_profile = CounselorProfile.query.get(appointment.counselor_id)
+   def _to_utc_iso(value):
+        # 🔑 BẮT BUỘC: trả UTC có offset
+        return value.astimezone(timezone.utc).isoformat() if value else None
 
-        counselor = None
-        if counselor_profile:
-            counselor = User.query.get(counselor_profile.user_id)
+   @staticmethod
+   def _parse_utc_datetime(value):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except (ValueError, AttributeError):
+            raise BusinessError("INVALID_DATETIME_FORMAT", "Định dạng thời gian không hợp lệ.")
 
-        counselor_name = counselor.name if counselor and counselor.name else "Chuyên viên bị xóa"
-        user_name = user.name if user and user.name else "Người dùng bị xóa"
+        if parsed.tzinfo is None:
+            return parsed.replace(tzinfo=timezone.utc)
+        return parsed.astimezone(timezone.utc)
 
-        # 🔑 BẮT BUỘC: trả UTC có offset
-        start_time_iso = (
-            appointment.start_time.astimezone(timezone.utc).isoformat()
-            if appointment.start_time else None
-        )
-        end_time_iso = (
-            appointment.end_time.astimezone(timezone.utc).isoformat()
-            if appointment.end_time else None
+   # ''' Query projection: lịch hẹn + tên người đặt + tên chuyên viên (1 query duy nhất) '''
+   @staticmethod
+   def _appointment_rows_query():
+        patient = aliased(User)
+        counselor = aliased(User)
+
+        return (
+            db.session.query(
+                Appointment.id,
+                Appointment.user_id,
+                Appointment.counselor_id,
+                Appointment.start_time,
+                Appointment.end_time,
+                Appointment.reason,
+                Appointment.status,
+                Appointment.created_at,
+                patient.name.label('user_name'),
+                counselor.id.label('counselor_user_id'),
+                counselor.name.label('counselor_name'),
+            )
+            .outerjoin(patient, patient.id == Appointment.user_id)
+            .outerjoin(CounselorProfile, CounselorProfile.id == Appointment.counselor_id)
+            .outerjoin(counselor, counselor.id == CounselorProfile.user_id)
         )
-        created_at_iso = (
-            appointment.created_at.astimezone(timezone.utc).isoformat()
-            if appointment.created_at else None
+
+   # ''' Lấy id hồ sơ chuyên viên của người gọi (chỉ 1 lần mỗi request) '''
+   @staticmethod
+   def _get_viewer_profile_id(current_user_id, role):
+        if role != 'counselor':
+            return None
+
+        return (
+            db.session.query(CounselorProfile.id)
+            .filter_by(user_id=current_user_id)
+            .scalar()
         )
 
+   @staticmethod
+   def _map_appointment_to_dict(row, role, viewer_profile_id=None):
+        counselor_name = row.counselor_name or "Chuyên viên bị xóa"
+        user_name = row.user_name or "Người dùng bị xóa"
+
         permissions = AppointmentService._get_permissions(
-            appointment=appointment,
-            current_user_id=current_user_id,
-            role=role
+            status=row.status,
+            counselor_id=row.counselor_id,
+            role=role,
+            viewer_profile_id=viewer_profile_id
         )
 
         return {
-            "appointment_id": appointment.id,
-            "user_id": appointment.user_id,
-            "counselor_user_id": counselor.id if counselor else None,
-            "start_time": start_time_iso,
-            "end_time": end_time_iso,
-            "reason": appointment.reason,
-            "status": appointment.status,
-            "created_at": created_at_iso,
+            "appointment_id": row.id,
+            "user_id": row.user_id,
+            "counselor_user_id": row.counselor_user_id,
+            "start_time": AppointmentService._to_utc_iso(row.start_time),
+            "end_time": AppointmentService._to_utc_iso(row.end_time),
+            "reason": row.reason,
+            "status": row.status,
+            "created_at": AppointmentService._to_utc_iso(row.created_at),
             "user_name": user_name,
             "counselor_name": counselor_name,
             "permissions": permissions
         }
       
    
-   # '''' Lấy danh sách lịch hẹn theo vai trò người dùng '''
+   # ''' Điều kiện lọc lịch hẹn theo vai trò: (filters, viewer_profile_id) hoặc None nếu không có quyền xem '''
    @staticmethod
-   def get_appointments_by_role(user_id, role, page=1, limit=10):
+   def _resolve_listing_scope(user_id, role):
         if not role or not user_id:
-            return {"data": [], "pagination": {"page": page, "limit": limit, "total": 0, "total_pages": 0}}
+            return None
 
         if role == "admin":
-            query = Appointment.query
-        elif role == "counselor":
-            counselor_profile = CounselorProfile.query.filter_by(user_id=user_id).first()
-            if not counselor_profile:
-                return {"data": [], "pagination": {"page": page, "limit": limit, "total": 0, "total_pages": 0}}
-            query = Appointment.query.filter_by(counselor_id=counselor_profile.id)
-        elif role == "user":
-            query = Appointment.query.filter_by(user_id=user_id)
-        else:
+            return [], None
+        if role == "counselor":
+            viewer_profile_id = AppointmentService._get_viewer_profile_id(user_id, role)
+            if not viewer_profile_id:
+                return None
+            return [Appointment.counselor_id == viewer_profile_id], viewer_profile_id
+        if role == "user":
+            return [Appointment.user_id == user_id], None
+        return None
+
+
+   # '''' Lấy danh sách lịch hẹn theo vai trò người dùng '''
+   @staticmethod
+   def get_appointments_by_role(user_id, role, page=1, limit=10):
+        scope = AppointmentService._resolve_listing_scope(user_id, role)
+        if scope is None:
             return {"data": [], "pagination": {"page": page, "limit": limit, "total": 0, "total_pages": 0}}
+        filters, viewer_profile_id = scope
 
-        total = query.count()
+        total = Appointment.query.filter(*filters).count()
 
         # 🔑 LỊCH GẦN NHẤT Ở TRÊN
-        appointments = (
-            query
-            .order_by(Appointment.start_time.asc())
+        rows = (
+            AppointmentService._appointment_rows_query()
+            .filter(*filters)
+            .order_by(Appointment.start_time.asc(), Appointment.id.asc())
             .offset((page - 1) * limit)
             .limit(limit)
             .all()
         )
 
         data = [
-            AppointmentService._map_appointment_to_dict(a, user_id, role)
-            for a in appointments
+            AppointmentService._map_appointment_to_dict(row, role, viewer_profile_id)
+            for row in rows
         ]
 
         return {
@@ -100,20 +186,302 @@ class AppointmentService:
             }
         }
 
+
+   # ''' Cursor phân trang: mã hóa (start_time, id) thành chuỗi opaque '''
+   @staticmethod
+   def _encode_cursor(start_time, appointment_id):
+        payload = json.dumps([start_time.isoformat(), appointment_id]).encode()
+        return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+   @staticmethod
+   def _decode_cursor(cursor):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            start_time_str, appointment_id = json.loads(base64.urlsafe_b64decode(padded))
+            return datetime.fromisoformat(start_time_str), int(appointment_id)
+        except (ValueError, TypeError):
+            raise BusinessError("INVALID_CURSOR", "Cursor phân trang không hợp lệ.")
+
+   # ''' Ước lượng tổng số lịch hẹn (rẻ, không quét bảng) – chỉ có trên PostgreSQL cho admin '''
+   @staticmethod
+   def _estimate_total(filters):
+        if filters or db.engine.dialect.name != "postgresql":
+            return None
+
+        estimate = db.session.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE relname = :table"),
+            {"table": Appointment.__tablename__}
+        ).scalar()
+        return max(estimate, 0) if estimate is not None else None
+
+
+   # ''' Lấy danh sách lịch hẹn theo vai trò – phân trang keyset (cursor) '''
+   @staticmethod
+   def get_appointments_by_cursor(user_id, role, cursor=None, limit=10):
+        if not 1 <= limit <= MAX_CURSOR_PAGE_SIZE:
+            raise BusinessError("INVALID_LIMIT", f"limit phải nằm trong khoảng 1-{MAX_CURSOR_PAGE_SIZE}.")
+
+        scope = AppointmentService._resolve_listing_scope(user_id, role)
+        if scope is None:
+            return {"data": [], "pagination": {"limit": limit, "next_cursor": None, "estimated_total": 0}}
+        filters, viewer_profile_id = scope
+
+        query = AppointmentService._appointment_rows_query().filter(*filters)
+
+        if cursor:
+            after_start, after_id = AppointmentService._decode_cursor(cursor)
+            query = query.filter(
+                or_(
+                    Appointment.start_time > after_start,
+                    and_(Appointment.start_time == after_start, Appointment.id > after_id)
+                )
+            )
+
+        # Lấy dư 1 dòng để biết còn trang sau hay không, không cần COUNT
+        rows = (
+            query
+            .order_by(Appointment.start_time.asc(), Appointment.id.asc())
+            .limit(limit + 1)
+            .all()
+        )
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = AppointmentService._encode_cursor(last.start_time, last.id)
+
+        data = [
+            AppointmentService._map_appointment_to_dict(row, role, viewer_profile_id)
+            for row in rows
+        ]
+
+        return {
+            "data": data,
+            "pagination": {
+                "limit": limit,
+                "next_cursor": next_cursor,
+                "estimated_total": AppointmentService._estimate_total(filters)
+            }
+        }
+
    
    
+   # ''' Danh bạ chuyên viên đã serialize sẵn (body JSON, ETag), lấy từ cache nếu có '''
+   @staticmethod
+   def get_counselor_directory():
+      cached = cache.get(COUNSELOR_DIRECTORY_CACHE_KEY)
+      if cached:
+         return cached['body'], cached['etag']
+
+      body = current_app.json.dumps(AppointmentService.get_available_counselors())
+      etag = hashlib.sha1(body.encode('utf-8')).hexdigest()
+      cache.set(
+         COUNSELOR_DIRECTORY_CACHE_KEY,
+         {'body': body, 'etag': etag},
+         timeout=current_app.config.get('COUNSELOR_DIRECTORY_CACHE_TIMEOUT')
+      )
+      return body, etag
+
+   # ''' Xóa cache danh bạ chuyên viên – gọi sau khi ghi hồ sơ/vai trò chuyên viên '''
+   @staticmethod
+   def invalidate_counselor_directory():
+      cache.delete(COUNSELOR_DIRECTORY_CACHE_KEY)
+
+
+   # ''' Phát sự kiện thay đổi lịch hẹn (sau commit) cho các kết nối SSE '''
+   @staticmethod
+   def _publish_appointment_event(event_type, row):
+        appointment = AppointmentService._map_appointment_to_dict(row, role=None)
+        appointment.pop("permissions")
+        event_bus.publish(APPOINTMENT_EVENTS_CHANNEL, {
+            "type": event_type,
+            "counselor_id": row.counselor_id,
+            "appointment": appointment
+        })
+
+   # ''' Stream SSE chỉ gồm các thay đổi (delta), lọc theo phạm vi vai trò như get_appointments_by_role '''
+   @staticmethod
+   def stream_appointment_events(user_id, role, heartbeat_interval=15):
+        scope = AppointmentService._resolve_listing_scope(user_id, role)
+        if scope is None:
+            raise BusinessError("APPOINTMENT_STREAM_FORBIDDEN", "Bạn không có quyền theo dõi lịch hẹn.")
+        _, viewer_profile_id = scope
+
+        def visible(message):
+            if role == "admin":
+                return True
+            if role == "counselor":
+                return message["counselor_id"] == viewer_profile_id
+            return message["appointment"]["user_id"] == user_id
+
+        def sse(event, data):
+            return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+        def generate():
+            subscription = event_bus.subscribe(APPOINTMENT_EVENTS_CHANNEL)
+            try:
+                yield f"retry: {heartbeat_interval * 1000}\n\n"
+                while True:
+                    message = subscription.get(timeout=heartbeat_interval)
+                    if subscription.overflowed:
+                        # Client chậm, bộ đệm đã bỏ bớt sự kiện => yêu cầu tải lại danh sách
+                        subscription.overflowed = False
+                        yield sse("resync", {})
+                    if message is None:
+                        yield ": heartbeat\n\n"
+                        continue
+                    if not visible(message):
+                        continue
+
+                    appointment = dict(message["appointment"])
+                    appointment["permissions"] = AppointmentService._get_permissions(
+                        status=appointment["status"],
+                        counselor_id=message["counselor_id"],
+                        role=role,
+                        viewer_profile_id=viewer_profile_id
+                    )
+                    yield sse(f"appointment.{message['type']}", appointment)
+            finally:
+                subscription.close()
+
+        return generate()
+
+
+   # ''' Xuất toàn bộ lịch hẹn dạng stream (ndjson/csv/ics) – đọc theo lô từ server-side cursor '''
+   @staticmethod
+   def export_appointments(fmt='ndjson', from_str=None, to_str=None):
+        formats = {
+            'ndjson': (AppointmentService._export_ndjson, 'application/x-ndjson'),
+            'csv': (AppointmentService._export_csv, 'text/csv'),
+            'ics': (AppointmentService._export_ics, 'text/calendar'),
+        }
+        if fmt not in formats:
+            raise BusinessError("INVALID_EXPORT_FORMAT", "Định dạng xuất không hợp lệ (ndjson, csv, ics).")
+
+        query = AppointmentService._appointment_rows_query()
+        if from_str:
+            query = query.filter(Appointment.start_time >= to_naive_utc(AppointmentService._parse_utc_datetime(from_str)))
+        if to_str:
+            query = query.filter(Appointment.start_time < to_naive_utc(AppointmentService._parse_utc_datetime(to_str)))
+
+        rows = query.order_by(Appointment.start_time.asc(), Appointment.id.asc()).yield_per(EXPORT_BATCH_SIZE)
+        writer, mimetype = formats[fmt]
+        return writer(rows), mimetype, f"appointments.{fmt}"
+
+   @staticmethod
+   def _export_record(row):
+        return {
+            "appointment_id": row.id,
+            "user_id": row.user_id,
+            "user_name": row.user_name,
+            "counselor_user_id": row.counselor_user_id,
+            "counselor_name": row.counselor_name,
+            "start_time": AppointmentService._to_utc_iso(row.start_time),
+            "end_time": AppointmentService._to_utc_iso(row.end_time),
+            "status": row.status,
+            "reason": row.reason,
+            "created_at": AppointmentService._to_utc_iso(row.created_at)
+        }
+
+   @staticmethod
+   def _export_ndjson(rows):
+        for row in rows:
+            yield json.dumps(AppointmentService._export_record(row), ensure_ascii=False) + "\n"
+
+   @staticmethod
+   def _export_csv(rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        columns = [
+            "appointment_id", "user_id", "user_name", "counselor_user_id", "counselor_name",
+            "start_time", "end_time", "status", "reason", "created_at"
+        ]
+
+        def flush():
+            value = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            return value
+
+        writer.writerow(columns)
+        yield flush()
+        for row in rows:
+            record = AppointmentService._export_record(row)
+            writer.writerow([record[column] for column in columns])
+            yield flush()
+
+   @staticmethod
+   def _ics_escape(value):
+        return (
+            (value or "")
+            .replace("\\", "\\\\")
+            .replace(";", "\\;")
+            .replace(",", "\\,")
+            .replace("\r\n", "\\n")
+            .replace("\n", "\\n")
+        )
+
+   @staticmethod
+   def _ics_line(line):
+        # RFC 5545: gập dòng dài hơn 75 octet
+        encoded = line.encode("utf-8")
+        if len(encoded) <= 75:
+            return line + "\r\n"
+
+        parts, current = [], b""
+        for char in line:
+            char_bytes = char.encode("utf-8")
+            if len(current) + len(char_bytes) > (75 if not parts else 74):
+                parts.append(current.decode("utf-8"))
+                current = b""
+            current += char_bytes
+        parts.append(current.decode("utf-8"))
+        return "\r\n ".join(parts) + "\r\n"
+
+   @staticmethod
+   def _export_ics(rows):
+        ics_status = {
+            "pending": "TENTATIVE",
+            "confirmed": "CONFIRMED",
+            "canceled": "CANCELLED",
+            "completed": "CONFIRMED"
+        }
+
+        def stamp(value):
+            return to_naive_utc(value).strftime("%Y%m%dT%H%M%SZ") if value else ""
+
+        line = AppointmentService._ics_line
+        yield line("BEGIN:VCALENDAR") + line("VERSION:2.0") + line("PRODID:-//drug-prevention-app//appointments//VI")
+        for row in rows:
+            yield "".join([
+                line("BEGIN:VEVENT"),
+                line(f"UID:appointment-{row.id}@drug-prevention-app"),
+                line(f"DTSTAMP:{stamp(row.created_at)}"),
+                line(f"DTSTART:{stamp(row.start_time)}"),
+                line(f"DTEND:{stamp(row.end_time)}"),
+                line("SUMMARY:" + AppointmentService._ics_escape(
+                    f"{row.user_name or 'Người dùng bị xóa'} – {row.counselor_name or 'Chuyên viên bị xóa'}"
+                )),
+                line("DESCRIPTION:" + AppointmentService._ics_escape(row.reason)),
+                line(f"STATUS:{ics_status.get(row.status, 'TENTATIVE')}"),
+                line("END:VEVENT"),
+            ])
+        yield line("END:VCALENDAR")
+
+
    # ''' Lấy danh sách chuyên viên tư vấn có hồ sơ '''
    @staticmethod
    def get_available_counselors():
       
-      counselor_role = Role.query.filter_by(name='counselor').first()
-      if not counselor_role or not counselor_role.id:
+      counselor_role_id = role_registry.id_of('counselor')
+      if not counselor_role_id:
          return []
 
       counselors_data = db.session.query(User, CounselorProfile).join(
          CounselorProfile, User.id == CounselorProfile.user_id 
       ).filter(
-         User.role_id == counselor_role.id 
+         User.role_id == counselor_role_id 
       ).all()
       
       results = []
@@ -135,36 +503,40 @@ class AppointmentService:
         if not counselor_user:
             raise NotFoundError("COUNSELOR_NOT_FOUND", "Chuyên viên không tồn tại.")
 
-        if counselor_user.role.name != "counselor":
+        if counselor_user.role_id != role_registry.id_of("counselor"):
             raise BusinessError("INVALID_COUNSELOR_ROLE", "Người dùng này không phải là chuyên viên.")
 
         counselor_profile = CounselorProfile.query.filter_by(user_id=counselor_user_id).first()
         if not counselor_profile:
             raise BusinessError("COUNSELOR_PROFILE_NOT_FOUND", "Chuyên viên chưa có hồ sơ tư vấn.")
 
-        try:
-            start_time = datetime.fromisoformat(start_time_str.replace("Z", "+00:00"))
-        except ValueError:
-            raise BusinessError("INVALID_DATETIME_FORMAT", "Định dạng thời gian không hợp lệ.")
-
-        if start_time.tzinfo is None:
-            start_time = start_time.replace(tzinfo=timezone.utc)
-        else:
-            start_time = start_time.astimezone(timezone.utc)
+        start_time = AppointmentService._parse_utc_datetime(start_time_str)
 
         if start_time <= datetime.now(timezone.utc):
             raise BusinessError("APPOINTMENT_TIME_IN_PAST", "Không thể đặt lịch trong quá khứ.")
 
-        end_time = start_time + timedelta(hours=1)
+        # Chỉ nhận khung giờ nằm trong lịch làm việc (tra cứu O(1) trong lưới đã tính sẵn)
+        if not schedule_grid.is_bookable(counselor_profile.id, start_time):
+            raise BusinessError("APPOINTMENT_OUTSIDE_WORKING_HOURS", "Thời gian này nằm ngoài giờ làm việc của chuyên viên.")
+
+        end_time = start_time + SLOT_DURATION
 
+        # Kiểm tra nhanh trên chỉ mục (đã đối chiếu phiên bản với các worker khác): trùng thì từ chối
+        # ngay, không cần khóa DB
+        if slot_index.find_conflict(counselor_profile.id, start_time, end_time, verify=True):
+            raise BusinessError("APPOINTMENT_TIME_CONFLICT", "Thời gian này chuyên viên đã có lịch khác.")
+
+        # Chỉ mục không thấy trùng: DB vẫn là nguồn quyết định (lịch ghi ngoài ứng dụng, bộ đếm lỗi...)
         conflict = Appointment.query.filter(
             Appointment.counselor_id == counselor_profile.id,
             Appointment.status == "confirmed",
             Appointment.start_time < end_time,
             Appointment.end_time > start_time
-        ).first()
+        ).with_for_update().first()
 
         if conflict:
+            # Chỉ mục bị thiếu => chỉ nạp lại khung giờ của chuyên viên này
+            slot_index.refresh_counselor(counselor_profile.id)
             raise BusinessError("APPOINTMENT_TIME_CONFLICT", "Thời gian này chuyên viên đã có lịch khác.")
 
         appointment = Appointment(
@@ -177,7 +549,13 @@ class AppointmentService:
         )
 
         db.session.add(appointment)
+        NotificationService.record_appointment_event(appointment, 'created')
         db.session.commit()
+        schedule_outbox_dispatch()
+
+        row = AppointmentService._appointment_rows_query().filter(Appointment.id == appointment.id).one()
+        ProfileService.invalidate(row.user_id, row.counselor_user_id)
+        AppointmentService._publish_appointment_event("created", row)
 
         return {
             "appointment_id": appointment.id,
@@ -186,44 +564,109 @@ class AppointmentService:
         }
 
 
-   # ''' Cập nhật trạng thái lịch hẹn '''
+   # ''' Lấy các khung giờ trống (1 tiếng) của chuyên viên trong khoảng thời gian '''
    @staticmethod
-   def update_status(appointment_id, new_status, current_user_id, role):
-      appointment = Appointment.query.get(appointment_id)
-      if not appointment:
-         raise NotFoundError(
-               "APPOINTMENT_NOT_FOUND",
-               "Lịch hẹn không tồn tại."
-         )
+   def get_free_slots(counselor_user_id, from_str=None, to_str=None):
+        counselor_profile = CounselorProfile.query.filter_by(user_id=counselor_user_id).first()
+        if not counselor_profile:
+            raise NotFoundError("COUNSELOR_NOT_FOUND", "Chuyên viên không tồn tại.")
 
-      db.session.refresh(appointment)
-      current_status = appointment.status
+        now = datetime.now(timezone.utc)
+        range_start = AppointmentService._parse_utc_datetime(from_str) if from_str else now
+        range_end = (
+            AppointmentService._parse_utc_datetime(to_str) if to_str
+            else range_start + timedelta(days=7)
+        )
 
+        # Không trả khung giờ trong quá khứ
+        range_start = max(range_start, now)
+
+        if range_end <= range_start:
+            raise BusinessError("INVALID_TIME_RANGE", "Khoảng thời gian không hợp lệ.")
+        if range_end - range_start > MAX_FREE_SLOT_RANGE:
+            raise BusinessError("TIME_RANGE_TOO_LARGE", "Khoảng thời gian tối đa là 31 ngày.")
+
+        slots = [
+            (start, end)
+            for start, end in slot_index.free_slots(counselor_profile.id, range_start, range_end)
+            if schedule_grid.is_bookable(counselor_profile.id, start)
+        ]
+
+        return {
+            "counselor_user_id": counselor_user_id,
+            "from": AppointmentService._to_utc_iso(range_start),
+            "to": AppointmentService._to_utc_iso(range_end),
+            "slots": [
+                {
+                    "start_time": start.replace(tzinfo=timezone.utc).isoformat(),
+                    "end_time": end.replace(tzinfo=timezone.utc).isoformat()
+                }
+                for start, end in slots
+            ]
+        }
+
+
+   # ''' Kiểm tra luồng chuyển trạng thái theo vai trò '''
+   @staticmethod
+   def _check_transition(current_status, new_status, role):
       if current_status in ['completed', 'canceled']:
          raise BusinessError(
                "APPOINTMENT_STATUS_FINAL",
                "Lịch hẹn đã kết thúc, không thể thay đổi trạng thái."
          )
 
-      allowed_transitions = {
-         'pending': {
-               'counselor': ['confirmed', 'canceled'],
-               'admin': ['confirmed', 'canceled']
-         },
-         'confirmed': {
-               'admin': ['completed', 'canceled']
-         }
-      }
-
-      allowed_statuses = allowed_transitions.get(current_status, {}).get(role, [])
+      allowed_statuses = AppointmentService.ALLOWED_TRANSITIONS.get(current_status, {}).get(role, [])
       if new_status not in allowed_statuses:
          raise BusinessError(
                "APPOINTMENT_STATUS_INVALID_TRANSITION",
                f"Không được phép chuyển từ '{current_status}' sang '{new_status}'."
          )
 
+   # ''' Counselor chỉ được cập nhật lịch hẹn của chính mình '''
+   @staticmethod
+   def _check_ownership(appointment, role, viewer_profile_id):
+      if role != 'counselor':
+         return
+
+      if not viewer_profile_id:
+            raise BusinessError(
+               "COUNSELOR_PROFILE_NOT_FOUND",
+               "Không tìm thấy hồ sơ chuyên viên."
+            )
+
+      if appointment.counselor_id != viewer_profile_id:
+            raise BusinessError(
+               "APPOINTMENT_FORBIDDEN",
+               "Bạn không có quyền cập nhật lịch hẹn này."
+            )
+
+
+   # ''' Lỗi commit có phải do ràng buộc chống trùng lịch (PostgreSQL exclusion_violation) '''
+   @staticmethod
+   def _is_overlap_violation(error):
+      orig = getattr(error, 'orig', None)
+      constraint = getattr(getattr(orig, 'diag', None), 'constraint_name', None)
+      return getattr(orig, 'pgcode', None) == '23P01' or constraint == OVERLAP_CONSTRAINT_NAME
+
+
+   # ''' Cập nhật trạng thái lịch hẹn '''
+   @staticmethod
+   def update_status(appointment_id, new_status, current_user_id, role):
+      appointment = Appointment.query.get(appointment_id)
+      if not appointment:
+         raise NotFoundError(
+               "APPOINTMENT_NOT_FOUND",
+               "Lịch hẹn không tồn tại."
+         )
+
+      db.session.refresh(appointment)
+      current_status = appointment.status
+
+      AppointmentService._check_transition(current_status, new_status, role)
+
       # CONFLICT CHECK – ONLY FOR CONFIRMED
-      if new_status == 'confirmed':
+      # PostgreSQL: ràng buộc EXCLUDE trên bảng chặn trùng lịch khi commit, không cần khóa hàng.
+      if new_status == 'confirmed' and db.engine.dialect.name != 'postgresql':
          conflict = Appointment.query.filter(
                Appointment.counselor_id == appointment.counselor_id,
                Appointment.id != appointment.id,
@@ -239,79 +682,218 @@ class AppointmentService:
                )
 
       # Ownership check cho counselor
-      if role == 'counselor':
-         counselor_profile = CounselorProfile.query.filter_by(
-               user_id=current_user_id
-         ).first()
-
-         if not counselor_profile:
-               raise BusinessError(
-                  "COUNSELOR_PROFILE_NOT_FOUND",
-                  "Không tìm thấy hồ sơ chuyên viên."
-               )
-
-         if appointment.counselor_id != counselor_profile.id:
-               raise BusinessError(
-                  "APPOINTMENT_FORBIDDEN",
-                  "Bạn không có quyền cập nhật lịch hẹn này."
-               )
+      viewer_profile_id = AppointmentService._get_viewer_profile_id(current_user_id, role)
+      AppointmentService._check_ownership(appointment, role, viewer_profile_id)
 
       appointment.status = new_status
-      db.session.commit()
-
-      return AppointmentService._map_appointment_to_dict(
-         appointment,
-         current_user_id=current_user_id,
-         role=role
+      NotificationService.record_appointment_event(appointment, 'status_changed', old_status=current_status)
+      try:
+         db.session.commit()
+      except IntegrityError as e:
+         db.session.rollback()
+         if AppointmentService._is_overlap_violation(e):
+            raise BusinessError(
+               "APPOINTMENT_TIME_CONFLICT",
+               "Khung giờ này đã có lịch hẹn được xác nhận."
+            )
+         raise
+
+      schedule_outbox_dispatch()
+
+      # Đồng bộ chỉ mục khung giờ đã xác nhận
+      if new_status == 'confirmed':
+         slot_index.add(appointment.counselor_id, appointment.start_time, appointment.end_time, appointment.id)
+      elif current_status == 'confirmed':
+         slot_index.remove(appointment.counselor_id, appointment.id)
+
+      row = (
+         AppointmentService._appointment_rows_query()
+         .filter(Appointment.id == appointment.id)
+         .one()
       )
+      ProfileService.invalidate(row.user_id, row.counselor_user_id)
+      AppointmentService._publish_appointment_event("status_changed", row)
+      return AppointmentService._map_appointment_to_dict(row, role, viewer_profile_id)
    
    
-   # ''' Lấy quyền cập nhật trạng thái lịch hẹn '''
+   # ''' Cập nhật trạng thái hàng loạt: 1 lần tải dữ liệu, phát hiện trùng lịch trong bộ nhớ, 1 transaction '''
    @staticmethod
-   def _get_permissions(appointment, current_user_id, role):
-      current_status = appointment.status
+   def update_status_batch(items, current_user_id, role):
+      if not isinstance(items, list) or not items:
+         raise BusinessError("INVALID_BATCH", "Danh sách cập nhật trống hoặc không hợp lệ.")
+      if len(items) > MAX_STATUS_BATCH_SIZE:
+         raise BusinessError("BATCH_TOO_LARGE", f"Tối đa {MAX_STATUS_BATCH_SIZE} lịch hẹn mỗi lần.")
+
+      results = [None] * len(items)
+
+      def fail(index, appointment_id, error_code, message):
+         results[index] = {
+            "appointment_id": appointment_id,
+            "success": False,
+            "error_code": error_code,
+            "message": message
+         }
 
-      # Trạng thái kết thúc
-      if current_status in ['completed', 'canceled']:
-         return {
-            "can_update_status": False,
-            "allowed_next_status": []
+      # 1. Tải toàn bộ lịch hẹn liên quan trong một query
+      ids = [
+         item.get('appointment_id') for item in items
+         if isinstance(item, dict) and isinstance(item.get('appointment_id'), int)
+      ]
+      appointments = {
+         a.id: a for a in Appointment.query.filter(Appointment.id.in_(ids)).all()
+      } if ids else {}
+      viewer_profile_id = AppointmentService._get_viewer_profile_id(current_user_id, role)
+
+      # 2. Kiểm tra từng mục (trạng thái, quyền) – không truy vấn thêm
+      accepted = {}
+      seen = set()
+      for index, item in enumerate(items):
+         appointment_id = item.get('appointment_id') if isinstance(item, dict) else None
+         new_status = item.get('status') if isinstance(item, dict) else None
+
+         if not isinstance(appointment_id, int):
+            fail(index, appointment_id, "INVALID_APPOINTMENT_ID", "Mã lịch hẹn không hợp lệ.")
+            continue
+         if new_status not in ['pending', 'confirmed', 'canceled', 'completed']:
+            fail(index, appointment_id, "INVALID_STATUS", "Trạng thái không hợp lệ.")
+            continue
+         if appointment_id in seen:
+            fail(index, appointment_id, "DUPLICATE_ITEM", "Lịch hẹn xuất hiện nhiều lần trong yêu cầu.")
+            continue
+         seen.add(appointment_id)
+
+         appointment = appointments.get(appointment_id)
+         if not appointment:
+            fail(index, appointment_id, "APPOINTMENT_NOT_FOUND", "Lịch hẹn không tồn tại.")
+            continue
+
+         try:
+            AppointmentService._check_transition(appointment.status, new_status, role)
+            AppointmentService._check_ownership(appointment, role, viewer_profile_id)
+         except BusinessError as e:
+            fail(index, appointment_id, e.error_code, e.message)
+            continue
+
+         accepted[index] = (appointment, new_status)
+
+      # 3. Phát hiện trùng lịch: sắp xếp + quét theo từng chuyên viên
+      to_confirm = [(i, a) for i, (a, status) in accepted.items() if status == 'confirmed']
+      if to_confirm:
+         leaving_confirmed = {a.id for a, status in accepted.values() if a.status == 'confirmed'}
+         counselor_ids = {a.counselor_id for _, a in to_confirm}
+
+         existing = {}
+         for counselor_id, start_time, end_time, appointment_id in (
+            db.session.query(
+               Appointment.counselor_id, Appointment.start_time, Appointment.end_time, Appointment.id
+            )
+            .filter(
+               Appointment.counselor_id.in_(counselor_ids),
+               Appointment.status == 'confirmed',
+               Appointment.start_time < max(a.end_time for _, a in to_confirm),
+               Appointment.end_time > min(a.start_time for _, a in to_confirm)
+            )
+            .order_by(Appointment.start_time)
+            .all()
+         ):
+            if appointment_id not in leaving_confirmed:
+               existing.setdefault(counselor_id, []).append((start_time, end_time))
+
+         last_end = {}
+         for index, appointment in sorted(to_confirm, key=lambda pair: pair[1].start_time):
+            busy = existing.get(appointment.counselor_id, [])
+            # Khoảng đã xác nhận gần nhất bắt đầu trước end_time của lịch đang xét
+            pos = bisect_left(busy, (appointment.end_time,))
+            overlaps_existing = pos > 0 and busy[pos - 1][1] > appointment.start_time
+            overlaps_batch = last_end.get(appointment.counselor_id, datetime.min) > appointment.start_time
+
+            if overlaps_existing or overlaps_batch:
+               del accepted[index]
+               fail(index, appointment.id, "APPOINTMENT_TIME_CONFLICT", "Khung giờ này đã có lịch hẹn được xác nhận.")
+               continue
+            last_end[appointment.counselor_id] = appointment.end_time
+
+      # 4. Ghi tất cả trong một transaction
+      previous_status = {}
+      for appointment, new_status in accepted.values():
+         previous_status[appointment.id] = appointment.status
+         appointment.status = new_status
+         NotificationService.record_appointment_event(
+            appointment, 'status_changed', old_status=previous_status[appointment.id]
+         )
+
+      try:
+         db.session.commit()
+      except IntegrityError as e:
+         db.session.rollback()
+         if AppointmentService._is_overlap_violation(e):
+            raise BusinessError(
+               "APPOINTMENT_TIME_CONFLICT",
+               "Khung giờ này đã có lịch hẹn được xác nhận."
+            )
+         raise
+
+      if accepted:
+         schedule_outbox_dispatch()
+
+      # Đồng bộ chỉ mục khung giờ đã xác nhận
+      for appointment, new_status in accepted.values():
+         if new_status == 'confirmed':
+            slot_index.add(appointment.counselor_id, appointment.start_time, appointment.end_time, appointment.id)
+         elif previous_status[appointment.id] == 'confirmed':
+            slot_index.remove(appointment.counselor_id, appointment.id)
+
+      rows = {}
+      if accepted:
+         rows = {
+            row.id: row for row in
+            AppointmentService._appointment_rows_query()
+            .filter(Appointment.id.in_([a.id for a, _ in accepted.values()]))
+            .all()
          }
 
-      # Định nghĩa luồng trạng thái
-      allowed_transitions = {
-         'pending': {
-            'counselor': ['confirmed', 'canceled'],
-            'admin': ['confirmed', 'canceled']
-         },
-         'confirmed': {
-            'admin': ['completed', 'canceled']
+      for row in rows.values():
+         ProfileService.invalidate(row.user_id, row.counselor_user_id)
+         AppointmentService._publish_appointment_event("status_changed", row)
+
+      for index, (appointment, _) in accepted.items():
+         results[index] = {
+            "appointment_id": appointment.id,
+            "success": True,
+            "data": AppointmentService._map_appointment_to_dict(rows[appointment.id], role, viewer_profile_id)
          }
+
+      succeeded = len(accepted)
+      return {
+         "results": results,
+         "summary": {"succeeded": succeeded, "failed": len(items) - succeeded}
+      }
+
+
+   # ''' Lấy quyền cập nhật trạng thái lịch hẹn (tính trong bộ nhớ, không query) '''
+   @staticmethod
+   def _get_permissions(status, counselor_id, role, viewer_profile_id=None):
+      denied = {
+         "can_update_status": False,
+         "allowed_next_status": []
       }
 
-      role_rules = allowed_transitions.get(current_status, {})
-      allowed_next_status = role_rules.get(role, [])
+      # Trạng thái kết thúc
+      if status in ['completed', 'canceled']:
+         return denied
 
       # User thường không được update
       if role == 'user':
-         return {
-            "can_update_status": False,
-            "allowed_next_status": []
-         }
+         return denied
 
       # Counselor chỉ được update lịch của mình
-      if role == 'counselor':
-         counselor_profile = CounselorProfile.query.filter_by(
-            user_id=current_user_id
-         ).first()
-
-         if not counselor_profile or appointment.counselor_id != counselor_profile.id:
-            return {
-                  "can_update_status": False,
-                  "allowed_next_status": []
-            }
+      if role == 'counselor' and (not viewer_profile_id or counselor_id != viewer_profile_id):
+         return denied
+
+      allowed_next_status = AppointmentService.ALLOWED_TRANSITIONS.get(status, {}).get(role, [])
 
       return {
          "can_update_status": len(allowed_next_status) > 0,
          "allowed_next_status": allowed_next_status
-      }
\ No newline at end of file
+      }
+
@@ -0,0 +1,130 @@
+from datetime import datetime
+
+from sqlalchemy import func, insert, select
+
+from app.extensions import db
+from app.models.course import Course
+from app.models.course_analytics import CourseFunnelStep, CourseFunnelSummary
+from app.models.course_module import CourseModule
+from app.models.course_progress import UserCourseProgress
+from app.utils.errors import NotFoundError
+
+# Khóa advisory (PostgreSQL) tuần tự hóa các lần tính lại bảng phễu giữa các worker/beat
+FUNNEL_REFRESH_LOCK_ID = 0x66756E6E656C # 'funnel'
+
+class CourseAnalyticsService:
+
+    @staticmethod
+    def refresh():
+        """
+        Tính lại toàn bộ bảng phễu từ một truy vấn GROUP BY course_id, last_module_id, is_completed
+        (không đọc từng dòng tiến trình) và thay thế nội dung bảng trong một transaction.
+
+        Hai lần tính lại đồng thời (beat + request đầu tiên, nhiều worker) cùng xóa rồi chèn sẽ đụng khóa chính,
+        nên trên PostgreSQL lấy advisory lock theo transaction trước khi đọc: lần sau chờ lần trước commit
+        rồi mới đọc dữ liệu mới. SQLite đã tuần tự hóa các transaction ghi.
+        """
+        if db.engine.dialect.name == 'postgresql':
+            db.session.execute(select(func.pg_advisory_xact_lock(FUNNEL_REFRESH_LOCK_ID)))
+
+        counts = (
+            db.session.query(
+                UserCourseProgress.course_id,
+                UserCourseProgress.last_module_id,
+                UserCourseProgress.is_completed,
+                func.count()
+            )
+            .group_by(UserCourseProgress.course_id, UserCourseProgress.last_module_id, UserCourseProgress.is_completed)
+            .all()
+        )
+
+        modules = {} # course_id -> [module_id theo thứ tự]
+        for course_id, module_id in (
+            db.session.query(CourseModule.course_id, CourseModule.id)
+            .order_by(CourseModule.course_id, CourseModule.module_order, CourseModule.id)
+        ):
+            modules.setdefault(course_id, []).append(module_id)
+        positions = {
+            module_id: position
+            for ordered in modules.values()
+            for position, module_id in enumerate(ordered, start=1)
+        }
+
+        now = datetime.utcnow()
+        summaries = {
+            course_id: {"course_id": course_id, "enrolled": 0, "completed": 0, "refreshed_at": now}
+            for (course_id,) in db.session.query(Course.id)
+        }
+        current = {} # (course_id, position) -> số học viên đang ở module đó
+        for course_id, last_module_id, is_completed, total in counts:
+            summary = summaries[course_id]
+            summary["enrolled"] += total
+            if is_completed:
+                summary["completed"] += total
+                continue
+            if last_module_id in positions:
+                key = (course_id, positions[last_module_id])
+                current[key] = current.get(key, 0) + total
+
+        steps = []
+        for course_id, ordered in modules.items():
+            # Đã tới module k = đang ở module >= k hoặc đã hoàn thành khóa học
+            reached = summaries[course_id]["completed"]
+            course_steps = []
+            for position in range(len(ordered), 0, -1):
+                here = current.get((course_id, position), 0)
+                reached += here
+                course_steps.append({
+                    "course_id": course_id,
+                    "module_position": position,
+                    "module_id": ordered[position - 1],
+                    "reached": reached,
+                    "current": here
+                })
+            steps.extend(reversed(course_steps))
+
+        CourseFunnelStep.query.delete()
+        CourseFunnelSummary.query.delete()
+        if summaries:
+            db.session.execute(insert(CourseFunnelSummary), list(summaries.values()))
+        if steps:
+            db.session.execute(insert(CourseFunnelStep), steps)
+        db.session.commit()
+        return len(summaries)
+
+    @staticmethod
+    def _ensure_built():
+        # Lần đầu (bảng trống) thì tính ngay thay vì trả về phễu rỗng
+        if not db.session.query(CourseFunnelSummary.query.exists()).scalar():
+            CourseAnalyticsService.refresh()
+
+    @staticmethod
+    def _build_funnels(summaries, steps):
+        by_course = {}
+        for step in steps:
+            by_course.setdefault(step.course_id, []).append(step.to_dict())
+        return [
+            {**summary.to_dict(), "modules": by_course.get(summary.course_id, [])}
+            for summary in summaries
+        ]
+
+    @staticmethod
+    def get_course_funnel(course_id):
+        """Phễu của một khóa học (đọc từ bảng tổng hợp)."""
+        CourseAnalyticsService._ensure_built()
+
+        summary = CourseFunnelSummary.query.get(course_id)
+        if not summary:
+            raise NotFoundError("COURSE_NOT_FOUND", "Khóa học không tồn tại hoặc chưa có số liệu.")
+
+        steps = CourseFunnelStep.query.filter_by(course_id=course_id).order_by(CourseFunnelStep.module_position).all()
+        return CourseAnalyticsService._build_funnels([summary], steps)[0]
+
+    @staticmethod
+    def get_all_funnels():
+        """Phễu của tất cả khóa học: 2 truy vấn, O(khóa học x module)."""
+        CourseAnalyticsService._ensure_built()
+
+        summaries = CourseFunnelSummary.query.order_by(CourseFunnelSummary.course_id).all()
+        steps = CourseFunnelStep.query.order_by(CourseFunnelStep.course_id, CourseFunnelStep.module_position).all()
+        return CourseAnalyticsService._build_funnels(summaries, steps)
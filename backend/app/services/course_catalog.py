@@ -0,0 +1,76 @@
+import hashlib
+import threading
+
+from flask import current_app
+
+from app.extensions import cache
+from app.models.course import Course
+
+# Bộ đếm phiên bản danh mục (dùng chung giữa các worker khi CACHE_BACKEND=redis)
+CATALOG_VERSION_KEY = 'courses:catalog_version'
+ALL_AUDIENCES = '*'
+
+
+class _Snapshot:
+    def __init__(self, version, groups):
+        self.version = version
+        self.groups = groups # audience -> (body, etag)
+
+
+class CourseCatalog:
+    """
+    Ảnh chụp danh mục khóa học trong bộ nhớ, đã nhóm theo target_audience và render sẵn JSON.
+
+    Mỗi lần ghi khóa học sẽ tăng bộ đếm phiên bản; worker nào thấy phiên bản khác với ảnh chụp
+    của mình sẽ dựng lại (thay thế nguyên khối). Kiểm tra phiên bản chỉ đọc cache, không chạm DB.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def _current_version(self):
+        version = cache.get(CATALOG_VERSION_KEY)
+        if version is None:
+            version = cache.incr(CATALOG_VERSION_KEY) or 0
+        return int(version)
+
+    def invalidate(self):
+        """Gọi sau khi commit thay đổi khóa học."""
+        cache.incr(CATALOG_VERSION_KEY)
+
+    def _render(self, version, courses):
+        body = current_app.json.dumps([course.to_dict() for course in courses]).encode('utf-8')
+        etag = f"{version}.{hashlib.sha1(body).hexdigest()[:16]}"
+        return body, etag
+
+    def _build(self, version):
+        courses = Course.query.filter_by(is_active=True).order_by(Course.id).all()
+
+        by_audience = {}
+        for course in courses:
+            by_audience.setdefault((course.target_audience or '').lower(), []).append(course)
+
+        groups = {ALL_AUDIENCES: self._render(version, courses)}
+        for audience, members in by_audience.items():
+            groups[audience] = self._render(version, members)
+        return _Snapshot(version, groups)
+
+    def get(self, target_audience=None):
+        """Trả về (body JSON bytes, etag) của danh sách khóa học theo đối tượng."""
+        version = self._current_version()
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != version:
+            snapshot = self._build(version)
+            with self._lock:
+                if self._snapshot is None or self._snapshot.version <= snapshot.version:
+                    self._snapshot = snapshot
+
+        key = target_audience.lower() if target_audience else ALL_AUDIENCES
+        if key not in snapshot.groups:
+            return self._render(version, [])
+        return snapshot.groups[key]
+
+
+# Instance dùng chung trong process
+course_catalog = CourseCatalog()
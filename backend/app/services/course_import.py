@@ -0,0 +1,186 @@
+import json
+
+from flask import current_app
+from sqlalchemy import insert, update
+
+from app.extensions import db
+from app.models.course import Course
+from app.models.course_module import CourseModule
+from app.services.course_catalog import course_catalog
+from app.services.course_search import get_course_search
+
+REQUIRED_FIELDS = ('title', 'description', 'target_audience', 'modules')
+TEXT_FIELDS = ('title', 'description', 'target_audience')
+
+
+class CourseImportError(ValueError):
+    pass
+
+
+class CourseImporter:
+    """
+    Nhập khóa học hàng loạt từ NDJSON (mỗi dòng một khóa học, cùng định dạng với POST /api/courses/).
+
+    Đọc từng dòng, gom thành lô và chèn mỗi lô bằng executemany (courses rồi course_modules).
+    Dòng lỗi (JSON hỏng, thiếu trường, sai kiểu, lỗi DB) được ghi lại theo số dòng
+    mà không làm hỏng các dòng khác; mỗi lô được commit riêng.
+    """
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or current_app.config.get('COURSE_IMPORT_BATCH_SIZE', 200)
+        self.search = get_course_search()
+        self.imported = 0
+        self.modules = 0
+        self.errors = []
+        self._batch = []
+
+    # --- Kiểm tra dữ liệu ---
+    @staticmethod
+    def _parse(line):
+        try:
+            data = json.loads(line)
+        except ValueError:
+            raise CourseImportError("JSON không hợp lệ.")
+        if not isinstance(data, dict):
+            raise CourseImportError("Mỗi dòng phải là một object JSON.")
+
+        missing = [field for field in REQUIRED_FIELDS if data.get(field) in (None, '')]
+        if missing:
+            raise CourseImportError(f"Thiếu các trường bắt buộc: {', '.join(missing)}.")
+        invalid = [field for field in TEXT_FIELDS if not isinstance(data[field], str) or not data[field].strip()]
+        if invalid:
+            raise CourseImportError(f"Các trường phải là chuỗi khác rỗng: {', '.join(invalid)}.")
+        if not isinstance(data['modules'], list) or not all(
+            isinstance(module, dict)
+            and isinstance(module.get('title'), str) and module['title'].strip()
+            and isinstance(module.get('content'), (str, type(None)))
+            for module in data['modules']
+        ):
+            raise CourseImportError("modules phải là danh sách các object có title (và content) dạng chuỗi.")
+        return data
+
+    # --- Chèn dữ liệu ---
+    def _insert(self, records):
+        """Chèn một nhóm bản ghi (line_number, data); trả về số module đã chèn."""
+        courses = []
+        for _, data in records:
+            course = Course(
+                title=data['title'],
+                description=data['description'],
+                target_audience=data['target_audience'],
+                is_active=data.get('is_active', True)
+            )
+            course.update_search_text()
+            courses.append(course)
+
+        course_ids = db.session.scalars(
+            insert(Course).returning(Course.id, sort_by_parameter_order=True),
+            [
+                {
+                    "title": course.title,
+                    "description": course.description,
+                    "target_audience": course.target_audience,
+                    "is_active": course.is_active,
+                    "search_text": course.search_text
+                }
+                for course in courses
+            ]
+        ).all()
+
+        modules = []
+        for course_id, course, (_, data) in zip(course_ids, courses, records):
+            course.id = course_id
+            self.search.index_course(course)
+            for index, module_data in enumerate(data['modules']):
+                modules.append(CourseModule(
+                    course_id=course_id,
+                    title=module_data['title'],
+                    content=module_data.get('content'),
+                    module_order=index + 1
+                ))
+
+        if not modules:
+            return 0
+
+        module_ids = db.session.scalars(
+            insert(CourseModule).returning(CourseModule.id, sort_by_parameter_order=True),
+            [
+                {
+                    "course_id": module.course_id,
+                    "title": module.title,
+                    "content": module.content,
+                    "module_order": module.module_order
+                }
+                for module in modules
+            ]
+        ).all()
+
+        # Nội dung tính sẵn cần module.id nên được ghi bằng một executemany UPDATE theo khóa chính
+        variants = []
+        for module_id, module in zip(module_ids, modules):
+            module.id = module_id
+            module.update_content_variants()
+            variants.append({
+                "id": module_id,
+                "content_etag": module.content_etag,
+                "content_gzip": module.content_gzip,
+                "content_br": module.content_br
+            })
+        db.session.execute(update(CourseModule), variants)
+        return len(modules)
+
+    def _flush(self):
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+
+        try:
+            with db.session.begin_nested():
+                self.modules += self._insert(batch)
+            self.imported += len(batch)
+        except Exception:
+            # Lô lỗi: chèn lại từng bản ghi để xác định dòng gây lỗi
+            for record in batch:
+                try:
+                    with db.session.begin_nested():
+                        self.modules += self._insert([record])
+                    self.imported += 1
+                except Exception as e:
+                    self.errors.append({"line": record[0], "error": f"Lỗi CSDL: {e.__class__.__name__}"})
+
+        db.session.commit()
+
+    def feed(self, line_number, line):
+        line = line.strip()
+        if not line:
+            return
+        try:
+            self._batch.append((line_number, self._parse(line)))
+        except CourseImportError as e:
+            self.errors.append({"line": line_number, "error": str(e)})
+            return
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+
+    def run(self, lines):
+        """Nhập từ một iterable các dòng NDJSON (str hoặc bytes); trả về báo cáo tổng hợp."""
+        try:
+            for line_number, line in enumerate(lines, start=1):
+                if isinstance(line, bytes):
+                    line = line.decode('utf-8', errors='replace')
+                self.feed(line_number, line)
+            self._flush()
+        finally:
+            if self.imported:
+                course_catalog.invalidate()
+
+        return {
+            "imported": self.imported,
+            "modules": self.modules,
+            "failed": len(self.errors),
+            "errors": self.errors
+        }
+
+
+def import_courses(lines, batch_size=None):
+    return CourseImporter(batch_size).run(lines)
@@ -0,0 +1,105 @@
+from flask import current_app
+from sqlalchemy import insert
+
+from app.extensions import db
+from app.models.course import Course
+from app.models.course_progress import UserCourseProgress
+from app.models.course_recommendation import CourseRecommendation
+from app.utils.errors import NotFoundError
+
+class CourseRecommendationService:
+
+    @staticmethod
+    def refresh(top_k=None):
+        """
+        Tính lại bảng gợi ý "học viên hoàn thành khóa này cũng học...".
+
+        Dựng ma trận thưa người dùng x khóa học (hoàn thành C, đăng ký E) rồi lấy C^T * E:
+        ô (i, j) = số học viên đã hoàn thành i và đăng ký j. Điểm được chuẩn hóa kiểu cosine
+        để khóa học đông người không lấn át; mỗi khóa giữ top-k.
+        """
+        import numpy as np
+        from scipy import sparse
+
+        top_k = top_k or current_app.config.get('COURSE_RECOMMENDATION_TOP_K', 20)
+
+        rows = db.session.query(
+            UserCourseProgress.user_id,
+            UserCourseProgress.course_id,
+            UserCourseProgress.is_completed
+        ).all()
+        active_ids = {course_id for (course_id,) in db.session.query(Course.id).filter_by(is_active=True)}
+
+        recommendations = []
+        if rows:
+            user_index, course_ids = {}, sorted({course_id for _, course_id, _ in rows})
+            course_index = {course_id: i for i, course_id in enumerate(course_ids)}
+            users = np.array([user_index.setdefault(user_id, len(user_index)) for user_id, _, _ in rows])
+            courses = np.array([course_index[course_id] for _, course_id, _ in rows])
+            completed = np.array([bool(is_completed) for _, _, is_completed in rows])
+
+            shape = (len(user_index), len(course_ids))
+            enrolled = sparse.csr_matrix((np.ones(len(rows)), (users, courses)), shape=shape)
+            finished = sparse.csr_matrix(
+                (np.ones(completed.sum()), (users[completed], courses[completed])), shape=shape
+            )
+
+            co = (finished.T @ enrolled).tocsr()
+            co.setdiag(0)
+            co.eliminate_zeros()
+
+            finished_counts = np.asarray(finished.sum(axis=0)).ravel()
+            enrolled_counts = np.asarray(enrolled.sum(axis=0)).ravel()
+
+            for i in range(co.shape[0]):
+                start, end = co.indptr[i], co.indptr[i + 1]
+                if start == end:
+                    continue
+                neighbours = co.indices[start:end]
+                counts = co.data[start:end]
+                scores = counts / np.sqrt(finished_counts[i] * enrolled_counts[neighbours])
+
+                # Xếp theo điểm giảm dần, cùng điểm thì nhiều học viên hơn trước
+                order = np.lexsort((-counts, -scores))
+                rank = 0
+                for j in order:
+                    recommended_id = course_ids[neighbours[j]]
+                    if recommended_id not in active_ids:
+                        continue
+                    rank += 1
+                    recommendations.append({
+                        "course_id": course_ids[i],
+                        "rank": rank,
+                        "recommended_course_id": recommended_id,
+                        "score": float(scores[j]),
+                        "learners": int(counts[j])
+                    })
+                    if rank == top_k:
+                        break
+
+        CourseRecommendation.query.delete()
+        if recommendations:
+            db.session.execute(insert(CourseRecommendation), recommendations)
+        db.session.commit()
+        return len(recommendations)
+
+    @staticmethod
+    def get_recommendations(course_id, user_id=None, limit=5):
+        """Đọc gợi ý đã tính sẵn (1 truy vấn), bỏ các khóa người dùng đã đăng ký."""
+        query = (
+            db.session.query(CourseRecommendation, Course)
+            .join(Course, Course.id == CourseRecommendation.recommended_course_id)
+            .filter(CourseRecommendation.course_id == course_id, Course.is_active.is_(True))
+        )
+        if user_id:
+            enrolled = db.session.query(UserCourseProgress.course_id).filter(UserCourseProgress.user_id == user_id)
+            query = query.filter(CourseRecommendation.recommended_course_id.notin_(enrolled))
+
+        rows = query.order_by(CourseRecommendation.rank).limit(limit).all()
+        if not rows and not Course.query.get(course_id):
+            raise NotFoundError("COURSE_NOT_FOUND", "Khóa học không tồn tại.")
+
+        return [
+            {**course.to_dict(), "score": round(recommendation.score, 4), "learners": recommendation.learners}
+            for recommendation, course in rows
+        ]
@@ -0,0 +1,91 @@
+from sqlalchemy import column, func, literal_column, or_, table, text
+
+from app.extensions import db
+from app.models.course import Course
+
+class PostgresCourseSearch:
+    """
+    tsvector (khớp tiền tố) + pg_trgm (gõ gần đúng) trên cột search_text đã bỏ dấu.
+
+    Gõ gần đúng dùng word_similarity (search_text %> cụm từ): so cụm từ với đoạn giống nhất
+    trong văn bản, vì similarity trên cả tiêu đề + mô tả gần như không bao giờ đạt ngưỡng.
+    """
+
+    def index_course(self, course):
+        # search_text là cột thường, các index GIN được PostgreSQL tự cập nhật
+        pass
+
+    def apply(self, query, tokens):
+        vector = func.to_tsvector(literal_column("'simple'"), func.coalesce(Course.search_text, ''))
+        # tokens chỉ gồm ký tự \w nên ghép trực tiếp thành tsquery an toàn
+        tsquery = func.to_tsquery(literal_column("'simple'"), ' & '.join(f"{token}:*" for token in tokens))
+        phrase = ' '.join(tokens)
+
+        # %> là dạng đảo của <% với cột ở bên trái, để dùng được index gin_trgm_ops
+        query = query.filter(or_(vector.op('@@')(tsquery), Course.search_text.op('%>')(phrase)))
+        rank = func.ts_rank(vector, tsquery) + func.word_similarity(phrase, Course.search_text)
+        return query, rank.desc()
+
+
+class SqliteCourseSearch:
+    """Bảng FTS5 courses_fts (rowid = courses.id) cho cấu hình SQLite/kiểm thử."""
+
+    fts = table('courses_fts', column('rowid'))
+
+    def index_course(self, course):
+        db.session.execute(text("DELETE FROM courses_fts WHERE rowid = :id"), {"id": course.id})
+        db.session.execute(
+            text("INSERT INTO courses_fts (rowid, search_text) VALUES (:id, :search_text)"),
+            {"id": course.id, "search_text": course.search_text or ''}
+        )
+
+    def apply(self, query, tokens):
+        match = ' AND '.join(f'"{token}"*' for token in tokens)
+        query = (
+            query
+            .join(self.fts, self.fts.c.rowid == Course.id)
+            .filter(text("courses_fts MATCH :match").bindparams(match=match))
+        )
+        # bm25 càng nhỏ càng liên quan
+        return query, func.bm25(literal_column('courses_fts')).asc()
+
+
+class LikeCourseSearch:
+    """Dự phòng cho các CSDL khác: LIKE trên văn bản đã bỏ dấu."""
+
+    def index_course(self, course):
+        pass
+
+    def apply(self, query, tokens):
+        for token in tokens:
+            query = query.filter(Course.search_text.like(f"%{token}%"))
+        return query, Course.id.asc()
+
+
+_BACKENDS = {
+    'postgresql': PostgresCourseSearch,
+    'sqlite': SqliteCourseSearch,
+}
+
+
+def get_course_search():
+    """Chọn backend tìm kiếm theo CSDL đang dùng."""
+    return _BACKENDS.get(db.engine.dialect.name, LikeCourseSearch)()
+
+
+def reindex_courses():
+    """Tính lại search_text và chỉ mục tìm kiếm cho toàn bộ khóa học."""
+    search = get_course_search()
+    if isinstance(search, SqliteCourseSearch):
+        db.session.execute(text("DELETE FROM courses_fts"))
+
+    courses = Course.query.all()
+    for course in courses:
+        course.update_search_text()
+    db.session.flush()
+
+    for course in courses:
+        search.index_course(course)
+
+    db.session.commit()
+    return len(courses)
@@ -1,31 +1,56 @@
+import hashlib
 from datetime import datetime
 from app.extensions import db
 from app.models.course import Course
 from app.models.course_progress import UserCourseProgress
 from app.models.user import User
 from app.models.course_module import CourseModule
-from sqlalchemy import or_
+from app.services.course_search import get_course_search
+from app.services.course_catalog import course_catalog
+from app.services.module_index import module_order_index
+from app.services.module_events import module_event_buffer
+from app.services.profile_service import ProfileService
+from app.utils.text import search_tokens
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import aliased, load_only, undefer
 
 class CourseService:
     @staticmethod
     def get_all_courses(target_audience=None, search_term=None):
         """Lấy danh sách tất cả khóa học, tùy chọn lọc theo đối tượng và tìm kiếm."""
+
+        if search_term:
+            courses, _ = CourseService.search_courses(search_term, target_audience=target_audience)
+            return courses
         
         query = Course.query.filter_by(is_active=True)
         
         if target_audience:
             query = query.filter(Course.target_audience.ilike(target_audience))    
-
-        if search_term:
-            search_pattern = f"%{search_term}%"
-            query = query.filter(
-                or_(
-                    Course.title.ilike(search_pattern),
-                    Course.description.ilike(search_pattern)
-                )
-            )
         
         return [course.to_dict() for course in query.all()]
+
+    @staticmethod
+    def search_courses(search_term, target_audience=None, page=1, limit=20):
+        """Tìm kiếm toàn văn (không phân biệt dấu), xếp theo mức độ liên quan. Trả về (trang kết quả, tổng số)."""
+        tokens = search_tokens(search_term)
+        if not tokens:
+            return [], 0
+
+        query = Course.query.filter_by(is_active=True)
+        if target_audience:
+            query = query.filter(Course.target_audience.ilike(target_audience))
+
+        query, rank = get_course_search().apply(query, tokens)
+        total = query.count()
+        courses = (
+            query
+            .order_by(rank, Course.id.asc())
+            .offset((page - 1) * limit)
+            .limit(limit)
+            .all()
+        )
+        return [course.to_dict() for course in courses], total
     
     @staticmethod
     def create_course(title, description, audience, modules_data):
@@ -35,9 +60,12 @@ class CourseService:
             description=description, 
             target_audience=audience
         )
+        new_course.update_search_text()
         db.session.add(new_course)
         db.session.flush() # Lấy ID của course để dùng cho modules
+        get_course_search().index_course(new_course)
         
+        modules = []
         for index, module_data in enumerate(modules_data):
             module = CourseModule(
                 course_id=new_course.id,
@@ -46,8 +74,14 @@ class CourseService:
                 module_order=index + 1
             )
             db.session.add(module)
-            
+            modules.append(module)
+
+        db.session.flush() # Lấy ID của module trước khi tính sẵn nội dung
+        for module in modules:
+            module.update_content_variants()
+
         db.session.commit()
+        course_catalog.invalidate()
         return new_course.to_dict()
     
     @staticmethod
@@ -79,91 +113,158 @@ class CourseService:
             db.session.rollback()
             raise
 
+        ProfileService.invalidate(user_id)
         return new_progress.to_dict()
   
     @staticmethod
-    def get_user_course_progress(user_id):
-        """Lấy danh sách Khóa học đã đăng ký và tiến trình của người dùng."""
-        
-        progress_records = UserCourseProgress.query.filter_by(user_id=user_id).all()
+    def get_user_course_progress(user_id, detailed=False):
+        """Lấy danh sách Khóa học đã đăng ký và tiến trình của người dùng (1 query duy nhất)."""
+
+        current_module = aliased(CourseModule)
+        sibling = aliased(CourseModule)
+
+        # Tổng số module và vị trí của module hiện tại trong khóa học
+        total_modules = (
+            select(func.count(sibling.id))
+            .where(sibling.course_id == UserCourseProgress.course_id)
+            .correlate(UserCourseProgress)
+            .scalar_subquery()
+        )
+        module_position = (
+            select(func.count(sibling.id))
+            .where(
+                sibling.course_id == UserCourseProgress.course_id,
+                sibling.module_order <= current_module.module_order
+            )
+            .correlate(UserCourseProgress, current_module)
+            .scalar_subquery()
+        )
+
+        rows = (
+            db.session.query(
+                UserCourseProgress,
+                Course.title,
+                current_module,
+                total_modules.label('total_modules'),
+                module_position.label('module_position')
+            )
+            .join(Course, Course.id == UserCourseProgress.course_id)
+            .outerjoin(current_module, current_module.id == UserCourseProgress.last_module_id)
+            .filter(UserCourseProgress.user_id == user_id)
+            .order_by(UserCourseProgress.id)
+            .all()
+        )
 
         results = []
-        for record in progress_records:
-            course = Course.query.get(record.course_id)
-            
-            current_module = CourseModule.query.get(record.last_module_id)
-
-            if course:
-                results.append({
-                    'course_id': course.id,
-                    'course_title': course.title,
-
-                    'progress_id': record.id,
-                    'is_completed': record.is_completed,
-                    'last_module': current_module.to_dict() if current_module else None,
-                    'completion_date': record.completion_date.isoformat() if record.completion_date else None
+        for record, course_title, module, total, position in rows:
+            item = {
+                'course_id': record.course_id,
+                'course_title': course_title,
+
+                'progress_id': record.id,
+                'is_completed': record.is_completed,
+                'last_module': module.to_dict() if module else None,
+                'completion_date': record.completion_date
+            }
+
+            if detailed:
+                # Module hiện tại là module chưa học xong (trừ khi đã hoàn thành khóa học)
+                completed = total if record.is_completed else max((position or 1) - 1, 0)
+                item.update({
+                    'total_modules': total,
+                    'current_module_position': position if module else None,
+                    'completed_modules': completed,
+                    'progress_percent': round(100 * completed / total) if total else (100 if record.is_completed else 0)
                 })
+
+            results.append(item)
         
         return results
     
     @staticmethod
     def complete_module(user_id, course_id, module_id):
-        """Đánh dấu một module là đã hoàn thành và chuyển sang module tiếp theo."""
+        """
+        Đánh dấu một module là đã hoàn thành và chuyển sang module tiếp theo.
 
-        progress = UserCourseProgress.query.filter_by(
-            user_id=user_id, 
-            course_id=course_id
-        ).first()
+        Module kế tiếp lấy từ chỉ mục thứ tự module (O(1)); tiến trình được cập nhật bằng một UPDATE
+        có điều kiện last_module_id = module_id, nên gửi trùng (bấm 2 lần) chỉ có một lần thành công.
+        """
 
-        if not progress:
-            raise ValueError("Người dùng chưa đăng ký khóa học này.")
-
-        if progress.last_module_id != module_id:
-            raise ValueError("Module này không phải là module hiện tại của bạn.")
+        order = module_order_index.get(course_id)
+        entry = order.positions.get(module_id) if order else None
 
-        current_module = CourseModule.query.get(module_id)
-        if not current_module:
-             raise ValueError("Module không tồn tại.")
+        if entry is None:
+            progress = UserCourseProgress.query.filter_by(user_id=user_id, course_id=course_id).first()
+            if not progress:
+                raise ValueError("Người dùng chưa đăng ký khóa học này.")
+            raise ValueError("Module không tồn tại.")
 
-        all_modules = CourseModule.query.filter_by(
-            course_id=course_id
-        ).order_by(CourseModule.module_order).all()
+        position, next_module_id, module_title = entry
+        if next_module_id is not None:
+            values = {"last_module_id": next_module_id}
+            next_title = order.positions[next_module_id][2]
+            message = f"Hoàn thành Module '{module_title}'. Chuyển sang Module '{next_title}'."
+        else:
+            values = {"last_module_id": module_id, "is_completed": True, "completion_date": datetime.utcnow()}
+            message = f"Hoàn thành Khóa học '{order.course_title}'! Chúc mừng!"
 
-        current_index = all_modules.index(current_module)
+        result = db.session.execute(
+            update(UserCourseProgress)
+            .where(
+                UserCourseProgress.user_id == user_id,
+                UserCourseProgress.course_id == course_id,
+                UserCourseProgress.last_module_id == module_id,
+                UserCourseProgress.is_completed.isnot(True)
+            )
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
 
-        if current_index < len(all_modules) - 1:
-            next_module = all_modules[current_index + 1]
-            progress.last_module_id = next_module.id
-            message = f"Hoàn thành Module '{current_module.title}'. Chuyển sang Module '{next_module.title}'."
-        else:
-            progress.last_module_id = module_id 
-            progress.is_completed = True
-            progress.completion_date = datetime.utcnow()
-            message = f"Hoàn thành Khóa học '{Course.query.get(course_id).title}'! Chúc mừng!"
+        if result.rowcount == 0:
+            db.session.rollback()
+            progress = UserCourseProgress.query.filter_by(user_id=user_id, course_id=course_id).first()
+            if not progress:
+                raise ValueError("Người dùng chưa đăng ký khóa học này.")
+            raise ValueError("Module này không phải là module hiện tại của bạn.")
 
         db.session.commit()
+        # Ghi nhật ký qua bộ đệm (không thêm truy vấn vào request)
+        module_event_buffer.record(user_id, course_id, module_id, position, completed_course=next_module_id is None)
+        if next_module_id is None:
+            ProfileService.invalidate(user_id) # Số khóa học đã hoàn thành thay đổi
+
+        progress = UserCourseProgress.query.filter_by(user_id=user_id, course_id=course_id).first()
         return {"message": message, "progress": progress.to_dict()}
     
     @staticmethod
-    def get_course_details_with_user(course_id, user_id):
-        """Lấy chi tiết khóa học + tiến trình hiện tại của user (nếu có)."""
+    def get_course_details_with_user(course_id, user_id, include_content=False):
+        """
+        Lấy chi tiết khóa học + tiến trình hiện tại của user (nếu có).
+
+        Mặc định chỉ trả về dàn ý module (không kèm content); nội dung từng module lấy qua
+        get_module_content. include_content=True giữ định dạng cũ (kèm toàn bộ nội dung).
+        """
 
         course = Course.query.get(course_id)
         if not course:
             raise ValueError("Khóa học không tồn tại.")
-    
-        modules = CourseModule.query.filter_by(course_id=course_id).order_by(CourseModule.module_order).all()
-        module_dicts = [m.to_dict() for m in modules]
 
-        if not user_id:
-            return {
-                "course": course.to_dict(),
-                "modules": module_dicts,
-                "currentModule": None,
-                "isCompleted": False
-            }
-        
-        progress = UserCourseProgress.query.filter_by(user_id=user_id, course_id=course_id).first()
+        columns = [CourseModule.id, CourseModule.course_id, CourseModule.title, CourseModule.module_order]
+        if include_content:
+            columns.append(CourseModule.content)
+
+        modules = (
+            CourseModule.query.filter_by(course_id=course_id)
+            .options(load_only(*columns))
+            .order_by(CourseModule.module_order)
+            .all()
+        )
+        serialize = CourseModule.to_dict if include_content else CourseModule.to_outline_dict
+        module_dicts = [serialize(m) for m in modules]
+
+        progress = None
+        if user_id:
+            progress = UserCourseProgress.query.filter_by(user_id=user_id, course_id=course_id).first()
 
         if not progress:
             return {
@@ -173,12 +274,46 @@ class CourseService:
                 "isCompleted": False
             }
 
-        current_module = CourseModule.query.get(progress.last_module_id)
+        current_module = next((m for m in module_dicts if m['id'] == progress.last_module_id), None)
 
         return {
             "course": course.to_dict(),
             "modules": module_dicts,
-            "currentModule": current_module.to_dict() if current_module else None,
+            "currentModule": current_module,
             "isCompleted": progress.is_completed
         }
 
+    @staticmethod
+    def get_module_content(course_id, module_id):
+        """
+        Lấy nội dung một module: (body JSON, etag, {encoding: body đã nén}).
+        Module ghi trước khi có cột tính sẵn sẽ được render tại chỗ (không nén).
+        """
+
+        module = (
+            CourseModule.query.filter_by(id=module_id, course_id=course_id)
+            .options(undefer(CourseModule.content_gzip), undefer(CourseModule.content_br))
+            .first()
+        )
+        if not module:
+            raise ValueError("Module không tồn tại.")
+
+        body = module.render_content()
+        if not module.content_etag:
+            return body, hashlib.sha256(body).hexdigest(), {}
+
+        variants = {}
+        if module.content_br:
+            variants['br'] = module.content_br
+        if module.content_gzip:
+            variants['gzip'] = module.content_gzip
+        return body, module.content_etag, variants
+
+    @staticmethod
+    def rebuild_module_content():
+        """Tính lại ETag + bản nén cho toàn bộ module (dữ liệu ghi trước khi có cột tính sẵn)."""
+        modules = CourseModule.query.all()
+        for module in modules:
+            module.update_content_variants()
+        db.session.commit()
+        return len(modules)
@@ -0,0 +1,149 @@
+import atexit
+import logging
+import os
+import threading
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+
+from app.extensions import db
+from app.models.module_event import ModuleCompletionEvent
+
+logger = logging.getLogger(__name__)
+
+
+class ModuleEventBuffer:
+    """
+    Bộ đệm trong process cho ModuleCompletionEvent, ghi xuống DB theo lô bằng một INSERT executemany.
+
+    record() chỉ thêm vào danh sách trong bộ nhớ (không chạm DB trong request).
+    Một thread nền ghi lô khi đủ MODULE_EVENT_BATCH_SIZE sự kiện hoặc sau MODULE_EVENT_FLUSH_INTERVAL giây;
+    phần còn lại được ghi khi process thoát (atexit). Lỗi ghi chỉ được log, không ảnh hưởng request.
+
+    Lô ghi lỗi được thử lại từng dòng: dòng hỏng (NULL, sai kiểu, vi phạm khóa ngoại...) bị bỏ và log lại
+    thay vì chặn mọi sự kiện sau nó. Chỉ khi DB không ghi được (OperationalError: mất kết nối...) thì
+    phần chưa ghi mới được đưa lại vào bộ đệm; bộ đệm không vượt quá MODULE_EVENT_MAX_PENDING sự kiện.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._events = []
+        self._app = None
+        self._thread = None
+        self._pid = None
+        self.batch_size = 500
+        self.flush_interval = 5.0
+        self.max_pending = 10000
+        self.dropped = 0 # Số sự kiện đã bỏ (bộ đệm đầy hoặc dòng hỏng)
+
+    def init_app(self, app):
+        self._app = app
+        self.batch_size = app.config.get('MODULE_EVENT_BATCH_SIZE', 500)
+        self.flush_interval = app.config.get('MODULE_EVENT_FLUSH_INTERVAL', 5.0)
+        self.max_pending = app.config.get('MODULE_EVENT_MAX_PENDING', 10000)
+        atexit.register(self.flush)
+
+    def _ensure_worker(self):
+        # Thread nền được tạo lười trong từng process (sau khi gunicorn fork worker)
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name='module-event-flusher', daemon=True)
+        self._thread.start()
+
+    def record(self, user_id, course_id, module_id, module_position, completed_course=False):
+        event = {
+            "user_id": user_id,
+            "course_id": course_id,
+            "module_id": module_id,
+            "module_position": module_position,
+            "completed_course": completed_course,
+            "completed_at": datetime.utcnow()
+        }
+        with self._lock:
+            self._events.append(event)
+            self._trim()
+            full = len(self._events) >= self.batch_size
+            self._ensure_worker()
+        if full:
+            self._wakeup.set()
+
+    @property
+    def pending(self):
+        """Số sự kiện đang chờ ghi."""
+        with self._lock:
+            return len(self._events)
+
+    def _trim(self):
+        # Gọi khi đang giữ lock. DB không ghi được trong thời gian dài: bỏ sự kiện cũ nhất thay vì tăng bộ nhớ vô hạn
+        overflow = len(self._events) - self.max_pending
+        if overflow > 0:
+            del self._events[:overflow]
+            self.dropped += overflow
+            logger.warning("Bộ đệm sự kiện hoàn thành module đầy, bỏ %d sự kiện cũ nhất", overflow)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _write_batch(self, batch):
+        """Ghi một lô; trả về (số dòng đã ghi, các dòng chưa ghi được vì DB không sẵn sàng)."""
+        try:
+            db.session.execute(insert(ModuleCompletionEvent), batch)
+            db.session.commit()
+            return len(batch), []
+        except OperationalError:
+            db.session.rollback()
+            logger.warning("DB không sẵn sàng khi ghi sự kiện hoàn thành module", exc_info=True)
+            return 0, batch
+        except Exception:
+            db.session.rollback()
+
+        # Có dòng hỏng trong lô: ghi từng dòng để chỉ bỏ đúng dòng đó
+        written = 0
+        for index, event in enumerate(batch):
+            try:
+                db.session.execute(insert(ModuleCompletionEvent), [event])
+                db.session.commit()
+                written += 1
+            except OperationalError:
+                db.session.rollback()
+                logger.warning("DB không sẵn sàng khi ghi sự kiện hoàn thành module", exc_info=True)
+                return written, batch[index:]
+            except Exception:
+                db.session.rollback()
+                with self._lock:
+                    self.dropped += 1
+                logger.error("Bỏ sự kiện hoàn thành module không hợp lệ: %r", event, exc_info=True)
+        return written, []
+
+    def flush(self):
+        """Ghi toàn bộ sự kiện đang đệm; trả về số sự kiện đã ghi."""
+        with self._lock:
+            events, self._events = self._events, []
+        if not events or self._app is None:
+            return 0
+
+        written = 0
+        with self._app.app_context():
+            for start in range(0, len(events), self.batch_size):
+                count, unwritten = self._write_batch(events[start:start + self.batch_size])
+                written += count
+                if unwritten:
+                    remaining = unwritten + events[start + self.batch_size:]
+                    logger.warning("Đưa lại %d sự kiện hoàn thành module vào bộ đệm để thử ở lần sau", len(remaining))
+                    # Đưa lại vào đầu bộ đệm (trước các sự kiện mới), vẫn giữ giới hạn max_pending
+                    with self._lock:
+                        self._events[:0] = remaining
+                        self._trim()
+                    break
+            db.session.remove()
+        return written
+
+
+# Instance dùng chung trong process
+module_event_buffer = ModuleEventBuffer()
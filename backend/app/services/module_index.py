@@ -0,0 +1,73 @@
+import threading
+
+from app.extensions import cache, db
+from app.models.course import Course
+from app.models.course_module import CourseModule
+from app.services.course_catalog import CATALOG_VERSION_KEY
+
+
+class CourseModuleOrder:
+    """Thứ tự module của một khóa học: module_id -> (vị trí, id module kế tiếp, tiêu đề)."""
+
+    def __init__(self, course_title, modules):
+        self.course_title = course_title
+        self.total = len(modules)
+        self.positions = {}
+        for position, (module_id, title) in enumerate(modules, start=1):
+            next_id = modules[position][0] if position < len(modules) else None
+            self.positions[module_id] = (position, next_id, title)
+
+
+class ModuleOrderIndex:
+    """
+    Cache trong bộ nhớ thứ tự module theo khóa học (nạp bằng 1 query khi cần).
+    Toàn bộ cache bị bỏ khi phiên bản danh mục khóa học thay đổi (mọi thao tác ghi khóa học đều tăng nó).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._orders = {}
+        self._version = None
+
+    def _load(self, course_id):
+        rows = (
+            db.session.query(Course.title, CourseModule.id, CourseModule.title)
+            .outerjoin(CourseModule, CourseModule.course_id == Course.id)
+            .filter(Course.id == course_id)
+            .order_by(CourseModule.module_order, CourseModule.id)
+            .all()
+        )
+        if not rows:
+            return None
+
+        course_title = rows[0][0]
+        modules = [(module_id, title) for _, module_id, title in rows if module_id is not None]
+        return CourseModuleOrder(course_title, modules)
+
+    def get(self, course_id):
+        """Trả về CourseModuleOrder của khóa học, hoặc None nếu khóa học không tồn tại."""
+        version = cache.get(CATALOG_VERSION_KEY)
+        with self._lock:
+            if version != self._version:
+                self._orders = {}
+                self._version = version
+            order = self._orders.get(course_id)
+        if order is not None:
+            return order
+
+        order = self._load(course_id)
+        if order is not None:
+            with self._lock:
+                self._orders[course_id] = order
+        return order
+
+    def invalidate(self, course_id=None):
+        with self._lock:
+            if course_id is None:
+                self._orders = {}
+            else:
+                self._orders.pop(course_id, None)
+
+
+# Instance dùng chung trong process
+module_order_index = ModuleOrderIndex()
@@ -0,0 +1,89 @@
+import logging
+from datetime import datetime
+from app.extensions import db
+from app.models.outbox import AppointmentOutbox
+
+logger = logging.getLogger(__name__)
+
+class NotificationService:
+
+    @staticmethod
+    def record_appointment_event(appointment, event_type, old_status=None):
+        """Ghi sự kiện vào outbox (chưa commit – đi cùng transaction của thay đổi lịch hẹn)."""
+        db.session.add(AppointmentOutbox(
+            appointment=appointment,
+            event_type=event_type,
+            payload={
+                'old_status': old_status,
+                'new_status': appointment.status,
+                'user_id': appointment.user_id,
+                'counselor_id': appointment.counselor_id,
+                'start_time': appointment.start_time.isoformat() if appointment.start_time else None
+            }
+        ))
+
+    @staticmethod
+    def _coalesce(events):
+        """Gộp nhiều sự kiện của cùng một lịch hẹn thành một thông báo (giữ thứ tự xuất hiện)."""
+        notifications = {}
+        for event in events:
+            payload = event.payload or {}
+            current = notifications.get(event.appointment_id)
+            if current is None:
+                current = notifications[event.appointment_id] = {
+                    'appointment_id': event.appointment_id,
+                    'created': False,
+                    'from_status': payload.get('old_status'),
+                    'user_id': payload.get('user_id'),
+                    'counselor_id': payload.get('counselor_id'),
+                    'event_count': 0
+                }
+            current['created'] = current['created'] or event.event_type == 'created'
+            current['to_status'] = payload.get('new_status')
+            current['start_time'] = payload.get('start_time')
+            current['event_count'] += 1
+
+        # Bỏ các lịch hẹn có trạng thái cuối trùng trạng thái đầu (không có gì để báo)
+        return [
+            n for n in notifications.values()
+            if n['created'] or n['from_status'] != n['to_status']
+        ]
+
+    @staticmethod
+    def deliver(notification):
+        """Gửi thông báo tới người đặt lịch và chuyên viên (hiện tại: ghi log)."""
+        if notification['created']:
+            logger.info(
+                "Lịch hẹn mới #%s (người dùng %s, chuyên viên %s) lúc %s – trạng thái %s",
+                notification['appointment_id'], notification['user_id'], notification['counselor_id'],
+                notification['start_time'], notification['to_status']
+            )
+        else:
+            logger.info(
+                "Lịch hẹn #%s đổi trạng thái %s -> %s",
+                notification['appointment_id'], notification['from_status'], notification['to_status']
+            )
+
+    @staticmethod
+    def drain_outbox(batch_size=100):
+        """Xử lý một lô sự kiện chưa gửi. Trả về số sự kiện đã xử lý."""
+        events = (
+            AppointmentOutbox.query
+            .filter(AppointmentOutbox.processed_at.is_(None))
+            .order_by(AppointmentOutbox.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        if not events:
+            return 0
+
+        for notification in NotificationService._coalesce(events):
+            NotificationService.deliver(notification)
+
+        now = datetime.utcnow()
+        for event in events:
+            event.processed_at = now
+        db.session.commit()
+
+        return len(events)
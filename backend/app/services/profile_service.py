@@ -0,0 +1,139 @@
+import hashlib
+from datetime import datetime, timezone
+
+from flask import current_app
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased
+
+from app.extensions import cache, db
+from app.models.appointment import Appointment
+from app.models.counselor import CounselorProfile
+from app.models.course_progress import UserCourseProgress
+from app.models.user import User
+from app.services.role_registry import role_registry
+from app.utils.errors import NotFoundError
+
+# Trạng thái lịch hẹn được coi là "sắp tới"
+UPCOMING_STATUSES = ('pending', 'confirmed')
+
+
+def _profile_cache_key(user_id):
+    return f'profile:{user_id}'
+
+
+class ProfileService:
+
+    @staticmethod
+    def _upcoming_appointment(user_id, counselor_profile_id):
+        """Lịch hẹn sắp tới gần nhất (với tư cách người đặt hoặc chuyên viên)."""
+        patient = aliased(User)
+        counselor = aliased(User)
+        owner = (
+            Appointment.counselor_id == counselor_profile_id
+            if counselor_profile_id else Appointment.user_id == user_id
+        )
+
+        row = (
+            db.session.query(
+                Appointment.id,
+                Appointment.start_time,
+                Appointment.end_time,
+                Appointment.status,
+                patient.name.label('user_name'),
+                counselor.name.label('counselor_name')
+            )
+            .outerjoin(patient, patient.id == Appointment.user_id)
+            .outerjoin(CounselorProfile, CounselorProfile.id == Appointment.counselor_id)
+            .outerjoin(counselor, counselor.id == CounselorProfile.user_id)
+            .filter(owner, Appointment.status.in_(UPCOMING_STATUSES), Appointment.start_time > datetime.utcnow())
+            .order_by(Appointment.start_time)
+            .first()
+        )
+        if not row:
+            return None
+
+        return {
+            "appointment_id": row.id,
+            "start_time": row.start_time.replace(tzinfo=timezone.utc),
+            "end_time": row.end_time.replace(tzinfo=timezone.utc),
+            "status": row.status,
+            "user_name": row.user_name,
+            "counselor_name": row.counselor_name
+        }
+
+    @staticmethod
+    def build_profile(user_id):
+        """Hồ sơ tổng hợp: người dùng + hồ sơ chuyên viên + số khóa học (1 query) + lịch hẹn sắp tới (1 query)."""
+        enrolled = (
+            select(func.count(UserCourseProgress.id))
+            .where(UserCourseProgress.user_id == User.id)
+            .scalar_subquery()
+        )
+        completed = (
+            select(func.count(UserCourseProgress.id))
+            .where(UserCourseProgress.user_id == User.id, UserCourseProgress.is_completed.is_(True))
+            .scalar_subquery()
+        )
+
+        row = (
+            db.session.query(User, CounselorProfile, enrolled.label('enrolled'), completed.label('completed'))
+            .outerjoin(CounselorProfile, CounselorProfile.user_id == User.id)
+            .filter(User.id == user_id)
+            .first()
+        )
+        if not row:
+            raise NotFoundError("USER_NOT_FOUND", "Người dùng không tồn tại.")
+
+        user, counselor_profile, enrolled_count, completed_count = row
+        role = role_registry.name_of(user.role_id)
+
+        upcoming = None
+        if role in ('user', 'counselor'):
+            upcoming = ProfileService._upcoming_appointment(
+                user.id,
+                counselor_profile.id if role == 'counselor' and counselor_profile else None
+            )
+
+        return {
+            "id": user.id,
+            "user_id": user.id,
+            "email": user.email,
+            "name": user.name,
+            "role": role,
+            "role_id": user.role_id,
+            "counselor_profile": counselor_profile.to_dict() if counselor_profile else None,
+            "courses": {
+                "enrolled": enrolled_count or 0,
+                "completed": completed_count or 0
+            },
+            "upcoming_appointment": upcoming
+        }
+
+    @staticmethod
+    def get_profile(user_id):
+        """Trả về (body JSON, etag) của hồ sơ; cache theo từng người dùng."""
+        key = _profile_cache_key(user_id)
+        cached = cache.get(key)
+        if cached:
+            return cached['body'], cached['etag']
+
+        profile = ProfileService.build_profile(user_id)
+        body = current_app.json.dumps({"msg": "Truy cập thành công", "user_id": user_id, "profile": profile})
+        etag = f"{user_id}.{hashlib.sha1(body.encode('utf-8')).hexdigest()[:16]}"
+
+        # Hết hạn sớm hơn nếu lịch hẹn sắp tới bắt đầu trước thời hạn cache
+        timeout = current_app.config.get('PROFILE_CACHE_TIMEOUT', 300)
+        upcoming = profile["upcoming_appointment"]
+        if upcoming:
+            until_start = (upcoming["start_time"] - datetime.now(timezone.utc)).total_seconds()
+            timeout = max(min(timeout, int(until_start)), 1)
+
+        cache.set(key, {'body': body, 'etag': etag}, timeout=timeout)
+        return body, etag
+
+    @staticmethod
+    def invalidate(*user_ids):
+        """Xóa cache hồ sơ – gọi sau khi commit thay đổi liên quan tới các người dùng này."""
+        for user_id in user_ids:
+            if user_id is not None:
+                cache.delete(_profile_cache_key(user_id))
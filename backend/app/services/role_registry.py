@@ -0,0 +1,73 @@
+import threading
+
+from app.extensions import cache, db
+from app.models.role import Role
+
+# Bộ đếm phiên bản bảng roles (dùng chung giữa các worker khi CACHE_BACKEND=redis)
+ROLE_VERSION_KEY = 'roles:version'
+
+
+class RoleRegistry:
+    """
+    Ánh xạ tên vai trò <-> role_id, nạp một lần mỗi process (bảng roles rất nhỏ, gần như bất biến).
+
+    Được nạp lại khi bộ đếm phiên bản thay đổi (invalidate() sau khi ghi roles) hoặc khi gặp
+    tên/id chưa biết (vai trò vừa được thêm ở process khác). Tên/id vẫn không có sau khi nạp lại
+    được ghi nhớ tới phiên bản sau, để token mang vai trò lạ không gây một query mỗi request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_name = {}
+        self._by_id = {}
+        self._misses = set()
+        self._version = None
+        self._loaded = False
+
+    def refresh(self):
+        rows = db.session.query(Role.id, Role.name).all()
+        with self._lock:
+            self._by_name = {name: role_id for role_id, name in rows}
+            self._by_id = {role_id: name for role_id, name in rows}
+            self._misses = set()
+            self._version = cache.get(ROLE_VERSION_KEY)
+            self._loaded = True
+
+    def invalidate(self):
+        """Gọi sau khi commit thay đổi bảng roles."""
+        cache.incr(ROLE_VERSION_KEY)
+        with self._lock:
+            self._loaded = False
+
+    def _ensure_fresh(self):
+        """Nạp lại nếu cần; trả về True nếu vừa nạp."""
+        if not self._loaded or cache.get(ROLE_VERSION_KEY) != self._version:
+            self.refresh()
+            return True
+        return False
+
+    def _lookup(self, mapping_name, key):
+        if key is None:
+            return None
+        refreshed = self._ensure_fresh()
+        value = getattr(self, mapping_name).get(key)
+        if value is None and (mapping_name, key) not in self._misses:
+            if not refreshed:
+                self.refresh()
+                value = getattr(self, mapping_name).get(key)
+            if value is None:
+                with self._lock:
+                    self._misses.add((mapping_name, key))
+        return value
+
+    def id_of(self, name):
+        """role_id của vai trò theo tên, hoặc None."""
+        return self._lookup('_by_name', name)
+
+    def name_of(self, role_id):
+        """Tên vai trò theo role_id, hoặc None."""
+        return self._lookup('_by_id', role_id)
+
+
+# Instance dùng chung trong process
+role_registry = RoleRegistry()
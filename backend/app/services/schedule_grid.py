@@ -0,0 +1,247 @@
+import threading
+from bisect import bisect_left
+from datetime import datetime, time, timedelta, timezone
+from time import monotonic
+from zoneinfo import ZoneInfo
+
+from flask import current_app
+
+from app.extensions import cache
+from app.models.schedule import CounselorSchedule, CounselorScheduleException
+from app.services.slot_index import to_naive_utc
+
+# Bộ đếm phiên bản lịch làm việc (dùng chung giữa các worker khi CACHE_BACKEND=redis)
+SCHEDULE_VERSION_KEY = 'schedules:version'
+
+
+class _CounselorGrid:
+    """Quy tắc lịch làm việc + lưới khung giờ đã tính sẵn của một chuyên viên."""
+
+    def __init__(self, weekly, exceptions):
+        self.weekly = weekly # weekday -> [(start_hour, end_hour)]
+        self.exceptions = exceptions # date -> [(start_hour, end_hour, is_available)]
+        self.ordered = [] # Các giờ bắt đầu (UTC naive) đã sắp xếp
+        self.slots = set() # Cùng dữ liệu, để tra cứu O(1)
+        self.first_day = None
+        self.last_day = None # Không bao gồm
+
+
+class ScheduleGrid:
+    """
+    Lưới khung giờ làm việc (1 tiếng) của từng chuyên viên cho N tuần tới, giữ trong bộ nhớ.
+
+    Lưới của một chuyên viên chỉ được tính lại khi lịch của người đó thay đổi; khi sang ngày mới,
+    lưới được cắt bỏ ngày cũ và nối thêm ngày mới (không tính lại toàn bộ).
+    Chuyên viên chưa khai báo lịch làm việc được coi là không giới hạn giờ.
+
+    Mỗi lần ghi lịch sẽ tăng bộ đếm phiên bản; worker thấy phiên bản khác với lưới của mình
+    sẽ nạp lại toàn bộ (worker vừa ghi chỉ tính lại chuyên viên đó). Bộ đếm được đọc tối đa
+    một lần mỗi SCHEDULE_VERSION_CHECK_INTERVAL giây, không phải mỗi lần tra cứu
+    (get_free_slots gọi is_bookable cho từng khung giờ).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._grids = {}
+        self._version = None
+        self._checked_at = 0.0
+        self._loaded = False
+
+    # --- Cấu hình ---
+    @staticmethod
+    def _tz():
+        return ZoneInfo(current_app.config.get('SCHEDULE_TIMEZONE', 'Asia/Ho_Chi_Minh'))
+
+    @staticmethod
+    def _check_interval():
+        return current_app.config.get('SCHEDULE_VERSION_CHECK_INTERVAL', 1.0)
+
+    @staticmethod
+    def _horizon_days():
+        return 7 * current_app.config.get('SCHEDULE_GRID_WEEKS', 4)
+
+    def _today(self):
+        return datetime.now(self._tz()).date()
+
+    # --- Nạp dữ liệu ---
+    @staticmethod
+    def _load_rules(counselor_id=None):
+        schedules = CounselorSchedule.query
+        exceptions = CounselorScheduleException.query
+        if counselor_id is not None:
+            schedules = schedules.filter_by(counselor_id=counselor_id)
+            exceptions = exceptions.filter_by(counselor_id=counselor_id)
+
+        rules = {}
+        for row in schedules.all():
+            weekly, _ = rules.setdefault(row.counselor_id, ({}, {}))
+            weekly.setdefault(row.weekday, []).append((row.start_hour, row.end_hour))
+        for row in exceptions.all():
+            _, by_date = rules.setdefault(row.counselor_id, ({}, {}))
+            by_date.setdefault(row.date, []).append((row.start_hour, row.end_hour, row.is_available))
+        return rules
+
+    def rebuild(self):
+        """Nạp lại lịch của tất cả chuyên viên và tính lại lưới."""
+        # Đọc phiên bản trước khi nạp: lịch được ghi trong lúc nạp sẽ gây nạp lại ở lần sau
+        version = cache.get(SCHEDULE_VERSION_KEY)
+        checked_at = monotonic()
+        today, days, tz = self._today(), self._horizon_days(), self._tz()
+        grids = {}
+        for counselor_id, (weekly, exceptions) in self._load_rules().items():
+            grid = _CounselorGrid(weekly, exceptions)
+            self._extend(grid, today, today + timedelta(days=days), tz)
+            grids[counselor_id] = grid
+
+        with self._lock:
+            self._grids = grids
+            self._version = version
+            self._checked_at = checked_at
+            self._loaded = True
+
+    def refresh_counselor(self, counselor_id):
+        """Tính lại lưới của một chuyên viên sau khi lịch thay đổi."""
+        if not self._loaded:
+            self.rebuild()
+            return
+
+        rules = self._load_rules(counselor_id).get(counselor_id)
+        grid = None
+        if rules:
+            today = self._today()
+            grid = _CounselorGrid(*rules)
+            self._extend(grid, today, today + timedelta(days=self._horizon_days()), self._tz())
+
+        with self._lock:
+            if grid is None:
+                self._grids.pop(counselor_id, None)
+            else:
+                self._grids[counselor_id] = grid
+
+    def invalidate(self, counselor_id):
+        """Gọi sau khi commit thay đổi lịch của chuyên viên: báo các worker khác và tính lại lưới người đó."""
+        previous = self._version
+        version = cache.incr(SCHEDULE_VERSION_KEY)
+
+        # Chỉ tính lại một chuyên viên khi không bỏ lỡ lần ghi nào khác; ngược lại nạp lại toàn bộ
+        if self._loaded and version is not None and (previous or 0) == version - 1:
+            self.refresh_counselor(counselor_id)
+            with self._lock:
+                self._version = version
+        else:
+            self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._grids = {}
+            self._version = None
+            self._loaded = False
+
+    # --- Tính lưới ---
+    @staticmethod
+    def _day_hours(grid, day):
+        hours = set()
+        for start_hour, end_hour in grid.weekly.get(day.weekday(), []):
+            hours.update(range(start_hour, end_hour))
+
+        exceptions = grid.exceptions.get(day, [])
+        for start_hour, end_hour, is_available in exceptions:
+            if is_available:
+                hours.update(range(start_hour or 0, end_hour or 24))
+        for start_hour, end_hour, is_available in exceptions:
+            if not is_available:
+                hours.difference_update(range(start_hour or 0, end_hour or 24))
+        return sorted(hours)
+
+    def _day_slots(self, grid, day, tz):
+        return [
+            to_naive_utc(datetime.combine(day, time(hour), tzinfo=tz))
+            for hour in self._day_hours(grid, day)
+        ]
+
+    def _extend(self, grid, first_day, last_day, tz):
+        """Bỏ các ngày trước first_day và nối thêm các ngày còn thiếu tới last_day."""
+        if grid.first_day is not None and grid.first_day < first_day:
+            cutoff = to_naive_utc(datetime.combine(first_day, time(0), tzinfo=tz))
+            drop = bisect_left(grid.ordered, cutoff)
+            grid.slots.difference_update(grid.ordered[:drop])
+            del grid.ordered[:drop]
+
+        day = grid.last_day if grid.last_day is not None and grid.last_day > first_day else first_day
+        while day < last_day:
+            new_slots = self._day_slots(grid, day, tz)
+            grid.ordered.extend(new_slots)
+            grid.slots.update(new_slots)
+            day += timedelta(days=1)
+
+        grid.first_day = first_day
+        grid.last_day = max(last_day, grid.last_day or last_day)
+
+    def _is_stale(self):
+        if not self._loaded:
+            return True
+        now = monotonic()
+        if now - self._checked_at < self._check_interval():
+            return False
+        self._checked_at = now
+        return cache.get(SCHEDULE_VERSION_KEY) != self._version
+
+    def _get_grid(self, counselor_id):
+        if self._is_stale():
+            self.rebuild()
+
+        with self._lock:
+            grid = self._grids.get(counselor_id)
+            if grid is not None:
+                today = self._today()
+                if grid.first_day != today:
+                    self._extend(grid, today, today + timedelta(days=self._horizon_days()), self._tz())
+            return grid
+
+    def _hourly_slots(self, after):
+        """Mọi giờ tròn (UTC naive) từ after tới hết phạm vi lưới, căn giống slot_index.free_slots."""
+        end = to_naive_utc(datetime.combine(self._today() + timedelta(days=self._horizon_days()), time(0), tzinfo=self._tz()))
+        slot = after.replace(minute=0, second=0, microsecond=0)
+        if slot < after:
+            slot += timedelta(hours=1)
+        while slot < end:
+            yield slot
+            slot += timedelta(hours=1)
+
+    # --- Tra cứu ---
+    def is_bookable(self, counselor_id, start_time):
+        """Khung giờ bắt đầu lúc start_time có nằm trong giờ làm việc không (O(1) trong lưới)."""
+        grid = self._get_grid(counselor_id)
+        if grid is None:
+            return True
+
+        start_time = to_naive_utc(start_time)
+        tz = self._tz()
+        local_start = start_time.replace(tzinfo=timezone.utc).astimezone(tz)
+        if local_start.minute or local_start.second or local_start.microsecond:
+            return False
+
+        if grid.first_day <= local_start.date() < grid.last_day:
+            return start_time in grid.slots
+
+        # Ngoài phạm vi lưới: tính trực tiếp từ quy tắc
+        return local_start.hour in self._day_hours(grid, local_start.date())
+
+    def iter_slots(self, counselor_id, after):
+        """
+        Duyệt các khung giờ làm việc (UTC naive) từ thời điểm after, theo thứ tự tăng dần.
+
+        Chuyên viên chưa có lịch: mọi giờ tròn tới hết phạm vi lưới (khớp với is_bookable và free-slots).
+        """
+        grid = self._get_grid(counselor_id)
+        after = to_naive_utc(after)
+        if grid is None:
+            return self._hourly_slots(after)
+
+        with self._lock:
+            ordered = grid.ordered[bisect_left(grid.ordered, after):]
+        return iter(ordered)
+
+
+# Instance dùng chung trong process
+schedule_grid = ScheduleGrid()
@@ -0,0 +1,158 @@
+import heapq
+from itertools import repeat
+from datetime import date, datetime, timezone
+
+from app.extensions import db
+from app.models.counselor import CounselorProfile
+from app.models.schedule import CounselorSchedule, CounselorScheduleException
+from app.models.user import User
+from app.services.schedule_grid import schedule_grid
+from app.services.slot_index import SLOT_DURATION, slot_index
+from app.utils.errors import BusinessError, NotFoundError
+
+class ScheduleService:
+
+    @staticmethod
+    def _get_profile(counselor_user_id):
+        profile = CounselorProfile.query.filter_by(user_id=counselor_user_id).first()
+        if not profile:
+            raise NotFoundError("COUNSELOR_NOT_FOUND", "Chuyên viên không tồn tại.")
+        return profile
+
+    @staticmethod
+    def _validate_items(items, required_keys):
+        """weekly/exceptions phải là danh sách các object có đủ các khóa bắt buộc."""
+        if items is None:
+            return []
+        if not isinstance(items, list) or not all(
+            isinstance(item, dict) and all(key in item for key in required_keys) for item in items
+        ):
+            raise BusinessError(
+                "INVALID_SCHEDULE_FORMAT",
+                f"Lịch làm việc phải là danh sách object có các trường: {', '.join(required_keys)}."
+            )
+        return items
+
+    @staticmethod
+    def _validate_hours(start_hour, end_hour, allow_empty=False):
+        if allow_empty and start_hour is None and end_hour is None:
+            return
+        if (
+            not isinstance(start_hour, int) or not isinstance(end_hour, int)
+            or isinstance(start_hour, bool) or isinstance(end_hour, bool)
+            or not 0 <= start_hour < end_hour <= 24
+        ):
+            raise BusinessError("INVALID_SCHEDULE_HOURS", "Giờ làm việc không hợp lệ (0 <= bắt đầu < kết thúc <= 24).")
+
+    @staticmethod
+    def get_schedule(counselor_user_id):
+        """Lấy lịch làm việc hàng tuần và các ngoại lệ của chuyên viên."""
+        profile = ScheduleService._get_profile(counselor_user_id)
+
+        weekly = (
+            CounselorSchedule.query.filter_by(counselor_id=profile.id)
+            .order_by(CounselorSchedule.weekday, CounselorSchedule.start_hour)
+            .all()
+        )
+        exceptions = (
+            CounselorScheduleException.query.filter_by(counselor_id=profile.id)
+            .filter(CounselorScheduleException.date >= date.today())
+            .order_by(CounselorScheduleException.date)
+            .all()
+        )
+
+        return {
+            "counselor_user_id": counselor_user_id,
+            "weekly": [w.to_dict() for w in weekly],
+            "exceptions": [e.to_dict() for e in exceptions]
+        }
+
+    @staticmethod
+    def update_schedule(counselor_user_id, weekly, exceptions, current_user_id, role):
+        """Thay thế toàn bộ lịch làm việc của chuyên viên và tính lại lưới khung giờ của người đó."""
+        if role == 'counselor' and int(counselor_user_id) != int(current_user_id):
+            raise BusinessError("SCHEDULE_FORBIDDEN", "Bạn chỉ được cập nhật lịch làm việc của mình.")
+
+        profile = ScheduleService._get_profile(counselor_user_id)
+        weekly = ScheduleService._validate_items(weekly, ('weekday', 'start_hour', 'end_hour'))
+        exceptions = ScheduleService._validate_items(exceptions, ('date',))
+
+        weekly_rows = []
+        for item in weekly:
+            weekday = item['weekday']
+            if not isinstance(weekday, int) or isinstance(weekday, bool) or not 0 <= weekday <= 6:
+                raise BusinessError("INVALID_SCHEDULE_WEEKDAY", "Thứ trong tuần không hợp lệ (0-6).")
+            ScheduleService._validate_hours(item.get('start_hour'), item.get('end_hour'))
+            weekly_rows.append(CounselorSchedule(
+                counselor_id=profile.id,
+                weekday=weekday,
+                start_hour=item['start_hour'],
+                end_hour=item['end_hour']
+            ))
+
+        exception_rows = []
+        for item in exceptions:
+            try:
+                exception_date = date.fromisoformat(item['date'])
+            except (TypeError, ValueError):
+                raise BusinessError("INVALID_DATETIME_FORMAT", "Định dạng ngày không hợp lệ.")
+            ScheduleService._validate_hours(item.get('start_hour'), item.get('end_hour'), allow_empty=True)
+            if not isinstance(item.get('is_available', False), bool):
+                raise BusinessError("INVALID_SCHEDULE_FORMAT", "is_available phải là true/false.")
+            exception_rows.append(CounselorScheduleException(
+                counselor_id=profile.id,
+                date=exception_date,
+                start_hour=item.get('start_hour'),
+                end_hour=item.get('end_hour'),
+                is_available=item.get('is_available', False)
+            ))
+
+        CounselorSchedule.query.filter_by(counselor_id=profile.id).delete()
+        CounselorScheduleException.query.filter_by(counselor_id=profile.id).delete()
+        db.session.add_all(weekly_rows + exception_rows)
+        db.session.commit()
+
+        # Tính lại lưới của chuyên viên này; các worker khác nạp lại khi thấy phiên bản mới
+        schedule_grid.invalidate(profile.id)
+
+        return ScheduleService.get_schedule(counselor_user_id)
+
+    @staticmethod
+    def next_available_slot(specialization=None):
+        """
+        Tìm khung giờ trống sớm nhất trong các chuyên viên (lọc theo chuyên môn).
+
+        Lưới của từng chuyên viên đã được sắp xếp, nên chỉ cần trộn chúng bằng heap
+        và bỏ qua các khung đã có lịch xác nhận. Chuyên viên chưa khai báo lịch làm việc
+        nhận mọi giờ tròn, giống get_free_slots và kiểm tra khi đặt lịch.
+        """
+        query = db.session.query(CounselorProfile.id, User.id, User.name, User.email).join(
+            User, User.id == CounselorProfile.user_id
+        )
+        if specialization:
+            query = query.filter(CounselorProfile.specialization.ilike(f"%{specialization}%"))
+
+        counselors = {profile_id: (user_id, name or email) for profile_id, user_id, name, email in query.all()}
+        now = datetime.now(timezone.utc)
+
+        # Gắn profile_id ngay khi tạo từng luồng (generator đọc biến vòng lặp muộn => sai chuyên viên)
+        streams = [
+            zip(schedule_grid.iter_slots(profile_id, now), repeat(profile_id))
+            for profile_id in counselors
+        ]
+
+        for slot_start, profile_id in heapq.merge(*streams):
+            if slot_start <= now.replace(tzinfo=None):
+                continue
+            if slot_index.find_conflict(profile_id, slot_start, slot_start + SLOT_DURATION):
+                continue
+
+            counselor_user_id, name = counselors[profile_id]
+            return {
+                "counselor_user_id": counselor_user_id,
+                "name": name,
+                "start_time": slot_start.replace(tzinfo=timezone.utc).isoformat(),
+                "end_time": (slot_start + SLOT_DURATION).replace(tzinfo=timezone.utc).isoformat()
+            }
+
+        return None
@@ -0,0 +1,204 @@
+import threading
+from bisect import bisect_left, insort
+from datetime import timedelta, timezone
+from time import monotonic
+
+from flask import current_app
+
+from app.extensions import cache, db
+from app.models.appointment import Appointment
+
+SLOT_DURATION = timedelta(hours=1)
+
+# Bộ đếm phiên bản lịch đã xác nhận (dùng chung giữa các worker khi CACHE_BACKEND=redis)
+SLOT_VERSION_KEY = 'slots:version'
+
+
+def to_naive_utc(value):
+    """Chuẩn hóa datetime về UTC không kèm tzinfo (giống cách DB lưu)."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class CounselorSlotIndex:
+    """
+    Chỉ mục trong bộ nhớ các khung giờ đã 'confirmed' của từng chuyên viên.
+
+    Mỗi chuyên viên (counselor_profile.id) có một danh sách (start, end, appointment_id)
+    sắp xếp theo start, cho phép kiểm tra trùng lịch bằng bisect (O(log n)).
+    Chỉ mục được nạp từ DB ở lần dùng đầu tiên của mỗi process và được đồng bộ
+    khi trạng thái lịch hẹn thay đổi. DB (SELECT ... FOR UPDATE) vẫn là nguồn quyết định cuối cùng.
+
+    Mỗi lần add/remove tăng bộ đếm phiên bản; worker thấy phiên bản khác sẽ nạp lại toàn bộ.
+    Bộ đếm được đọc tối đa một lần mỗi SLOT_INDEX_VERSION_CHECK_INTERVAL giây, trừ khi gọi với verify=True.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._intervals = {}
+        self._version = None
+        self._checked_at = 0.0
+        self._loaded = False
+
+    def rebuild(self):
+        """Nạp lại toàn bộ chỉ mục từ bảng appointments."""
+        # Đọc phiên bản trước khi nạp: lịch được ghi trong lúc nạp sẽ gây nạp lại ở lần sau
+        version = cache.get(SLOT_VERSION_KEY)
+        checked_at = monotonic()
+        rows = (
+            db.session.query(
+                Appointment.id,
+                Appointment.counselor_id,
+                Appointment.start_time,
+                Appointment.end_time
+            )
+            .filter(Appointment.status == 'confirmed')
+            .order_by(Appointment.counselor_id, Appointment.start_time)
+            .all()
+        )
+
+        intervals = {}
+        for appointment_id, counselor_id, start_time, end_time in rows:
+            intervals.setdefault(counselor_id, []).append(
+                (to_naive_utc(start_time), to_naive_utc(end_time), appointment_id)
+            )
+
+        with self._lock:
+            self._intervals = intervals
+            self._version = version
+            self._checked_at = checked_at
+            self._loaded = True
+
+    def refresh_counselor(self, counselor_id):
+        """Nạp lại khung giờ đã xác nhận của một chuyên viên (khi phát hiện chỉ mục bị cũ)."""
+        if not self._loaded:
+            self.rebuild()
+            return
+
+        rows = (
+            db.session.query(Appointment.id, Appointment.start_time, Appointment.end_time)
+            .filter(Appointment.counselor_id == counselor_id, Appointment.status == 'confirmed')
+            .order_by(Appointment.start_time)
+            .all()
+        )
+        slots = [
+            (to_naive_utc(start_time), to_naive_utc(end_time), appointment_id)
+            for appointment_id, start_time, end_time in rows
+        ]
+
+        with self._lock:
+            if slots:
+                self._intervals[counselor_id] = slots
+            else:
+                self._intervals.pop(counselor_id, None)
+
+    def reset(self):
+        """Xóa chỉ mục; sẽ được nạp lại ở lần dùng tiếp theo."""
+        with self._lock:
+            self._intervals = {}
+            self._version = None
+            self._loaded = False
+
+    def _ensure_loaded(self, verify=False):
+        """Nạp lại nếu chưa nạp hoặc worker khác đã đổi lịch (verify=True: đọc bộ đếm ngay)."""
+        if not self._loaded:
+            self.rebuild()
+            return
+
+        now = monotonic()
+        if not verify and now - self._checked_at < current_app.config.get('SLOT_INDEX_VERSION_CHECK_INTERVAL', 1.0):
+            return
+        self._checked_at = now
+        if cache.get(SLOT_VERSION_KEY) != self._version:
+            self.rebuild()
+
+    def _publish(self):
+        """Gọi sau khi cập nhật chỉ mục cục bộ: báo các worker khác nạp lại."""
+        previous = self._version
+        version = cache.incr(SLOT_VERSION_KEY)
+
+        # Giữ chỉ mục nếu không bỏ lỡ lần ghi nào của worker khác; ngược lại nạp lại ở lần dùng sau
+        if version is not None and (previous or 0) == version - 1:
+            with self._lock:
+                self._version = version
+        else:
+            self.reset()
+
+    def add(self, counselor_id, start_time, end_time, appointment_id):
+        self._ensure_loaded()
+        with self._lock:
+            slots = self._intervals.setdefault(counselor_id, [])
+            if not any(entry[2] == appointment_id for entry in slots):
+                insort(slots, (to_naive_utc(start_time), to_naive_utc(end_time), appointment_id))
+        self._publish()
+
+    def remove(self, counselor_id, appointment_id):
+        self._ensure_loaded()
+        with self._lock:
+            slots = self._intervals.get(counselor_id)
+            if slots:
+                self._intervals[counselor_id] = [s for s in slots if s[2] != appointment_id]
+        self._publish()
+
+    def find_conflict(self, counselor_id, start_time, end_time, exclude_id=None, verify=False):
+        """
+        Trả về appointment_id đầu tiên trùng với [start_time, end_time), hoặc None.
+
+        verify=True đối chiếu bộ đếm phiên bản trước khi tra (dùng khi kết quả quyết định từ chối đặt lịch).
+        """
+        self._ensure_loaded(verify)
+        start_time, end_time = to_naive_utc(start_time), to_naive_utc(end_time)
+
+        with self._lock:
+            slots = self._intervals.get(counselor_id, [])
+            # Các khoảng có start < end_time nằm trước vị trí i; duyệt lùi tới khi end <= start_time
+            i = bisect_left(slots, (end_time,))
+            while i > 0:
+                i -= 1
+                slot_start, slot_end, appointment_id = slots[i]
+                if slot_end <= start_time:
+                    break
+                if appointment_id != exclude_id and slot_start < end_time and slot_end > start_time:
+                    return appointment_id
+        return None
+
+    def free_slots(self, counselor_id, range_start, range_end, duration=SLOT_DURATION):
+        """Liệt kê các khung giờ trống (căn theo giờ tròn) trong [range_start, range_end)."""
+        self._ensure_loaded()
+        range_start, range_end = to_naive_utc(range_start), to_naive_utc(range_end)
+
+        cursor = range_start.replace(minute=0, second=0, microsecond=0)
+        if cursor < range_start:
+            cursor += timedelta(hours=1)
+
+        with self._lock:
+            slots = self._intervals.get(counselor_id, [])
+            # Bắt đầu từ khoảng có thể chồng lên range_start (lùi lại 1 để bắt khoảng đang diễn ra)
+            i = max(bisect_left(slots, (range_start,)) - 1, 0)
+            busy = slots[i:bisect_left(slots, (range_end,))]
+
+        free = []
+        j = 0
+        while cursor + duration <= range_end:
+            slot_end = cursor + duration
+            while j < len(busy) and busy[j][1] <= cursor:
+                j += 1
+
+            # Kiểm tra các khoảng bận còn lại có chồng lên [cursor, slot_end)
+            k = j
+            overlaps = False
+            while k < len(busy) and busy[k][0] < slot_end:
+                if busy[k][1] > cursor:
+                    overlaps = True
+                    break
+                k += 1
+
+            if not overlaps:
+                free.append((cursor, slot_end))
+            cursor = slot_end
+        return free
+
+
+# Instance dùng chung trong process
+slot_index = CounselorSlotIndex()
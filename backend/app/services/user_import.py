@@ -0,0 +1,160 @@
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app
+from sqlalchemy import func, insert
+from werkzeug.security import generate_password_hash
+
+from app.extensions import db
+from app.models.user import User
+from app.services.appointment_service import AppointmentService
+from app.services.role_registry import role_registry
+
+REJECT_FIELDS = ('line', 'email', 'reason')
+
+
+def _hash_password(args):
+    # Chạy trong process con: chỉ dùng werkzeug, không cần app context
+    password, method, salt_length = args
+    return generate_password_hash(password, method, salt_length)
+
+
+class UserImporter:
+    """
+    Nhập tài khoản hàng loạt từ CSV (cột: email, password, name, role).
+
+    Mỗi lô: kiểm tra email đã tồn tại bằng một truy vấn IN, băm mật khẩu song song trên
+    một process pool, rồi chèn bằng một INSERT executemany và commit. Dòng bị từ chối
+    được ghi vào file rejects (line, email, reason) mà không dừng cả quá trình.
+    """
+
+    def __init__(self, batch_size=None, workers=None):
+        config = current_app.config
+        self.batch_size = batch_size or config.get('USER_IMPORT_BATCH_SIZE', 1000)
+        self.workers = workers or config.get('USER_IMPORT_WORKERS') or os.cpu_count() or 1
+        self.method = config.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+        self.salt_length = config.get('PASSWORD_SALT_LENGTH', 16)
+        self.imported = 0
+        self.rejected = 0
+        self._seen = set()
+        self._roles = {}
+        self._rejects = None
+
+    def _reject(self, line_number, email, reason):
+        self.rejected += 1
+        self._rejects.writerow({"line": line_number, "email": email, "reason": reason})
+
+    def _role_id(self, name):
+        # Mỗi tên vai trò chỉ tra registry một lần cho cả file
+        if name not in self._roles:
+            self._roles[name] = role_registry.id_of(name)
+        return self._roles[name]
+
+    def _validate(self, line_number, row):
+        # So khớp email không phân biệt hoa thường (trùng trong file và với CSDL)
+        email = (row.get('email') or '').strip().lower()
+        password = row.get('password') or ''
+        role_name = (row.get('role') or 'user').strip()
+
+        if not email or '@' not in email:
+            return self._reject(line_number, email, "Email không hợp lệ.")
+        if not password:
+            return self._reject(line_number, email, "Thiếu mật khẩu.")
+        role_id = self._role_id(role_name)
+        if not role_id:
+            return self._reject(line_number, email, f"Vai trò '{role_name}' không tồn tại trong hệ thống.")
+        if email in self._seen:
+            return self._reject(line_number, email, "Email bị trùng trong file.")
+
+        self._seen.add(email)
+        return {
+            "line": line_number,
+            "email": email,
+            "password": password,
+            "name": (row.get('name') or '').strip() or None,
+            "role_id": role_id
+        }
+
+    def _flush(self, pool, batch):
+        if not batch:
+            return
+
+        existing = {
+            email for (email,) in
+            db.session.query(func.lower(User.email)).filter(func.lower(User.email).in_([record['email'] for record in batch]))
+        }
+        records = []
+        for record in batch:
+            if record['email'] in existing:
+                self._reject(record['line'], record['email'], "Email đã tồn tại.")
+            else:
+                records.append(record)
+        if not records:
+            return
+
+        hashes = pool.map(
+            _hash_password,
+            [(record['password'], self.method, self.salt_length) for record in records],
+            chunksize=max(len(records) // (self.workers * 4), 1)
+        )
+        rows = [
+            {
+                "email": record['email'],
+                "name": record['name'],
+                "role_id": record['role_id'],
+                "password_hash": password_hash,
+                "is_active": True
+            }
+            for record, password_hash in zip(records, hashes)
+        ]
+
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(User), rows)
+            self.imported += len(rows)
+        except Exception:
+            # Lô lỗi (vd. email vừa được tạo ở nơi khác): chèn lại từng dòng để xác định dòng lỗi
+            for record, row in zip(records, rows):
+                try:
+                    with db.session.begin_nested():
+                        db.session.execute(insert(User), [row])
+                    self.imported += 1
+                except Exception as e:
+                    self._reject(record['line'], record['email'], f"Lỗi CSDL: {e.__class__.__name__}")
+        db.session.commit()
+
+    def run(self, source, rejects_file):
+        """Nhập từ file CSV đã mở (text); trả về báo cáo kèm thông lượng."""
+        started = time.perf_counter()
+        self._rejects = csv.DictWriter(rejects_file, fieldnames=REJECT_FIELDS)
+        self._rejects.writeheader()
+
+        reader = csv.DictReader(source)
+        batch = []
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            # Dòng 1 là header
+            for line_number, row in enumerate(reader, start=2):
+                record = self._validate(line_number, row)
+                if record:
+                    batch.append(record)
+                if len(batch) >= self.batch_size:
+                    self._flush(pool, batch)
+                    batch = []
+            self._flush(pool, batch)
+
+        if self.imported and self._roles.get('counselor'):
+            AppointmentService.invalidate_counselor_directory()
+
+        elapsed = time.perf_counter() - started
+        return {
+            "imported": self.imported,
+            "rejected": self.rejected,
+            "seconds": round(elapsed, 2),
+            "rows_per_second": round((self.imported + self.rejected) / elapsed, 1) if elapsed else None
+        }
+
+
+def import_users(source, rejects_file, batch_size=None, workers=None):
+    return UserImporter(batch_size, workers).run(source, rejects_file)
@@ -1,9 +1,12 @@
 from flask import current_app
 from app.extensions import db
 from app.models.user import User
-from app.models.role import Role
 from flask_jwt_extended import create_access_token
 from app.models.counselor import CounselorProfile
+from app.services.appointment_service import AppointmentService
+from app.services.role_registry import role_registry
+from app.services.profile_service import ProfileService
+from app.utils.passwords import HashingBusyError
 
 class UserService:
 
@@ -14,15 +17,18 @@ class UserService:
             raise ValueError("Email đã tồn tại.")
 
         # Lấy Role: Nếu có role_name, tìm role đó. Nếu không, dùng 'user'.
-        target_role = Role.query.filter_by(name=role_name).first()
-        if not target_role:
+        target_role_id = role_registry.id_of(role_name)
+        if not target_role_id:
             raise Exception(f"Vai trò '{role_name}' không tồn tại trong hệ thống.")
 
-        new_user = User(email=email, name=name, role_id=target_role.id)
+        new_user = User(email=email, name=name, role_id=target_role_id)
         new_user.set_password(password)
 
         db.session.add(new_user)
         db.session.commit()
+
+        if role_name == 'counselor':
+            AppointmentService.invalidate_counselor_directory()
         
         return new_user
 
@@ -32,12 +38,24 @@ class UserService:
         user = User.query.filter_by(email=email).first()
 
         if user and user.check_password(password):
+            # Hash cũ (tham số băm đã đổi trong Config): băm lại bằng mật khẩu vừa xác thực.
+            # Chỉ là tối ưu: pool băm đang bận thì bỏ qua, lần đăng nhập sau sẽ băm lại.
+            if user.password_needs_rehash():
+                try:
+                    user.set_password(password)
+                    db.session.commit()
+                except HashingBusyError:
+                    db.session.rollback()
+
             # Lấy vai trò của người dùng
-            user_role_name = user.role.name
+            user_role_name = role_registry.name_of(user.role_id)
             
             # Tạo Access Token
-            # Thêm role_name vào claims để JWT chứa thông tin phân quyền
-            access_token = create_access_token(identity=str(user.id), additional_claims={'role': user_role_name})
+            # Thêm role_name + role_id vào claims để JWT chứa thông tin phân quyền
+            access_token = create_access_token(
+                identity=str(user.id),
+                additional_claims={'role': user_role_name, 'role_id': user.role_id}
+            )
             
             return {
                 'user_id': user.id,
@@ -53,7 +71,7 @@ class UserService:
         """Cập nhật/Tạo CounselorProfile cho một User."""
         user = User.query.get(user_id)
 
-        if not user or user.role.name != 'counselor':
+        if not user or user.role_id != role_registry.id_of('counselor'):
              raise ValueError("Người dùng không tồn tại hoặc không phải là chuyên viên.")
              
         profile = CounselorProfile.query.filter_by(user_id=user_id).first()
@@ -66,4 +84,6 @@ class UserService:
         profile.contact_info = contact_info
         
         db.session.commit()
+        AppointmentService.invalidate_counselor_directory()
+        ProfileService.invalidate(user_id)
         return profile.to_dict() # Giả sử CounselorProfile có hàm to_dict
\ No newline at end of file
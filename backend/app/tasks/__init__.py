@@ -0,0 +1,3 @@
+from . import notifications
+from . import analytics
+from . import recommendations
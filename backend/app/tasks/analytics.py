@@ -0,0 +1,7 @@
+from app.extensions import celery
+from app.services.course_analytics import CourseAnalyticsService
+
+@celery.task(name='courses.refresh_analytics')
+def refresh_course_analytics():
+    """Tính lại bảng phễu khóa học (chạy định kỳ bởi beat)."""
+    return CourseAnalyticsService.refresh()
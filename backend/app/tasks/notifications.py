@@ -0,0 +1,23 @@
+import logging
+from app.extensions import celery
+from app.services.notification_service import NotificationService
+
+logger = logging.getLogger(__name__)
+
+# Số sự kiện outbox xử lý mỗi lần chạy task
+OUTBOX_BATCH_SIZE = 100
+
+@celery.task(name='appointments.dispatch_outbox')
+def dispatch_appointment_outbox(batch_size=OUTBOX_BATCH_SIZE):
+    """Gửi thông báo từ outbox theo lô; nếu lô đầy thì tự xếp lịch chạy tiếp."""
+    processed = NotificationService.drain_outbox(batch_size)
+    if processed == batch_size:
+        dispatch_appointment_outbox.delay(batch_size)
+    return processed
+
+def schedule_outbox_dispatch():
+    """Đẩy task gửi outbox sau khi commit; lỗi broker không được làm hỏng request (beat sẽ quét lại)."""
+    try:
+        dispatch_appointment_outbox.delay()
+    except Exception:
+        logger.warning("Không thể đẩy task gửi thông báo lịch hẹn", exc_info=True)
@@ -0,0 +1,7 @@
+from app.extensions import celery
+from app.services.course_recommendations import CourseRecommendationService
+
+@celery.task(name='courses.refresh_recommendations')
+def refresh_course_recommendations():
+    """Tính lại bảng gợi ý khóa học (chạy định kỳ bởi beat)."""
+    return CourseRecommendationService.refresh()
@@ -0,0 +1,122 @@
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class InProcessCache:
+    """Cache trong bộ nhớ của process hiện tại (mặc định)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, timeout=None):
+        expires_at = time.monotonic() + timeout if timeout else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+
+    def incr(self, key):
+        with self._lock:
+            value, expires_at = self._data.get(key, (0, None))
+            self._data[key] = (value + 1, expires_at)
+            return value + 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisCache:
+    """Cache dùng chung giữa nhiều worker qua Redis (giá trị được lưu dạng JSON)."""
+
+    def __init__(self, url, prefix='cache:'):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def get(self, key):
+        raw = self._client.get(self._prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, timeout=None):
+        self._client.set(self._prefix + key, json.dumps(value), ex=timeout)
+
+    def incr(self, key):
+        return self._client.incr(self._prefix + key)
+
+    def delete(self, key):
+        self._client.delete(self._prefix + key)
+
+    def clear(self):
+        for key in self._client.scan_iter(self._prefix + '*'):
+            self._client.delete(key)
+
+
+class Cache:
+    """
+    Lớp cache có thể thay backend: CACHE_BACKEND = 'memory' (mặc định) hoặc 'redis'.
+    Lỗi từ backend không làm hỏng request: get trả về None, set/delete bị bỏ qua (có log).
+    """
+
+    def __init__(self):
+        self.backend = InProcessCache()
+
+    def init_app(self, app):
+        backend = app.config.get('CACHE_BACKEND', 'memory')
+        if backend == 'redis':
+            self.backend = RedisCache(
+                app.config['CACHE_REDIS_URL'],
+                prefix=app.config.get('CACHE_KEY_PREFIX', 'cache:')
+            )
+        else:
+            self.backend = InProcessCache()
+        app.extensions['cache'] = self
+
+    def get(self, key):
+        try:
+            return self.backend.get(key)
+        except Exception:
+            logger.warning("Cache get failed for %s", key, exc_info=True)
+            return None
+
+    def set(self, key, value, timeout=None):
+        try:
+            self.backend.set(key, value, timeout)
+        except Exception:
+            logger.warning("Cache set failed for %s", key, exc_info=True)
+
+    def incr(self, key):
+        """Tăng bộ đếm (nguyên tử với Redis). Trả về None nếu backend lỗi."""
+        try:
+            return self.backend.incr(key)
+        except Exception:
+            logger.warning("Cache incr failed for %s", key, exc_info=True)
+            return None
+
+    def delete(self, key):
+        try:
+            self.backend.delete(key)
+        except Exception:
+            logger.warning("Cache delete failed for %s", key, exc_info=True)
+
+    def clear(self):
+        self.backend.clear()
@@ -0,0 +1,83 @@
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError: # brotli là tùy chọn; thiếu thì chỉ nén gzip
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/x-ndjson',
+    'text/html',
+    'text/plain',
+    'text/csv',
+    'text/calendar',
+}
+
+
+class Compress:
+    """
+    Nén gzip/brotli các response đủ lớn theo Accept-Encoding của client (after_request).
+
+    Bỏ qua response dạng stream (SSE, export), response đã có Content-Encoding (nội dung module
+    nén sẵn), khác 200 và response nhỏ hơn COMPRESS_MIN_SIZE. ETag mạnh được chuyển thành ETag yếu
+    vì body đã bị mã hóa lại; If-None-Match vẫn khớp nhờ so sánh yếu.
+    """
+
+    def __init__(self):
+        self.min_size = 1024
+        self.gzip_level = 6
+        self.brotli_quality = 4
+
+    def init_app(self, app):
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', 1024)
+        self.gzip_level = app.config.get('COMPRESS_GZIP_LEVEL', 6)
+        self.brotli_quality = app.config.get('COMPRESS_BROTLI_QUALITY', 4)
+        if app.config.get('COMPRESS_ENABLED', True):
+            app.after_request(self.after_request)
+        app.extensions['compress'] = self
+
+    def _choose_encoding(self, accept_encodings):
+        encoding, best_quality = None, 0
+        for candidate in ('br', 'gzip'):
+            if candidate == 'br' and brotli is None:
+                continue
+            quality = accept_encodings[candidate]
+            if quality > best_quality:
+                encoding, best_quality = candidate, quality
+        return encoding
+
+    def _compress(self, encoding, data):
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, compresslevel=self.gzip_level)
+
+    def after_request(self, response):
+        response.vary.add('Accept-Encoding')
+        if (
+            response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or 'no-transform' in (response.headers.get('Cache-Control') or '')
+        ):
+            return response
+
+        encoding = self._choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        response.set_data(self._compress(encoding, data))
+        response.content_encoding = encoding
+
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
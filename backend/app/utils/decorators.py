@@ -1,29 +1,76 @@
 from functools import wraps
-from flask import jsonify
+from typing import NamedTuple, Optional
+
+from flask import jsonify, request
 from flask_jwt_extended import get_jwt, verify_jwt_in_request
 
+from app.services.role_registry import role_registry
+
+# Claims được lưu trên request (không dùng g: app context có thể sống lâu hơn một request)
+CLAIMS_ENVIRON_KEY = 'app.auth_claims'
+
+
+class AuthClaims(NamedTuple):
+    """Claims đã kiểm tra kiểu của người dùng trong request hiện tại."""
+    user_id: int
+    role: Optional[str]
+    role_id: Optional[int]
+
+
+def current_claims():
+    """
+    Claims của request hiện tại; JWT chỉ được giải mã + kiểm tra chữ ký một lần mỗi request.
+
+    Dùng lại kết quả của @jwt_required nếu đã chạy, nếu không thì tự xác minh.
+    Trả về None khi không có token (route @jwt_required(optional=True)).
+    """
+    if CLAIMS_ENVIRON_KEY in request.environ:
+        return request.environ[CLAIMS_ENVIRON_KEY]
+
+    try:
+        jwt_data = get_jwt()
+    except RuntimeError: # Chưa có @jwt_required phía trước
+        verify_jwt_in_request()
+        jwt_data = get_jwt()
+
+    claims = None
+    if jwt_data:
+        role = jwt_data.get('role')
+        role_id = jwt_data.get('role_id')
+        claims = AuthClaims(
+            user_id=int(jwt_data['sub']),
+            role=role,
+            # Token cấp trước khi có claim role_id (id_of(None) không chạm DB)
+            role_id=int(role_id) if role_id is not None else role_registry.id_of(role)
+        )
+    request.environ[CLAIMS_ENVIRON_KEY] = claims
+    return claims
+
+
 def role_required(required_roles):
     """
     Decorator tùy chỉnh yêu cầu vai trò người dùng cụ thể.
     @role_required(['admin', 'counselor'])
     """
+    if isinstance(required_roles, str):
+        required_roles = [required_roles]
+    required_roles = frozenset(required_roles)
+
     def wrapper(fn):
         @wraps(fn)
         def decorator(*args, **kwargs):
-            # 1. Xác minh JWT
+            # 1. Xác minh JWT (dùng lại kết quả của @jwt_required nếu có)
             try:
-                verify_jwt_in_request()
+                claims = current_claims()
             except Exception:
                 return jsonify(msg="Thiếu hoặc Token không hợp lệ"), 401
+            if claims is None:
+                return jsonify(msg="Thiếu hoặc Token không hợp lệ"), 401
 
-            # 2. Lấy Claims và Role
-            claims = get_jwt()
-            user_role = claims.get("role")
-
-            # 3. Kiểm tra vai trò
-            if user_role not in required_roles:
+            # 2. Kiểm tra vai trò
+            if claims.role not in required_roles:
                 return jsonify(msg="Truy cập bị từ chối: Không có quyền"), 403
 
             return fn(*args, **kwargs)
         return decorator
-    return wrapper
\ No newline at end of file
+    return wrapper
@@ -0,0 +1,135 @@
+import json
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class InProcessSubscription:
+    """Hàng đợi có giới hạn cho một kết nối; khi đầy thì bỏ tin cũ nhất và đánh dấu overflowed."""
+
+    def __init__(self, broker, channel, maxsize):
+        self._broker = broker
+        self.channel = channel
+        self._queue = queue.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def put(self, message):
+        while True:
+            try:
+                self._queue.put_nowait(message)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.overflowed = True
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """Pub/sub trong bộ nhớ của một process (mặc định)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(message)
+
+    def subscribe(self, channel, maxsize):
+        subscription = InProcessSubscription(self, channel, maxsize)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.get(subscription.channel, set()).discard(subscription)
+
+
+class RedisSubscription(InProcessSubscription):
+    """
+    Như InProcessSubscription nhưng tin đến từ Redis: một thread nền đọc pubsub và đẩy vào
+    hàng đợi có giới hạn. Client chậm chỉ làm mất tin cũ (=> overflowed, gửi resync) thay vì
+    để tin dồn ở Redis tới client-output-buffer-limit và bị server ngắt kết nối.
+    """
+
+    def __init__(self, pubsub, channel, maxsize, poll_interval=1.0):
+        super().__init__(None, channel, maxsize)
+        self._pubsub = pubsub
+        pubsub.subscribe(**{channel: self._on_message})
+        self._thread = pubsub.run_in_thread(
+            sleep_time=poll_interval, daemon=True, exception_handler=self._on_error
+        )
+
+    def _on_message(self, message):
+        self.put(json.loads(message['data']))
+
+    def _on_error(self, error, pubsub, thread):
+        # Mất kết nối: có thể đã lỡ tin => yêu cầu client tải lại; pubsub tự kết nối lại ở lần đọc sau
+        logger.warning("Event bus subscription error on %s", self.channel, exc_info=error)
+        self.overflowed = True
+        time.sleep(1.0)
+
+    def close(self):
+        # Thread tự đóng pubsub khi dừng (pubsub không an toàn khi dùng từ nhiều thread)
+        self._thread.stop()
+
+
+class RedisBroker:
+    """Pub/sub qua Redis để nhiều worker API cùng nhận sự kiện."""
+
+    def __init__(self, url, prefix='events:'):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def publish(self, channel, message):
+        self._client.publish(self._prefix + channel, json.dumps(message))
+
+    def subscribe(self, channel, maxsize):
+        return RedisSubscription(self._client.pubsub(), self._prefix + channel, maxsize)
+
+
+class EventBus:
+    """
+    Pub/sub có thể thay backend: EVENT_BUS_BACKEND = 'memory' (mặc định) hoặc 'redis'.
+    Lỗi khi publish không làm hỏng request (chỉ ghi log).
+    """
+
+    def __init__(self):
+        self.backend = InProcessBroker()
+        self.buffer_size = 100
+
+    def init_app(self, app):
+        if app.config.get('EVENT_BUS_BACKEND', 'memory') == 'redis':
+            self.backend = RedisBroker(app.config['EVENT_BUS_REDIS_URL'])
+        else:
+            self.backend = InProcessBroker()
+        self.buffer_size = app.config.get('SSE_BUFFER_SIZE', 100)
+        app.extensions['event_bus'] = self
+
+    def publish(self, channel, message):
+        try:
+            self.backend.publish(channel, message)
+        except Exception:
+            logger.warning("Event publish failed on %s", channel, exc_info=True)
+
+    def subscribe(self, channel):
+        return self.backend.subscribe(channel, self.buffer_size)
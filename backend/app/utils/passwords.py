@@ -0,0 +1,97 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+from .errors import BusinessError
+
+
+class HashingBusyError(BusinessError):
+    """Hàng đợi băm mật khẩu đã đầy; route trả về 503 kèm Retry-After."""
+
+    def __init__(self, retry_after):
+        super().__init__("AUTH_BUSY", "Hệ thống đang bận, vui lòng thử lại sau.")
+        self.retry_after = retry_after
+
+
+def parse_hash_method(method):
+    """
+    Chuẩn hóa phương thức băm của werkzeug về (thuật toán, tham số), điền giá trị mặc định như werkzeug:
+    'pbkdf2' -> ('pbkdf2', ('sha256', 1000000)), 'scrypt' -> ('scrypt', (32768, 8, 1)).
+    """
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        return name, tuple(int(arg) for arg in args) if args else (2 ** 15, 8, 1)
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return name, (hash_name, iterations)
+    return name, tuple(args)
+
+
+class PasswordHasher:
+    """
+    Băm/kiểm tra mật khẩu trên một pool thread có giới hạn.
+
+    Tối đa PASSWORD_HASH_WORKERS phép băm chạy cùng lúc (hashlib nhả GIL khi chạy KDF) và
+    tối đa PASSWORD_HASH_MAX_PENDING yêu cầu chờ; vượt quá thì báo HashingBusyError ngay
+    thay vì để request dồn ứ và chiếm hết worker của các endpoint đọc.
+    Tham số băm (PASSWORD_HASH_METHOD, theo định dạng của werkzeug) lấy từ Config.
+    """
+
+    def __init__(self):
+        self.method = 'scrypt:32768:8:1'
+        self._parsed_method = parse_hash_method(self.method)
+        self.salt_length = 16
+        self.timeout = 10.0
+        self.retry_after = 1
+        self._executor = None
+        self._slots = None
+
+    def init_app(self, app):
+        workers = app.config.get('PASSWORD_HASH_WORKERS', 4)
+        self.method = app.config.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+        self._parsed_method = parse_hash_method(self.method)
+        self.salt_length = app.config.get('PASSWORD_SALT_LENGTH', 16)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', 10.0)
+        self.retry_after = app.config.get('PASSWORD_HASH_RETRY_AFTER', 1)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        # Số yêu cầu được nhận = đang chạy + đang chờ
+        self._slots = threading.BoundedSemaphore(workers + app.config.get('PASSWORD_HASH_MAX_PENDING', 16))
+        app.extensions['password_hasher'] = self
+
+    def _run(self, fn, *args):
+        if self._executor is None: # Chưa init_app (script ngoài app): chạy trực tiếp
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusyError(self.retry_after)
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            # Phép băm vẫn chạy nốt trong pool (và giữ chỗ) nhưng request không chờ thêm
+            raise HashingBusyError(self.retry_after)
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """
+        Hash được tạo với tham số khác cấu hình hiện tại (vd. đã tăng số vòng lặp hoặc độ dài salt).
+
+        werkzeug ghi dạng đầy đủ (pbkdf2:sha256:600000) kể cả khi cấu hình viết tắt (pbkdf2),
+        nên so sánh sau khi chuẩn hóa cả hai phía.
+        """
+        try:
+            method, salt, _ = password_hash.split('$', 2)
+            return parse_hash_method(method) != self._parsed_method or len(salt) != self.salt_length
+        except ValueError: # Hash không đúng định dạng werkzeug
+            return True
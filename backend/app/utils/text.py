@@ -0,0 +1,19 @@
+import re
+import unicodedata
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fold_diacritics(value):
+    """Bỏ dấu tiếng Việt và chuyển về chữ thường: 'Cai nghiện Đà Nẵng' -> 'cai nghien da nang'."""
+    if not value:
+        return ''
+    value = value.replace('đ', 'd').replace('Đ', 'D')
+    decomposed = unicodedata.normalize('NFD', value)
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return unicodedata.normalize('NFC', stripped).lower()
+
+
+def search_tokens(value):
+    """Tách chuỗi tìm kiếm (đã bỏ dấu) thành các từ."""
+    return _WORD_RE.findall(fold_diacritics(value))
@@ -0,0 +1,6 @@
+from app.extensions import celery
+from run import app
+
+# Worker Celery dùng chung app (và cấu hình) với API:
+#   celery -A celery_worker.celery worker -B --loglevel=info
+app.app_context().push()
@@ -0,0 +1,48 @@
+"""appointment indexes and overlap guard
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+OVERLAP_CONSTRAINT_NAME = 'ex_appointments_confirmed_no_overlap'
+
+
+def upgrade():
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.create_index('ix_appointments_counselor_status_time', ['counselor_id', 'status', 'start_time', 'end_time'], unique=False)
+        batch_op.create_index('ix_appointments_user_start', ['user_id', 'start_time'], unique=False)
+        batch_op.create_index('ix_appointments_start_id', ['start_time', 'id'], unique=False)
+
+    # Autogenerate không nhận ra ràng buộc EXCLUDE, nên phải khai báo tay (chỉ PostgreSQL)
+    if op.get_context().dialect.name != 'postgresql':
+        return
+
+    # '=' trên cột integer trong chỉ mục gist cần btree_gist
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    # Sẽ thất bại nếu dữ liệu cũ đã có 2 lịch 'confirmed' chồng giờ: hủy bớt một lịch rồi chạy lại.
+    # op.create_exclude_constraint không nhận biểu thức (tsrange(...)) làm phần tử, nên viết DDL trực tiếp
+    op.execute(
+        f"ALTER TABLE appointments ADD CONSTRAINT {OVERLAP_CONSTRAINT_NAME} "
+        "EXCLUDE USING gist (counselor_id WITH =, tsrange(start_time, end_time) WITH &&) "
+        "WHERE (status = 'confirmed') DEFERRABLE INITIALLY DEFERRED"
+    )
+
+
+def downgrade():
+    if op.get_context().dialect.name == 'postgresql':
+        op.drop_constraint(OVERLAP_CONSTRAINT_NAME, 'appointments', type_=None)
+
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointments_start_id')
+        batch_op.drop_index('ix_appointments_user_start')
+        batch_op.drop_index('ix_appointments_counselor_status_time')
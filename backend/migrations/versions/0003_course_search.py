@@ -0,0 +1,58 @@
+"""course search column and indexes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 17:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Sau khi nâng cấp, chạy `flask reindex-courses` để điền search_text cho khóa học đã có
+    dialect = op.get_context().dialect.name
+
+    if dialect == 'postgresql':
+        # Index trigram cần pg_trgm; phải tạo trước index (autogenerate không sinh lệnh này)
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    with op.batch_alter_table('courses', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('search_text', sa.Text(), nullable=True))
+
+    if dialect == 'postgresql':
+        op.create_index(
+            'ix_courses_search_tsv',
+            'courses',
+            [sa.text("to_tsvector('simple', coalesce(search_text, ''))")],
+            postgresql_using='gin'
+        )
+        op.create_index(
+            'ix_courses_search_trgm',
+            'courses',
+            ['search_text'],
+            postgresql_using='gin',
+            postgresql_ops={'search_text': 'gin_trgm_ops'}
+        )
+    elif dialect == 'sqlite':
+        op.execute('CREATE VIRTUAL TABLE IF NOT EXISTS courses_fts USING fts5(search_text)')
+
+
+def downgrade():
+    dialect = op.get_context().dialect.name
+
+    if dialect == 'postgresql':
+        op.drop_index('ix_courses_search_trgm', table_name='courses')
+        op.drop_index('ix_courses_search_tsv', table_name='courses')
+    elif dialect == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS courses_fts')
+
+    with op.batch_alter_table('courses', schema=None) as batch_op:
+        batch_op.drop_column('search_text')
@@ -0,0 +1,82 @@
+"""precomputed course module content
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 09:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 500
+
+
+def upgrade():
+    with op.batch_alter_table('course_modules', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_etag', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('content_gzip', sa.LargeBinary(), nullable=True))
+        batch_op.add_column(sa.Column('content_br', sa.LargeBinary(), nullable=True))
+
+    if op.get_context().as_sql:
+        # Chế độ offline không đọc được dữ liệu: chạy `flask db upgrade` trực tiếp để tính nội dung module cũ
+        return
+    backfill_content_variants(op.get_bind())
+
+
+def backfill_content_variants(connection):
+    """Tính ETag + bản nén cho các module đã có (cùng cách CourseModule.update_content_variants)."""
+    from app.models.course_module import CourseModule
+
+    modules = sa.table(
+        'course_modules',
+        sa.column('id', sa.Integer),
+        sa.column('course_id', sa.Integer),
+        sa.column('title', sa.String),
+        sa.column('content', sa.Text),
+        sa.column('module_order', sa.Integer),
+        sa.column('content_etag', sa.String),
+        sa.column('content_gzip', sa.LargeBinary),
+        sa.column('content_br', sa.LargeBinary)
+    )
+
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(modules.c.id, modules.c.course_id, modules.c.title, modules.c.content, modules.c.module_order)
+            .where(modules.c.id > last_id)
+            .order_by(modules.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).mappings().all()
+        if not rows:
+            break
+
+        variants = []
+        for row in rows:
+            # Đối tượng tạm (không gắn session) chỉ để dùng lại logic render/nén của model
+            module = CourseModule(**row)
+            module.update_content_variants()
+            variants.append({
+                "module_id": row['id'],
+                "content_etag": module.content_etag,
+                "content_gzip": module.content_gzip,
+                "content_br": module.content_br
+            })
+        connection.execute(
+            modules.update().where(modules.c.id == sa.bindparam('module_id')),
+            variants
+        )
+        last_id = rows[-1]['id']
+
+
+def downgrade():
+    with op.batch_alter_table('course_modules', schema=None) as batch_op:
+        batch_op.drop_column('content_br')
+        batch_op.drop_column('content_gzip')
+        batch_op.drop_column('content_etag')
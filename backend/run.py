@@ -2,6 +2,10 @@ import os
 import click 
 from app import create_app
 from app.extensions import db
+from app.services.course_import import import_courses
+from app.services.course_search import reindex_courses
+from app.services.user_import import import_users
+from app.services.course_service import CourseService
 
 # IMPORT TẤT CẢ CÁC HÀM SEED TỪ FILE seed.py
 from seed import seed_roles, seed_admin_user, seed_counselor_user, seed_courses
@@ -44,6 +48,49 @@ def seed_command():
         
         db.session.remove()
 
+@app.cli.command("reindex-courses")
+def reindex_courses_command():
+    """Tính lại chỉ mục tìm kiếm (bỏ dấu) cho toàn bộ khóa học."""
+    with app.app_context():
+        count = reindex_courses()
+        print(f"--- Đã cập nhật chỉ mục tìm kiếm cho {count} khóa học ---")
+
+@app.cli.command("rebuild-module-content")
+def rebuild_module_content_command():
+    """Tính lại ETag và bản nén gzip/brotli cho nội dung toàn bộ module."""
+    with app.app_context():
+        count = CourseService.rebuild_module_content()
+        print(f"--- Đã tính lại nội dung nén cho {count} module ---")
+
+@app.cli.command("import-courses")
+@click.argument("source", type=click.File("rb"))
+@click.option("--batch-size", type=int, default=None, help="Số khóa học mỗi lô (mặc định COURSE_IMPORT_BATCH_SIZE).")
+def import_courses_command(source, batch_size):
+    """Nhập khóa học từ file NDJSON (mỗi dòng một khóa học; '-' để đọc stdin)."""
+    with app.app_context():
+        report = import_courses(source, batch_size=batch_size)
+        for error in report["errors"]:
+            print(f"Dòng {error['line']}: {error['error']}")
+        print(f"--- Đã nhập {report['imported']} khóa học ({report['modules']} module), {report['failed']} dòng lỗi ---")
+
+@app.cli.command("import-users")
+@click.argument("source", type=click.File("r", encoding="utf-8-sig"))
+@click.option("--rejects", "rejects_path", type=click.Path(dir_okay=False), default=None,
+              help="File CSV ghi các dòng bị từ chối (mặc định <source>.rejects.csv).")
+@click.option("--batch-size", type=int, default=None, help="Số dòng mỗi lô (mặc định USER_IMPORT_BATCH_SIZE).")
+@click.option("--workers", type=int, default=None, help="Số process băm mật khẩu (mặc định USER_IMPORT_WORKERS/số CPU).")
+def import_users_command(source, rejects_path, batch_size, workers):
+    """Nhập tài khoản từ file CSV (cột: email, password, name, role)."""
+    rejects_path = rejects_path or f"{source.name}.rejects.csv"
+    with app.app_context(), open(rejects_path, "w", newline="", encoding="utf-8") as rejects_file:
+        report = import_users(source, rejects_file, batch_size=batch_size, workers=workers)
+    print(
+        f"--- Đã nhập {report['imported']} tài khoản, từ chối {report['rejected']} dòng "
+        f"({report['seconds']} giây, {report['rows_per_second']} dòng/giây) ---"
+    )
+    if report['rejected']:
+        print(f"--- Các dòng bị từ chối: {rejects_path} ---")
+
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,54 @@
+"""
+Tiện ích dùng chung cho các script đo hiệu năng trong thư mục này.
+
+Chạy từ thư mục backend, ví dụ: python scripts/bench_json.py --help
+Các script dùng TestingConfig (SQLite trong bộ nhớ) nên không cần PostgreSQL/RabbitMQ.
+"""
+import os
+import statistics
+import sys
+import time
+import warnings
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# Khóa JWT mặc định của TestingConfig ngắn; cảnh báo của PyJWT chỉ làm nhiễu kết quả đo
+warnings.filterwarnings('ignore', message='The HMAC key is')
+
+
+def create_bench_app(**overrides):
+    """App với TestingConfig (ghi đè các khóa cấu hình cho trước), đã tạo bảng."""
+    from config import TestingConfig
+    from app import create_app
+    from app.extensions import db
+
+    app = create_app(type('BenchConfig', (TestingConfig,), overrides))
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def measure(fn, repeat=20, number=1):
+    """Chạy fn() repeat lần (mỗi lần number lời gọi); trả về thời gian mỗi lời gọi (giây)."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return samples
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def report(label, samples, extra=''):
+    """In một dòng kết quả: trung vị và p99 (ms)."""
+    print(
+        f"{label:<42} p50 {statistics.median(samples) * 1000:9.3f} ms"
+        f"  p99 {percentile(samples, 99) * 1000:9.3f} ms  {extra}"
+    )
@@ -0,0 +1,94 @@
+"""
+Đo chi phí xác thực mỗi request: pipeline cũ (role_required xác minh JWT lần hai) so với hiện tại
+(xác minh một lần, claims dùng lại từ request).
+
+Hai route giả được đăng ký trên cùng app, cùng @jwt_required() + kiểm tra vai trò và handler đọc claims
+hai lần như các route lịch hẹn; chênh lệch giữa chúng là phần xác thực tiết kiệm được.
+
+    python scripts/bench_auth.py --requests 2000
+"""
+import argparse
+from functools import wraps
+
+from _bench import create_bench_app, measure, report
+
+from flask import jsonify
+from flask_jwt_extended import create_access_token, get_jwt, jwt_required, verify_jwt_in_request
+
+from app.utils.decorators import current_claims, role_required
+
+
+def legacy_role_required(required_roles):
+    """role_required trước khi có current_claims(): gọi lại verify_jwt_in_request()."""
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            try:
+                verify_jwt_in_request()
+            except Exception:
+                return jsonify(msg="Thiếu hoặc Token không hợp lệ"), 401
+            if get_jwt().get("role") not in required_roles:
+                return jsonify(msg="Truy cập bị từ chối: Không có quyền"), 403
+            return fn(*args, **kwargs)
+        return decorator
+    return wrapper
+
+
+def register_routes(app):
+    @app.get('/bench/auth/legacy')
+    @jwt_required()
+    @legacy_role_required(['user'])
+    def legacy():
+        return jsonify(user_id=int(get_jwt()['sub']), role=get_jwt().get('role'))
+
+    @app.get('/bench/auth/current')
+    @jwt_required()
+    @role_required(['user'])
+    def current():
+        claims = current_claims()
+        return jsonify(user_id=claims.user_id, role=current_claims().role)
+
+
+def count_decodes(app, client, path, headers):
+    """Số lần giải mã JWT trong một request."""
+    import flask_jwt_extended.view_decorators as view_decorators
+
+    calls = 0
+    original = view_decorators.decode_token
+
+    def counting(*args, **kwargs):
+        nonlocal calls
+        calls += 1
+        return original(*args, **kwargs)
+
+    view_decorators.decode_token = counting
+    try:
+        client.get(path, headers=headers)
+    finally:
+        view_decorators.decode_token = original
+    return calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000, help='Số request mỗi mẫu')
+    parser.add_argument('--repeat', type=int, default=15)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    register_routes(app)
+    with app.app_context():
+        token = create_access_token(identity='1', additional_claims={'role': 'user', 'role_id': 3})
+    headers = {'Authorization': f'Bearer {token}'}
+    client = app.test_client()
+
+    for name in ('legacy', 'current'):
+        path = f'/bench/auth/{name}'
+        assert client.get(path, headers=headers).status_code == 200
+        decodes = count_decodes(app, client, path, headers)
+        samples = measure(lambda: client.get(path, headers=headers), repeat=args.repeat, number=args.requests)
+        report(f"GET {path}", samples, f"{decodes} lần giải mã JWT/request")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Đo JSON provider (orjson so với json chuẩn) và chi phí nén response trên payload lớn.
+
+Payload: danh sách khóa học kèm module (như chi tiết/danh mục khóa học) và danh sách lịch hẹn
+lấy từ AppointmentService.get_appointments_by_role (cùng mapper với GET /appointments/).
+
+    python scripts/bench_json.py --courses 500 --appointments 5000
+"""
+import argparse
+import gzip
+from datetime import datetime, timedelta
+
+from _bench import create_bench_app, measure, report
+
+from app.extensions import db
+from app.models.appointment import Appointment
+from app.models.counselor import CounselorProfile
+from app.models.course import Course
+from app.models.course_module import CourseModule
+from app.models.role import Role
+from app.models.user import User
+from app.services.appointment_service import AppointmentService
+from app.utils import compression
+from app.utils.json_provider import FastJSONProvider, orjson
+
+
+def course_payload(count):
+    courses = []
+    for i in range(count):
+        course = Course(
+            id=i + 1,
+            title=f'Khóa học số {i}',
+            description=f'Khóa học {i} giới thiệu các giai đoạn cai nghiện, mã {i * 7919 % 10007}.',
+            target_audience='student',
+            created_at=datetime(2026, 1, 1) + timedelta(hours=i)
+        )
+        modules = [
+            CourseModule(
+                id=i * 10 + j, course_id=i + 1, title=f'Module {j + 1}',
+                content=' '.join(f'đoạn-{(i * 31 + j * 17 + k) % 997}' for k in range(60)),
+                module_order=j + 1
+            ).to_dict()
+            for j in range(5)
+        ]
+        courses.append({**course.to_dict(), 'created_at': course.created_at, 'modules': modules})
+    return courses
+
+
+def appointment_payload(count):
+    roles = {name: Role(name=name) for name in ('admin', 'counselor', 'user')}
+    db.session.add_all(roles.values())
+    db.session.flush()
+    patient = User(email='patient@bench', name='Người dùng', role_id=roles['user'].id, password_hash='x')
+    counselor = User(email='counselor@bench', name='Chuyên viên', role_id=roles['counselor'].id, password_hash='x')
+    db.session.add_all([patient, counselor])
+    db.session.flush()
+    profile = CounselorProfile(user_id=counselor.id)
+    db.session.add(profile)
+    db.session.flush()
+
+    start = datetime(2030, 1, 1)
+    db.session.add_all([
+        Appointment(
+            user_id=patient.id, counselor_id=profile.id, reason='Tư vấn định kỳ',
+            start_time=start + timedelta(hours=i), end_time=start + timedelta(hours=i + 1),
+            status='confirmed' if i % 3 else 'pending'
+        )
+        for i in range(count)
+    ])
+    db.session.commit()
+    return AppointmentService.get_appointments_by_role(patient.id, 'admin', page=1, limit=count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--courses', type=int, default=500)
+    parser.add_argument('--appointments', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    with app.app_context():
+        payloads = {
+            'courses': course_payload(args.courses),
+            'appointments': appointment_payload(args.appointments),
+        }
+
+        stdlib = FastJSONProvider(app)
+        stdlib.use_orjson = False
+        providers = {'json': stdlib}
+        if orjson is not None:
+            providers['orjson'] = FastJSONProvider(app)
+            providers['orjson'].use_orjson = True
+        else:
+            print("orjson chưa được cài: chỉ đo json chuẩn")
+
+        for name, payload in payloads.items():
+            print(f"--- {name} ---")
+            for provider_name, provider in providers.items():
+                body = provider.dumps_bytes(payload)
+                samples = measure(lambda: provider.dumps_bytes(payload), repeat=args.repeat)
+                report(f"dumps [{provider_name}]", samples, f"{len(body) / 1024:8.1f} KiB")
+
+            body = providers['json'].dumps_bytes(payload)
+            if 'orjson' in providers:
+                assert providers['orjson'].dumps_bytes(payload) == body, "Hai provider cho kết quả khác nhau"
+
+            compress = app.extensions['compress']
+            encoders = [('gzip', compress.gzip_level, lambda: gzip.compress(body, compresslevel=compress.gzip_level))]
+            if compression.brotli is not None:
+                encoders.append((
+                    'br', compress.brotli_quality,
+                    lambda: compression.brotli.compress(body, quality=compress.brotli_quality)
+                ))
+            for encoding, level, encode in encoders:
+                size = len(encode())
+                samples = measure(encode, repeat=args.repeat)
+                report(f"compress [{encoding} level {level}]", samples, f"{size / 1024:8.1f} KiB ({size / len(body):.0%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Đo đăng nhập đồng thời qua pool băm mật khẩu có giới hạn (PASSWORD_HASH_*).
+
+Nhiều client cùng gọi POST /auth/login; script báo p50/p99 của các lần đăng nhập thành công,
+số lần bị từ chối 503 (pool đầy), thông lượng, và độ trễ của GET /api/courses/ (endpoint đọc rẻ)
+trong lúc đăng nhập dồn dập - thứ mà pool có giới hạn cần bảo vệ.
+
+    python scripts/bench_password_hashing.py --clients 32 --logins 10 --workers 4 --max-pending 16
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from _bench import create_bench_app, percentile, report
+
+from app.extensions import db
+from app.models.role import Role
+from app.models.user import User
+
+EMAIL, PASSWORD = 'bench@example.com', 'Bench@123'
+
+
+def main():
+    from config import Config
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=32, help='Số client đăng nhập đồng thời')
+    parser.add_argument('--logins', type=int, default=10, help='Số lần đăng nhập mỗi client')
+    parser.add_argument('--workers', type=int, default=Config.PASSWORD_HASH_WORKERS)
+    parser.add_argument('--max-pending', type=int, default=Config.PASSWORD_HASH_MAX_PENDING)
+    parser.add_argument('--method', default=Config.PASSWORD_HASH_METHOD, help='Tham số băm (định dạng werkzeug)')
+    args = parser.parse_args()
+
+    # SQLite dạng file: nhiều thread đọc đồng thời an toàn hơn một kết nối :memory: dùng chung
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        app = create_bench_app(
+            SQLALCHEMY_DATABASE_URI=f'sqlite:///{db_path}',
+            PASSWORD_HASH_METHOD=args.method,
+            PASSWORD_HASH_WORKERS=args.workers,
+            PASSWORD_HASH_MAX_PENDING=args.max_pending,
+        )
+        with app.app_context():
+            role = Role(name='user')
+            db.session.add(role)
+            db.session.flush()
+            user = User(email=EMAIL, name='Bench', role_id=role.id)
+            user.set_password(PASSWORD)
+            db.session.add(user)
+            db.session.commit()
+
+        run(app, args)
+    finally:
+        os.remove(db_path)
+
+
+def run(app, args):
+    logins, rejected, reads = [], [], []
+    lock = threading.Lock()
+    start = threading.Barrier(args.clients + 1)
+    done = threading.Event()
+
+    def login_client():
+        client = app.test_client()
+        start.wait()
+        for _ in range(args.logins):
+            began = time.perf_counter()
+            response = client.post('/auth/login', json={'email': EMAIL, 'password': PASSWORD})
+            elapsed = time.perf_counter() - began
+            with lock:
+                (logins if response.status_code == 200 else rejected).append(elapsed)
+            if response.status_code == 503:
+                time.sleep(float(response.headers.get('Retry-After', 1)) / 10) # Thử lại sớm hơn để tạo tải
+
+    def read_client():
+        client = app.test_client()
+        while not done.is_set():
+            began = time.perf_counter()
+            client.get('/api/courses/')
+            reads.append(time.perf_counter() - began)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=login_client) for _ in range(args.clients)]
+    reader = threading.Thread(target=read_client)
+    for thread in threads:
+        thread.start()
+    reader.start()
+
+    began = time.perf_counter()
+    start.wait()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+    done.set()
+    reader.join()
+
+    print(
+        f"{args.clients} client x {args.logins} lần, method {args.method}, "
+        f"workers {args.workers}, max pending {args.max_pending}"
+    )
+    if logins:
+        report("login 200", logins, f"{len(logins) / elapsed:7.1f} login/s")
+    if rejected:
+        print(f"{'login 503':<42} {len(rejected)} lần (p99 {percentile(rejected, 99) * 1000:.3f} ms)")
+    if reads:
+        report("GET /api/courses/ trong lúc đăng nhập", reads, f"{len(reads)} request")
+
+
+if __name__ == '__main__':
+    main()
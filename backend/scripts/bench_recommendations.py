@@ -0,0 +1,88 @@
+"""
+Đo chi phí gợi ý khóa học: thời gian tính lại bảng top-k (CourseRecommendationService.refresh)
+và độ trễ đọc gợi ý đã tính sẵn (get_recommendations) trên dữ liệu tổng hợp.
+
+Mỗi học viên đăng ký vài khóa, ưu tiên các khóa "gần nhau" để ma trận đồng hoàn thành có cấu trúc.
+Bảng users không được điền: SQLite trong TestingConfig không kiểm tra khóa ngoại.
+
+    python scripts/bench_recommendations.py --users 20000 --courses 300
+"""
+import argparse
+import random
+import time
+
+from _bench import create_bench_app, measure, report
+
+from sqlalchemy import insert
+
+from app.extensions import db
+from app.models.course import Course
+from app.models.course_progress import UserCourseProgress
+from app.services.course_recommendations import CourseRecommendationService
+
+
+def seed(users, courses, per_user, rng):
+    db.session.execute(insert(Course), [
+        {
+            "title": f"Khóa học {i}",
+            "description": "Dữ liệu đo hiệu năng",
+            "target_audience": "student",
+            "is_active": i % 10 != 0
+        }
+        for i in range(1, courses + 1)
+    ])
+    course_ids = list(db.session.scalars(db.select(Course.id).order_by(Course.id)))
+
+    progress = []
+    for user_id in range(1, users + 1):
+        anchor = rng.randrange(len(course_ids))
+        picked = {
+            course_ids[min(len(course_ids) - 1, max(0, int(rng.gauss(anchor, 5))))]
+            for _ in range(per_user)
+        }
+        progress.extend(
+            {"user_id": user_id, "course_id": course_id, "is_completed": rng.random() < 0.4}
+            for course_id in picked
+        )
+    db.session.execute(insert(UserCourseProgress), progress)
+    db.session.commit()
+    return course_ids, len(progress)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--courses', type=int, default=300)
+    parser.add_argument('--per-user', type=int, default=6, help='Số khóa mỗi học viên đăng ký (tối đa)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    app = create_bench_app()
+    with app.app_context():
+        start = time.perf_counter()
+        course_ids, rows = seed(args.users, args.courses, args.per_user, rng)
+        print(f"Đã tạo {len(course_ids)} khóa học, {rows} bản ghi tiến độ trong {time.perf_counter() - start:.1f} s")
+
+        written = CourseRecommendationService.refresh()
+        samples = measure(CourseRecommendationService.refresh, repeat=args.repeat)
+        report("refresh() (tính lại toàn bộ top-k)", samples, f"{written} gợi ý")
+
+        targets = [rng.choice(course_ids) for _ in range(200)]
+        users = [rng.randint(1, args.users) for _ in range(200)]
+        lookups = iter(range(10 ** 9))
+
+        def read_anonymous():
+            CourseRecommendationService.get_recommendations(targets[next(lookups) % len(targets)])
+
+        def read_for_user():
+            i = next(lookups) % len(targets)
+            CourseRecommendationService.get_recommendations(targets[i], user_id=users[i])
+
+        report("get_recommendations() ẩn danh", measure(read_anonymous, repeat=20, number=50))
+        report("get_recommendations() theo học viên", measure(read_for_user, repeat=20, number=50))
+
+
+if __name__ == '__main__':
+    main()
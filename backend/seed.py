@@ -2,7 +2,10 @@ from app.extensions import db
 from app.models.role import Role
 from app.models.user import User
 from app.models.counselor import CounselorProfile
-from werkzeug.security import generate_password_hash
+from app.services.appointment_service import AppointmentService
+from app.services.course_search import get_course_search
+from app.services.course_catalog import course_catalog
+from app.services.role_registry import role_registry
 from app.models.course import Course
 from app.models.course_module import CourseModule
 from datetime import datetime
@@ -20,11 +23,12 @@ def seed_roles():
             print(f"Đã thêm vai trò: {data['name']}")
 
     db.session.commit()
+    role_registry.invalidate()
 
 
 def seed_admin_user():
-    admin_role = Role.query.filter_by(name='admin').first()
-    if not admin_role:
+    admin_role_id = role_registry.id_of('admin')
+    if not admin_role_id:
         return
 
     email = 'admin@example.com'
@@ -34,9 +38,9 @@ def seed_admin_user():
     admin = User(
         email=email,
         name='System Admin',
-        role_id=admin_role.id
+        role_id=admin_role_id
     )
-    admin.password_hash = generate_password_hash('Admin@123')
+    admin.set_password('Admin@123')
     db.session.add(admin)
     db.session.commit()
 
@@ -44,8 +48,8 @@ def seed_admin_user():
 
 
 def seed_counselor_user():
-    counselor_role = Role.query.filter_by(name='counselor').first()
-    if not counselor_role:
+    counselor_role_id = role_registry.id_of('counselor')
+    if not counselor_role_id:
         return
 
     email = 'counselor@example.com'
@@ -55,9 +59,9 @@ def seed_counselor_user():
     counselor = User(
         email=email,
         name='Chuyên viên G',
-        role_id=counselor_role.id
+        role_id=counselor_role_id
     )
-    counselor.password_hash = generate_password_hash('Counselor@123')
+    counselor.set_password('Counselor@123')
     db.session.add(counselor)
 
     db.session.flush()  
@@ -71,6 +75,7 @@ def seed_counselor_user():
     db.session.add(profile)
 
     db.session.commit()
+    AppointmentService.invalidate_counselor_directory()
     print("Đã tạo Counselor + Profile")
 
 def seed_courses():
@@ -141,9 +146,11 @@ def seed_courses():
             target_audience=data['target_audience'],
             is_active=True
         )
+        course.update_search_text()
 
         db.session.add(course)
         db.session.flush() # Lấy course.id
+        get_course_search().index_course(course)
 
         modules_to_add = []
         for index, module_data in enumerate(data['modules']):
@@ -156,8 +163,12 @@ def seed_courses():
             modules_to_add.append(module)
 
         db.session.add_all(modules_to_add)
+        db.session.flush() # Lấy module.id trước khi tính sẵn nội dung
+        for module in modules_to_add:
+            module.update_content_variants()
         db.session.commit()
         
+        course_catalog.invalidate()
         print(f"Đã tạo khóa học: {data['title']}")
 
 def seed_all():
@@ -170,8 +181,8 @@ def seed_all():
     print("--- Hoàn tất Seeding thành công ---")
     
 def seed_default_user():
-    user_role = Role.query.filter_by(name='user').first()
-    if not user_role:
+    user_role_id = role_registry.id_of('user')
+    if not user_role_id:
         return
 
     email = 'user1@example.com'
@@ -181,9 +192,9 @@ def seed_default_user():
     user = User(
         email=email,
         name='Người dùng Test',
-        role_id=user_role.id
+        role_id=user_role_id
     )
-    user.password_hash = generate_password_hash('Admin@123')
+    user.set_password('Admin@123')
     db.session.add(user)
     db.session.commit()
     print("Đã tạo tài khoản User mặc định: user1@example.com")
\ No newline at end of file
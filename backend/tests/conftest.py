@@ -0,0 +1,120 @@
+from contextlib import contextmanager
+from itertools import count
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app
+from app.extensions import db
+from app.models.counselor import CounselorProfile
+from app.models.course import Course
+from app.models.course_module import CourseModule
+from app.models.user import User
+from app.services.course_service import CourseService
+from app.services.role_registry import role_registry
+import seed
+
+_emails = count(1)
+_courses = count(1)
+
+
+@pytest.fixture(scope='session')
+def app():
+    # Các singleton trong process (role_registry, slot_index, schedule_grid...) giữ dữ liệu giữa các test,
+    # nên dùng một app + một CSDL SQLite trong bộ nhớ cho cả phiên kiểm thử; mỗi test tự tạo dữ liệu riêng.
+    app = create_app('config.TestingConfig')
+    with app.app_context():
+        db.create_all()
+        seed.seed_all()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    """Tạo người dùng mới với vai trò cho trước (counselor thì kèm hồ sơ chuyên viên)."""
+
+    def _make_user(role='user', specialization='Tư vấn tâm lý'):
+        user = User(
+            email=f'{role}{next(_emails)}@test.local',
+            name=f'{role.title()} Test',
+            role_id=role_registry.id_of(role)
+        )
+        user.set_password('Test@123')
+        db.session.add(user)
+        db.session.flush()
+
+        if role == 'counselor':
+            db.session.add(CounselorProfile(user_id=user.id, specialization=specialization))
+        db.session.commit()
+        return user
+
+    return _make_user
+
+
+@pytest.fixture
+def make_course(app):
+    """Tạo khóa học qua CourseService.create_course; trả về (course, [module theo thứ tự])."""
+
+    def _make_course(modules=3, audience='student'):
+        number = next(_courses)
+        created = CourseService.create_course(
+            f'Khóa học kiểm thử {number}',
+            'Mô tả khóa học kiểm thử',
+            audience,
+            [{'title': f'Bài {i}', 'content': f'Nội dung bài {i} của khóa {number}'} for i in range(1, modules + 1)]
+        )
+        course = db.session.get(Course, created['id'])
+        ordered = CourseModule.query.filter_by(course_id=course.id).order_by(CourseModule.module_order).all()
+        return course, ordered
+
+    return _make_course
+
+
+@pytest.fixture
+def auth_headers(app):
+    """Header Authorization với access token của người dùng (cùng claims như khi đăng nhập)."""
+
+    def _auth_headers(user):
+        token = create_access_token(
+            identity=str(user.id),
+            additional_claims={'role': role_registry.name_of(user.role_id), 'role_id': user.role_id}
+        )
+        return {'Authorization': f'Bearer {token}'}
+
+    return _auth_headers
+
+
+@pytest.fixture
+def count_queries(app):
+    """
+    Đếm số câu lệnh SQL thực thi trong khối with: `with count_queries() as queries: ...; queries.count`.
+    Các câu lệnh được giữ trong queries.statements.
+    """
+
+    class _Counter:
+        def __init__(self):
+            self.count = 0
+            self.statements = []
+
+    @contextmanager
+    def _count_queries():
+        counter = _Counter()
+
+        def before_cursor_execute(conn, cursor, statement, *args, **kwargs):
+            counter.count += 1
+            counter.statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield counter
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+    return _count_queries
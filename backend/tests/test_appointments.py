@@ -0,0 +1,311 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.extensions import cache, db
+from app.models.appointment import Appointment
+from app.models.counselor import CounselorProfile
+from app.services.appointment_service import AppointmentService
+from app.services.schedule_grid import SCHEDULE_VERSION_KEY, ScheduleGrid, schedule_grid
+from app.services.schedule_service import ScheduleService
+from app.services.slot_index import CounselorSlotIndex, slot_index
+from app.services.user_service import UserService
+from app.utils.errors import BusinessError
+
+
+def _next_hour(days=2):
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return now + timedelta(days=days)
+
+
+def test_create_appointment_checks_db_when_slot_index_is_stale(make_user):
+    patient = make_user('user')
+    counselor = make_user('counselor')
+    profile_id = CounselorProfile.query.filter_by(user_id=counselor.id).one().id
+    start = _next_hour()
+
+    slot_index.find_conflict(profile_id, start, start) # Nạp chỉ mục trước khi "worker khác" ghi
+    # Lịch đã xác nhận được ghi bởi process khác: chỉ mục của process này không biết
+    db.session.add(Appointment(
+        user_id=patient.id,
+        counselor_id=profile_id,
+        start_time=start.replace(tzinfo=None),
+        end_time=(start + timedelta(hours=1)).replace(tzinfo=None),
+        status='confirmed'
+    ))
+    db.session.commit()
+    assert slot_index.find_conflict(profile_id, start, start + timedelta(hours=1)) is None
+
+    with pytest.raises(BusinessError) as excinfo:
+        AppointmentService.create_appointment(patient.id, counselor.id, start.isoformat(), 'Trùng giờ')
+    assert excinfo.value.error_code == 'APPOINTMENT_TIME_CONFLICT'
+
+    # Chỉ mục của chuyên viên đó đã được nạp lại
+    assert slot_index.find_conflict(profile_id, start, start + timedelta(hours=1)) is not None
+
+
+def test_next_available_slot_reports_the_counselor_who_owns_the_slot(make_user):
+    specialization = 'Kiểm thử giờ làm việc'
+    always = make_user('counselor', specialization=specialization)
+    rarely = make_user('counselor', specialization=specialization)
+
+    ScheduleService.update_schedule(
+        always.id,
+        [{'weekday': day, 'start_hour': 0, 'end_hour': 24} for day in range(7)],
+        [], None, 'admin'
+    )
+    ScheduleService.update_schedule(
+        rarely.id, [{'weekday': 6, 'start_hour': 9, 'end_hour': 10}], [], None, 'admin'
+    )
+
+    slot = ScheduleService.next_available_slot(specialization)
+
+    assert slot['counselor_user_id'] == always.id
+    profile_id = CounselorProfile.query.filter_by(user_id=always.id).one().id
+    assert schedule_grid.is_bookable(profile_id, datetime.fromisoformat(slot['start_time']))
+
+
+def test_schedule_change_reaches_grids_of_other_workers(app, make_user, monkeypatch):
+    monkeypatch.setitem(app.config, 'SCHEDULE_VERSION_CHECK_INTERVAL', 0)
+    counselor = make_user('counselor')
+    profile_id = CounselorProfile.query.filter_by(user_id=counselor.id).one().id
+
+    def every_day(start_hour, end_hour):
+        return [{'weekday': day, 'start_hour': start_hour, 'end_hour': end_hour} for day in range(7)]
+
+    ScheduleService.update_schedule(counselor.id, every_day(8, 12), [], None, 'admin')
+
+    other_worker = ScheduleGrid() # Lưới riêng của một process khác, cùng cache dùng chung
+    slot = next(other_worker.iter_slots(profile_id, datetime.now(timezone.utc) + timedelta(days=1)))
+    assert other_worker.is_bookable(profile_id, slot)
+
+    ScheduleService.update_schedule(counselor.id, every_day(13, 17), [], None, 'admin')
+
+    assert not other_worker.is_bookable(profile_id, slot)
+    assert other_worker.is_bookable(profile_id, slot + timedelta(hours=5))
+
+
+@pytest.mark.parametrize('weekly', [
+    None, # Chưa khai báo lịch: mọi giờ đều đặt được
+    [{'weekday': day, 'start_hour': 9, 'end_hour': 17} for day in range(7)],
+])
+def test_next_available_agrees_with_free_slots(client, make_user, weekly):
+    specialization = f'Kiểm thử khung trống {weekly is None}'
+    counselor = make_user('counselor', specialization=specialization)
+    if weekly is not None:
+        ScheduleService.update_schedule(counselor.id, weekly, [], None, 'admin')
+
+    next_available = client.get('/appointments/counselors/next-available', query_string={'specialization': specialization})
+    free_slots = client.get(f'/appointments/counselors/{counselor.id}/free-slots')
+
+    assert next_available.status_code == 200
+    assert next_available.json['counselor_user_id'] == counselor.id
+    assert next_available.json['start_time'] == free_slots.json['slots'][0]['start_time']
+
+
+def test_free_slots_reads_schedule_version_at_most_once(make_user, monkeypatch):
+    counselor = make_user('counselor')
+    ScheduleService.update_schedule(
+        counselor.id, [{'weekday': day, 'start_hour': 8, 'end_hour': 20} for day in range(7)], [], None, 'admin'
+    )
+    schedule_grid.reset()
+
+    reads = []
+    original_get = cache.get
+
+    def counting_get(key, *args, **kwargs):
+        if key == SCHEDULE_VERSION_KEY:
+            reads.append(key)
+        return original_get(key, *args, **kwargs)
+
+    monkeypatch.setattr(cache, 'get', counting_get)
+    result = AppointmentService.get_free_slots(counselor.id)
+
+    assert len(result['slots']) > 50
+    # Một lần khi nạp lưới, không phải một lần cho mỗi khung giờ ứng viên
+    assert len(reads) == 1
+
+
+@pytest.mark.parametrize('body', [
+    {'weekly': ['thứ hai 8-12']},
+    {'weekly': [{'weekday': 1, 'start_hour': 8}]},
+    {'weekly': {'weekday': 1, 'start_hour': 8, 'end_hour': 12}},
+    {'exceptions': [{'start_hour': 8, 'end_hour': 12}]},
+    {'exceptions': [None]},
+    {'exceptions': [{'date': '2030-01-01', 'is_available': 'yes'}]},
+    ['không phải object'],
+])
+def test_update_schedule_rejects_malformed_items(client, make_user, auth_headers, body):
+    counselor = make_user('counselor')
+
+    response = client.put(f'/appointments/counselors/{counselor.id}/schedule', json=body, headers=auth_headers(counselor))
+
+    assert response.status_code == 400
+    assert response.json['error_code'] == 'INVALID_SCHEDULE_FORMAT'
+
+
+def _book_and_confirm(patient, counselor, admin, start):
+    booked = AppointmentService.create_appointment(patient.id, counselor.id, start.isoformat(), 'Tư vấn')
+    return AppointmentService.update_status(booked['appointment_id'], 'confirmed', admin.id, 'admin')
+
+
+def test_confirmed_slot_reaches_index_of_other_workers(app, make_user, monkeypatch):
+    monkeypatch.setitem(app.config, 'SLOT_INDEX_VERSION_CHECK_INTERVAL', 0)
+    patient, counselor, admin = make_user('user'), make_user('counselor'), make_user('admin')
+    profile_id = CounselorProfile.query.filter_by(user_id=counselor.id).one().id
+    start = _next_hour(days=3)
+    end = start + timedelta(hours=1)
+
+    other_worker = CounselorSlotIndex() # Chỉ mục riêng của một process khác, cùng cache dùng chung
+    assert other_worker.find_conflict(profile_id, start, end) is None
+
+    appointment = _book_and_confirm(patient, counselor, admin, start)
+    assert other_worker.find_conflict(profile_id, start, end) == appointment['appointment_id']
+
+    AppointmentService.update_status(appointment['appointment_id'], 'canceled', admin.id, 'admin')
+    assert other_worker.find_conflict(profile_id, start, end) is None
+
+
+def test_create_appointment_rejects_indexed_conflict_without_locking(make_user, count_queries):
+    patient, counselor, admin = make_user('user'), make_user('counselor'), make_user('admin')
+    start = _next_hour(days=4)
+    _book_and_confirm(patient, counselor, admin, start)
+
+    with count_queries() as queries, pytest.raises(BusinessError) as excinfo:
+        AppointmentService.create_appointment(patient.id, counselor.id, start.isoformat(), 'Trùng giờ')
+
+    assert excinfo.value.error_code == 'APPOINTMENT_TIME_CONFLICT'
+    assert not [statement for statement in queries.statements if 'FROM appointments' in statement]
+
+
+@pytest.mark.parametrize('limit', [0, -1, 101])
+def test_cursor_listing_rejects_out_of_range_limit(client, make_user, auth_headers, limit):
+    patient = make_user('user')
+
+    response = client.get('/appointments/', query_string={'cursor': '', 'limit': limit}, headers=auth_headers(patient))
+
+    assert response.status_code == 400
+    assert response.json['error_code'] == 'INVALID_LIMIT'
+
+
+def test_cursor_listing_accepts_limit_bounds(client, make_user, auth_headers):
+    patient = make_user('user')
+
+    for limit in (1, 100):
+        response = client.get('/appointments/', query_string={'cursor': '', 'limit': limit}, headers=auth_headers(patient))
+        assert response.status_code == 200
+        assert response.json['pagination']['limit'] == limit
+
+
+def test_status_batch_reports_successes_and_conflicts_per_item(client, make_user, auth_headers):
+    patient, counselor, admin = make_user('user'), make_user('counselor'), make_user('admin')
+    taken, contested, free = _next_hour(days=8), _next_hour(days=9), _next_hour(days=10)
+
+    def book(start):
+        return AppointmentService.create_appointment(patient.id, counselor.id, start.isoformat(), 'Hàng loạt')['appointment_id']
+
+    # Đặt trước khi khung giờ được xác nhận (đặt sau sẽ bị từ chối ngay)
+    clashes_existing = book(taken)
+    already_confirmed = _book_and_confirm(patient, counselor, admin, taken)['appointment_id']
+    first_of_pair, second_of_pair, independent = book(contested), book(contested), book(free)
+
+    response = client.post('/appointments/status/batch', headers=auth_headers(admin), json={'items': [
+        {'appointment_id': clashes_existing, 'status': 'confirmed'},
+        {'appointment_id': first_of_pair, 'status': 'confirmed'},
+        {'appointment_id': second_of_pair, 'status': 'confirmed'},
+        {'appointment_id': independent, 'status': 'canceled'},
+        {'appointment_id': 10 ** 9, 'status': 'confirmed'},
+    ]})
+
+    assert response.status_code == 200
+    results = response.json['results']
+    assert [result['success'] for result in results] == [False, True, False, True, False]
+    assert [result.get('error_code') for result in results] == [
+        'APPOINTMENT_TIME_CONFLICT', None, 'APPOINTMENT_TIME_CONFLICT', None, 'APPOINTMENT_NOT_FOUND'
+    ]
+    assert response.json['summary'] == {'succeeded': 2, 'failed': 3}
+
+    statuses = dict(db.session.query(Appointment.id, Appointment.status).filter(Appointment.id.in_([
+        already_confirmed, clashes_existing, first_of_pair, second_of_pair, independent
+    ])))
+    assert statuses == {
+        already_confirmed: 'confirmed',
+        clashes_existing: 'pending',
+        first_of_pair: 'confirmed',
+        second_of_pair: 'pending',
+        independent: 'canceled',
+    }
+
+
+def test_counselor_directory_etag_round_trip_and_invalidation(client, make_user):
+    counselor = make_user('counselor')
+
+    first = client.get('/appointments/counselors')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+
+    not_modified = client.get('/appointments/counselors', headers={'If-None-Match': etag})
+    assert not_modified.status_code == 304
+    assert not_modified.data == b''
+
+    UserService.update_counselor_profile(counselor.id, 'Chuyên môn vừa đổi', 'Thạc sĩ', None)
+
+    changed = client.get('/appointments/counselors', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert 'Chuyên môn vừa đổi' in changed.get_data(as_text=True)
+
+
+def _export(client, headers, fmt):
+    response = client.get('/appointments/export', headers=headers, query_string={
+        'format': fmt, 'from': '2040-01-01T00:00:00Z', 'to': '2040-01-02T00:00:00Z'
+    })
+    assert response.status_code == 200
+    return response
+
+
+def test_export_streams_every_row_in_each_format(client, make_user, auth_headers):
+    patient, counselor, admin = make_user('user'), make_user('counselor'), make_user('admin')
+    profile_id = CounselorProfile.query.filter_by(user_id=counselor.id).one().id
+    start = datetime(2040, 1, 1, 8)
+    reasons = ['Lo âu, mất ngủ', 'Dòng một\ndòng hai', 'Có "ngoặc kép"; và chấm phẩy']
+    db.session.add_all([
+        Appointment(
+            user_id=patient.id, counselor_id=profile_id, status='pending', reason=reason,
+            start_time=start + timedelta(hours=i), end_time=start + timedelta(hours=i + 1)
+        )
+        for i, reason in enumerate(reasons)
+    ])
+    db.session.commit()
+    headers = auth_headers(admin)
+
+    ndjson = _export(client, headers, 'ndjson')
+    assert ndjson.mimetype == 'application/x-ndjson'
+    records = [json.loads(line) for line in ndjson.get_data(as_text=True).splitlines()]
+    assert [record['reason'] for record in records] == reasons
+    assert all(record['start_time'].startswith('2040-01-01T') for record in records)
+
+    exported_csv = _export(client, headers, 'csv')
+    assert exported_csv.mimetype == 'text/csv'
+    assert exported_csv.headers['Content-Disposition'] == 'attachment; filename="appointments.csv"'
+    rows = list(csv.DictReader(io.StringIO(exported_csv.get_data(as_text=True))))
+    assert [row['reason'] for row in rows] == reasons
+    assert [int(row['appointment_id']) for row in rows] == [record['appointment_id'] for record in records]
+
+    ics = _export(client, headers, 'ics')
+    assert ics.mimetype == 'text/calendar'
+    lines = ics.get_data(as_text=True).split('\r\n')
+    assert lines[0] == 'BEGIN:VCALENDAR' and lines[-2:] == ['END:VCALENDAR', '']
+    assert lines.count('BEGIN:VEVENT') == lines.count('END:VEVENT') == len(reasons)
+    assert 'DTSTART:20400101T080000Z' in lines
+    assert 'DESCRIPTION:Dòng một\\ndòng hai' in lines
+
+
+def test_export_rejects_unknown_format(client, make_user, auth_headers):
+    response = client.get('/appointments/export', query_string={'format': 'xlsx'}, headers=auth_headers(make_user('admin')))
+
+    assert response.status_code == 400
+    assert response.json['error_code'] == 'INVALID_EXPORT_FORMAT'
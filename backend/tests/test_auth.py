@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from flask_jwt_extended import create_access_token
+from werkzeug.security import generate_password_hash
+
+from app.extensions import db, password_hasher
+from app.services.appointment_service import AppointmentService
+from app.services.course_service import CourseService
+from app.services.module_events import module_event_buffer
+from app.services.role_registry import role_registry
+from app.services.user_service import UserService
+from app.utils.passwords import HashingBusyError, parse_hash_method
+
+
+def test_login_succeeds_when_rehash_pool_is_busy(make_user, monkeypatch):
+    user = make_user('user')
+    old_hash = generate_password_hash('Test@123', method='pbkdf2:sha256:500')
+    user.password_hash = old_hash
+    db.session.commit()
+    assert user.password_needs_rehash()
+
+    def busy_hash(password):
+        raise HashingBusyError(password_hasher.retry_after)
+
+    monkeypatch.setattr(password_hasher, 'hash', busy_hash)
+    result = UserService.authenticate_user(user.email, 'Test@123')
+
+    assert result['token']
+    assert user.password_hash == old_hash # Giữ hash cũ, băm lại ở lần đăng nhập sau
+    monkeypatch.undo()
+
+    UserService.authenticate_user(user.email, 'Test@123')
+    assert not user.password_needs_rehash()
+
+
+def test_unknown_role_is_looked_up_once_per_registry_version(count_queries):
+    role_registry.id_of('admin') # Nạp sẵn registry
+
+    with count_queries() as first:
+        assert role_registry.id_of('không-tồn-tại') is None
+        assert role_registry.id_of(None) is None
+    with count_queries() as again:
+        assert role_registry.id_of('không-tồn-tại') is None
+        assert role_registry.name_of(None) is None
+
+    assert first.count == 1
+    assert again.count == 0
+
+    role_registry.invalidate()
+    with count_queries() as after_invalidate:
+        assert role_registry.id_of('không-tồn-tại') is None
+    assert after_invalidate.count == 1
+
+
+def test_roles_are_queried_once_across_requests(client, make_user, count_queries):
+    users = [make_user(role) for role in ('user', 'counselor', 'admin')]
+    role_registry.invalidate()
+
+    with count_queries() as queries:
+        for user in users:
+            response = client.post('/auth/login', json={'email': user.email, 'password': 'Test@123'})
+            assert response.status_code == 200
+            token = response.json['token']
+            # Token chỉ có tên vai trò (định dạng cũ): role_id lấy từ registry, không query
+            legacy = create_access_token(identity=str(user.id), additional_claims={'role': response.json['role']})
+            assert client.get('/appointments/', headers={'Authorization': f'Bearer {legacy}'}).status_code == 200
+            assert client.get('/auth/profile', headers={'Authorization': f'Bearer {token}'}).status_code == 200
+
+    assert sum('FROM roles' in statement for statement in queries.statements) == 1
+
+
+@pytest.mark.parametrize('method', ['pbkdf2', 'pbkdf2:sha256', 'pbkdf2:sha256:1000', 'scrypt', 'scrypt:16384:8:1'])
+def test_hash_created_with_configured_method_is_current(method, monkeypatch):
+    monkeypatch.setattr(password_hasher, 'method', method)
+    monkeypatch.setattr(password_hasher, '_parsed_method', parse_hash_method(method))
+
+    # werkzeug ghi dạng đầy đủ ('pbkdf2' -> 'pbkdf2:sha256:1000000')
+    password_hash = generate_password_hash('Test@123', method=method, salt_length=password_hasher.salt_length)
+
+    assert not password_hasher.needs_rehash(password_hash)
+
+
+@pytest.mark.parametrize('method, salt_length', [
+    ('pbkdf2:sha256:999', 16), # Khác số vòng lặp
+    ('pbkdf2:sha512:1000', 16), # Khác hàm băm
+    ('scrypt:16384:8:1', 16), # Khác thuật toán
+    ('pbkdf2:sha256:1000', 8), # Khác độ dài salt
+])
+def test_hash_with_outdated_parameters_needs_rehash(method, salt_length):
+    assert password_hasher.method == 'pbkdf2:sha256:1000'
+    password_hash = generate_password_hash('Test@123', method=method, salt_length=salt_length)
+
+    assert password_hasher.needs_rehash(password_hash)
+
+
+def _profile(client, headers, etag=None):
+    response = client.get('/auth/profile', headers={**headers, **({'If-None-Match': etag} if etag else {})})
+    assert response.status_code == 200
+    return response.json['profile'], response.headers['ETag']
+
+
+def test_profile_cache_follows_appointment_changes(client, make_user, auth_headers):
+    patient, counselor, admin = make_user('user'), make_user('counselor'), make_user('admin')
+    patient_headers, counselor_headers = auth_headers(patient), auth_headers(counselor)
+    profile, patient_etag = _profile(client, patient_headers)
+    _, counselor_etag = _profile(client, counselor_headers)
+    assert profile['upcoming_appointment'] is None
+    assert client.get('/auth/profile', headers={**patient_headers, 'If-None-Match': patient_etag}).status_code == 304
+
+    start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(days=20)
+    booked = AppointmentService.create_appointment(patient.id, counselor.id, start.isoformat(), 'Hồ sơ')
+
+    # ETag cũ không còn khớp: cả người đặt và chuyên viên đều thấy lịch hẹn mới
+    profile, patient_etag = _profile(client, patient_headers, patient_etag)
+    assert profile['upcoming_appointment']['appointment_id'] == booked['appointment_id']
+    profile, _ = _profile(client, counselor_headers, counselor_etag)
+    assert profile['upcoming_appointment']['appointment_id'] == booked['appointment_id']
+
+    AppointmentService.update_status(booked['appointment_id'], 'canceled', admin.id, 'admin')
+
+    profile, _ = _profile(client, patient_headers, patient_etag)
+    assert profile['upcoming_appointment'] is None
+
+
+def test_profile_cache_follows_course_progress(client, make_user, make_course, auth_headers, monkeypatch):
+    monkeypatch.setattr(module_event_buffer, 'record', lambda *args, **kwargs: None)
+    user = make_user('user')
+    headers = auth_headers(user)
+    course, modules = make_course(modules=1)
+    profile, etag = _profile(client, headers)
+    assert profile['courses'] == {'enrolled': 0, 'completed': 0}
+
+    CourseService.register_user_for_course(user.id, course.id)
+    profile, etag = _profile(client, headers, etag)
+    assert profile['courses'] == {'enrolled': 1, 'completed': 0}
+
+    CourseService.complete_module(user.id, course.id, modules[0].id)
+    profile, _ = _profile(client, headers, etag)
+    assert profile['courses'] == {'enrolled': 1, 'completed': 1}
@@ -0,0 +1,43 @@
+import pytest
+
+from app.extensions import db
+from app.services.course_analytics import CourseAnalyticsService
+from app.services.course_service import CourseService
+
+
+def test_refresh_builds_funnel_and_can_run_again(make_user, make_course):
+    course, modules = make_course(modules=3)
+    learners = [make_user('user') for _ in range(4)]
+    for learner in learners:
+        CourseService.register_user_for_course(learner.id, course.id)
+
+    # learners[0] ở bài 1, learners[1] ở bài 2, learners[2] ở bài 3, learners[3] đã hoàn thành
+    for steps, learner in enumerate(learners):
+        for module in modules[:steps]:
+            CourseService.complete_module(learner.id, course.id, module.id)
+
+    CourseAnalyticsService.refresh()
+    CourseAnalyticsService.refresh() # Lần tính lại thứ hai thay thế, không đụng khóa chính
+
+    funnel = CourseAnalyticsService.get_course_funnel(course.id)
+    assert (funnel['enrolled'], funnel['completed']) == (4, 1)
+    assert [(step['reached'], step['current']) for step in funnel['modules']] == [(4, 1), (3, 1), (2, 1)]
+
+
+def test_refresh_takes_advisory_lock_first_on_postgresql(monkeypatch):
+    statements = []
+
+    class Stop(Exception):
+        pass
+
+    def record_first(statement, *args, **kwargs):
+        statements.append(str(statement))
+        raise Stop
+
+    monkeypatch.setattr(db.engine.dialect, 'name', 'postgresql')
+    monkeypatch.setattr(db.session, 'execute', record_first)
+    with pytest.raises(Stop):
+        CourseAnalyticsService.refresh()
+
+    # Khóa được lấy trước mọi truy vấn đọc/xóa: lần tính lại đồng thời phải chờ lần trước commit
+    assert 'pg_advisory_xact_lock' in statements[0]
@@ -0,0 +1,30 @@
+import json
+
+from app.models.course import Course
+from app.services.course_import import import_courses
+
+
+def _line(**fields):
+    course = {
+        'title': 'Khóa nhập thử',
+        'description': 'Mô tả',
+        'target_audience': 'student',
+        'modules': [{'title': 'Module 1', 'content': 'Nội dung'}]
+    }
+    course.update(fields)
+    return json.dumps(course, ensure_ascii=False)
+
+
+def test_import_rejects_only_the_lines_with_non_string_titles(app):
+    lines = [
+        _line(title=['không', 'phải', 'chuỗi']),
+        _line(title={'vi': 'Tiêu đề'}),
+        _line(title='Khóa nhập hợp lệ'),
+        _line(title='Khóa có module sai', modules=[{'title': 42}]),
+    ]
+
+    report = import_courses(lines)
+
+    assert report['imported'] == 1
+    assert [error['line'] for error in report['errors']] == [1, 2, 4]
+    assert Course.query.filter_by(title='Khóa nhập hợp lệ').count() == 1
@@ -0,0 +1,141 @@
+import gzip
+import json
+
+import pytest
+
+from app.extensions import db
+from app.models.course_module import brotli
+from app.models.course_progress import UserCourseProgress
+from app.services.course_recommendations import CourseRecommendationService
+from app.services.course_service import CourseService
+from app.services.module_events import module_event_buffer
+
+
+def test_course_catalog_etag_round_trip_and_invalidation(client, make_course):
+    make_course(audience='phụ huynh')
+    query = {'target_audience': 'phụ huynh'}
+
+    first = client.get('/api/courses/', query_string=query)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+
+    not_modified = client.get('/api/courses/', query_string=query, headers={'If-None-Match': etag})
+    assert not_modified.status_code == 304
+    assert not_modified.data == b''
+
+    created = CourseService.create_course('Khóa học vừa thêm', 'Mô tả', 'phụ huynh', [{'title': 'Bài 1', 'content': 'Nội dung'}])
+
+    changed = client.get('/api/courses/', query_string=query, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert created['id'] in [course['id'] for course in changed.json]
+
+
+@pytest.fixture
+def recorded_events(monkeypatch):
+    """Thay bộ đệm nhật ký module bằng danh sách (không khởi động luồng ghi nền)."""
+    events = []
+    monkeypatch.setattr(module_event_buffer, 'record', lambda *args, **kwargs: events.append((args, kwargs)))
+    return events
+
+
+def test_completing_last_module_completes_course(client, make_user, make_course, auth_headers, recorded_events):
+    user = make_user('user')
+    course, modules = make_course(modules=2)
+    CourseService.register_user_for_course(user.id, course.id)
+
+    for module in modules:
+        response = client.post(f'/api/courses/complete-module/{course.id}', json={'module_id': module.id}, headers=auth_headers(user))
+        assert response.status_code == 200
+
+    progress = response.json['progress']
+    assert progress['is_completed'] is True
+    assert progress['last_module_id'] == modules[-1].id
+    assert progress['completion_date'] is not None
+    assert 'Hoàn thành Khóa học' in response.json['message']
+    assert [kwargs['completed_course'] for _, kwargs in recorded_events] == [False, True]
+
+    # Gửi lại module cuối sau khi đã hoàn thành: không ghi thêm sự kiện
+    again = client.post(f'/api/courses/complete-module/{course.id}', json={'module_id': modules[-1].id}, headers=auth_headers(user))
+    assert again.status_code == 400
+    assert len(recorded_events) == 2
+
+
+def test_complete_module_rejects_module_that_is_not_current(make_user, make_course, recorded_events):
+    user = make_user('user')
+    course, modules = make_course(modules=3)
+    CourseService.register_user_for_course(user.id, course.id)
+
+    with pytest.raises(ValueError, match='không phải là module hiện tại'):
+        CourseService.complete_module(user.id, course.id, modules[1].id)
+
+    progress = UserCourseProgress.query.filter_by(user_id=user.id, course_id=course.id).one()
+    assert progress.last_module_id == modules[0].id
+    assert not progress.is_completed
+    assert recorded_events == []
+
+
+def test_complete_module_requires_registration(make_user, make_course, recorded_events):
+    user = make_user('user')
+    course, modules = make_course(modules=1)
+
+    with pytest.raises(ValueError, match='chưa đăng ký'):
+        CourseService.complete_module(user.id, course.id, modules[0].id)
+
+
+@pytest.mark.parametrize('encoding, decompress', [
+    ('gzip', gzip.decompress),
+    pytest.param('br', lambda data: brotli.decompress(data), marks=pytest.mark.skipif(brotli is None, reason='brotli chưa cài')),
+    ('identity', lambda data: data),
+])
+def test_module_content_round_trips_through_precompressed_variants(client, make_course, encoding, decompress):
+    course, modules = make_course(modules=1)
+    module = modules[0]
+    url = f'/api/courses/{course.id}/modules/{module.id}'
+    plain = client.get(url, headers={'Accept-Encoding': 'identity'})
+
+    response = client.get(url, headers={'Accept-Encoding': encoding})
+
+    assert response.status_code == 200
+    assert response.headers.get('Content-Encoding', 'identity') == encoding
+    assert 'Accept-Encoding' in response.headers['Vary']
+    body = decompress(response.get_data())
+    assert body == plain.get_data()
+    assert json.loads(body) == module.to_dict()
+
+    not_modified = client.get(url, headers={'Accept-Encoding': encoding, 'If-None-Match': response.headers['ETag']})
+    assert not_modified.status_code == 304
+    if encoding != 'identity':
+        assert response.headers['ETag'] != plain.headers['ETag']
+
+
+def test_recommendations_follow_co_enrollment(make_user, make_course):
+    (finished, _), (popular, _), (niche, _) = make_course(modules=1), make_course(modules=1), make_course(modules=1)
+    learners = [make_user('user') for _ in range(2)]
+    for learner in learners:
+        CourseService.register_user_for_course(learner.id, finished.id)
+        CourseService.register_user_for_course(learner.id, popular.id)
+    CourseService.register_user_for_course(learners[0].id, niche.id)
+    UserCourseProgress.query.filter_by(course_id=finished.id).update({'is_completed': True})
+    db.session.commit()
+
+    assert CourseRecommendationService.refresh() > 0
+
+    recommended = CourseRecommendationService.get_recommendations(finished.id)
+    assert [course['id'] for course in recommended] == [popular.id, niche.id]
+    assert recommended[0]['learners'] == 2
+
+    # Khóa người dùng đã đăng ký bị loại khỏi gợi ý
+    newcomer = make_user('user')
+    CourseService.register_user_for_course(newcomer.id, popular.id)
+    assert [course['id'] for course in CourseRecommendationService.get_recommendations(finished.id, newcomer.id)] == [niche.id]
+
+
+def test_search_total_count_is_exposed_to_cross_origin_clients(client, make_course):
+    make_course()
+
+    response = client.get('/api/courses/', query_string={'search': 'kiểm thử'}, headers={'Origin': 'https://app.example'})
+
+    assert response.status_code == 200
+    assert int(response.headers['X-Total-Count']) >= 1
+    assert 'X-Total-Count' in response.headers['Access-Control-Expose-Headers']
@@ -0,0 +1,38 @@
+import json
+
+from app.utils.event_bus import RedisSubscription
+
+
+class _PubSub:
+    """Thay cho redis.client.PubSub: chỉ ghi lại handler để test tự gửi tin."""
+
+    def __init__(self):
+        self.handlers = {}
+        self.stopped = False
+
+    def subscribe(self, **handlers):
+        self.handlers.update(handlers)
+
+    def run_in_thread(self, sleep_time, daemon, exception_handler):
+        return self
+
+    def stop(self):
+        self.stopped = True
+
+    def deliver(self, channel, message):
+        self.handlers[channel]({'type': 'message', 'channel': channel, 'data': json.dumps(message)})
+
+
+def test_redis_subscription_is_bounded_and_flags_overflow():
+    pubsub = _PubSub()
+    subscription = RedisSubscription(pubsub, 'events:appointments', maxsize=3)
+
+    for i in range(5):
+        pubsub.deliver('events:appointments', {'n': i})
+
+    assert subscription.overflowed
+    assert [subscription.get(timeout=0)['n'] for _ in range(3)] == [2, 3, 4]
+    assert subscription.get(timeout=0) is None
+
+    subscription.close()
+    assert pubsub.stopped
@@ -0,0 +1,39 @@
+import os
+
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from flask import current_app
+from flask_migrate import downgrade, upgrade
+
+from app import create_app
+from app.extensions import db
+from config import TestingConfig
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+
+def migrated_app(tmp_path):
+    # CSDL riêng (file SQLite) dựng hoàn toàn bằng migration, không qua db.create_all()
+    config = type('MigrationConfig', (TestingConfig,), {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'migrated.db'}"})
+    return create_app(config)
+
+
+def schema_diff():
+    with db.engine.connect() as connection:
+        context = MigrationContext.configure(connection, opts=current_app.extensions['migrate'].configure_args)
+        return compare_metadata(context, db.metadata)
+
+
+def test_migrations_match_models(tmp_path):
+    with migrated_app(tmp_path).app_context():
+        upgrade(directory=MIGRATIONS_DIR)
+        # Mọi bảng/cột/chỉ mục khai báo trên model phải có revision tương ứng
+        assert schema_diff() == []
+
+
+def test_migrations_downgrade_and_upgrade_again(tmp_path):
+    with migrated_app(tmp_path).app_context():
+        upgrade(directory=MIGRATIONS_DIR)
+        downgrade(directory=MIGRATIONS_DIR, revision='base')
+        upgrade(directory=MIGRATIONS_DIR)
+        assert schema_diff() == []
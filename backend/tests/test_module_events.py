@@ -0,0 +1,93 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.extensions import db
+from app.models.module_event import ModuleCompletionEvent
+from app.services.module_events import ModuleEventBuffer
+
+_user_ids = iter(range(900000, 1000000))
+
+
+@pytest.fixture
+def buffer(app, monkeypatch):
+    """Bộ đệm riêng cho từng test, không chạy thread nền (test tự gọi flush)."""
+    buffer = ModuleEventBuffer()
+    buffer._app = app
+    buffer.batch_size = 2
+    monkeypatch.setattr(buffer, '_ensure_worker', lambda: None)
+    return buffer
+
+
+def _record(buffer, user_id, count, module_position=1):
+    for module_id in range(1, count + 1):
+        buffer.record(user_id, 1, module_id, module_position)
+
+
+def _stored(user_id):
+    return [
+        event.module_id
+        for event in ModuleCompletionEvent.query.filter_by(user_id=user_id).order_by(ModuleCompletionEvent.id)
+    ]
+
+
+def test_flush_writes_all_batches(buffer):
+    user_id = next(_user_ids)
+    _record(buffer, user_id, 5)
+
+    assert buffer.flush() == 5
+    assert buffer.pending == 0
+    assert _stored(user_id) == [1, 2, 3, 4, 5]
+
+
+def test_invalid_event_is_dropped_without_blocking_the_rest(buffer):
+    user_id = next(_user_ids)
+    buffer.record(user_id, 1, 1, 1)
+    buffer.record(user_id, 1, 2, None) # module_position NOT NULL: không bao giờ ghi được
+    buffer.record(user_id, 1, 3, 3)
+
+    assert buffer.flush() == 2
+    assert buffer.dropped == 1
+    assert buffer.pending == 0
+
+    buffer.record(user_id, 1, 4, 4)
+    assert buffer.flush() == 1
+    assert _stored(user_id) == [1, 3, 4]
+
+
+def test_events_are_requeued_while_database_is_unavailable(buffer, monkeypatch):
+    user_id = next(_user_ids)
+    _record(buffer, user_id, 3)
+
+    def unavailable(*args, **kwargs):
+        raise OperationalError('INSERT', {}, Exception('mất kết nối'))
+
+    with monkeypatch.context() as patched:
+        patched.setattr(db.session, 'execute', unavailable)
+        assert buffer.flush() == 0
+    assert buffer.pending == 3
+    assert buffer.dropped == 0
+
+    assert buffer.flush() == 3
+    assert _stored(user_id) == [1, 2, 3]
+
+
+def test_pending_events_are_capped(buffer, monkeypatch):
+    user_id = next(_user_ids)
+    buffer.max_pending = 3
+    _record(buffer, user_id, 5)
+
+    assert buffer.pending == 3
+    assert buffer.dropped == 2
+
+    # Đưa lại vào bộ đệm khi DB lỗi cũng không vượt giới hạn
+    def unavailable(*args, **kwargs):
+        raise OperationalError('INSERT', {}, Exception('mất kết nối'))
+
+    with monkeypatch.context() as patched:
+        patched.setattr(db.session, 'execute', unavailable)
+        buffer.flush()
+        buffer.record(user_id, 1, 6, 1)
+        assert buffer.pending == 3
+
+    buffer.flush()
+    assert _stored(user_id) == [4, 5, 6]
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.models.outbox import AppointmentOutbox
+from app.services import appointment_service
+from app.services.appointment_service import AppointmentService
+from app.services.notification_service import NotificationService
+from app.tasks.notifications import dispatch_appointment_outbox
+
+
+def _slot(days):
+    return (datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(days=days)).isoformat()
+
+
+@pytest.fixture
+def delivered(monkeypatch):
+    notifications = []
+    monkeypatch.setattr(NotificationService, 'deliver', staticmethod(notifications.append))
+    return notifications
+
+
+def _outbox(appointment_id):
+    return AppointmentOutbox.query.filter_by(appointment_id=appointment_id).order_by(AppointmentOutbox.id).all()
+
+
+def test_outbox_is_dispatched_after_each_commit(make_user, delivered):
+    patient, counselor, admin = make_user('user'), make_user('counselor'), make_user('admin')
+
+    # TestingConfig: Celery chạy eager nên task gửi outbox chạy ngay sau mỗi commit
+    appointment_id = AppointmentService.create_appointment(patient.id, counselor.id, _slot(5), 'Tư vấn')['appointment_id']
+    AppointmentService.update_status(appointment_id, 'confirmed', admin.id, 'admin')
+
+    events = _outbox(appointment_id)
+    assert [event.event_type for event in events] == ['created', 'status_changed']
+    assert all(event.processed_at is not None for event in events)
+
+    mine = [n for n in delivered if n['appointment_id'] == appointment_id]
+    assert [(n['created'], n['to_status']) for n in mine] == [(True, 'pending'), (False, 'confirmed')]
+
+
+def test_pending_outbox_events_are_coalesced_per_appointment(make_user, delivered, monkeypatch):
+    patient, counselor, admin = make_user('user'), make_user('counselor'), make_user('admin')
+
+    # Broker không nhận task (vd. RabbitMQ mất kết nối): sự kiện nằm lại trong outbox chờ beat quét
+    monkeypatch.setattr(appointment_service, 'schedule_outbox_dispatch', lambda: None)
+    first = AppointmentService.create_appointment(patient.id, counselor.id, _slot(6), 'Lần 1')['appointment_id']
+    second = AppointmentService.create_appointment(patient.id, counselor.id, _slot(7), 'Lần 2')['appointment_id']
+    AppointmentService.update_status(first, 'confirmed', admin.id, 'admin')
+    assert all(event.processed_at is None for event in _outbox(first) + _outbox(second))
+
+    processed = dispatch_appointment_outbox.delay().get()
+
+    assert processed >= 3
+    assert all(event.processed_at is not None for event in _outbox(first) + _outbox(second))
+    by_appointment = {n['appointment_id']: n for n in delivered if n['appointment_id'] in (first, second)}
+    assert len([n for n in delivered if n['appointment_id'] in (first, second)]) == 2
+    assert by_appointment[first]['event_count'] == 2
+    assert (by_appointment[first]['created'], by_appointment[first]['to_status']) == (True, 'confirmed')
+    assert (by_appointment[second]['event_count'], by_appointment[second]['to_status']) == (1, 'pending')
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.extensions import db
+from app.models.appointment import Appointment
+from app.models.counselor import CounselorProfile
+from app.models.course import Course
+from app.services.appointment_service import AppointmentService
+from app.services.course_service import CourseService
+
+
+def _book(user, counselor, count, start):
+    profile_id = CounselorProfile.query.filter_by(user_id=counselor.id).one().id
+    db.session.add_all([
+        Appointment(
+            user_id=user.id,
+            counselor_id=profile_id,
+            start_time=start + timedelta(hours=i),
+            end_time=start + timedelta(hours=i + 1),
+            status='pending',
+            reason='Kiểm thử'
+        )
+        for i in range(count)
+    ])
+    db.session.commit()
+
+
+@pytest.mark.parametrize('role', ['admin', 'counselor', 'user'])
+def test_appointment_listing_query_count_does_not_grow_with_rows(make_user, count_queries, role):
+    patient = make_user('user')
+    counselor = make_user('counselor')
+    viewer_id = {'admin': make_user('admin'), 'counselor': counselor, 'user': patient}[role].id
+    start = datetime(2030, 1, 1, 8)
+
+    _book(patient, counselor, 2, start)
+    with count_queries() as few:
+        result = AppointmentService.get_appointments_by_role(viewer_id, role, page=1, limit=50)
+    assert len(result['data']) >= 2
+
+    _book(patient, counselor, 10, start + timedelta(days=1))
+    with count_queries() as many:
+        result = AppointmentService.get_appointments_by_role(viewer_id, role, page=1, limit=50)
+    assert len(result['data']) >= 12
+
+    # [hồ sơ chuyên viên của người xem] + COUNT + một query projection, không phụ thuộc số dòng
+    assert many.count == few.count <= 3
+
+
+def test_detailed_course_progress_is_one_query(make_user, count_queries):
+    user_id = make_user('user').id
+    course_ids = [course_id for (course_id,) in db.session.query(Course.id).order_by(Course.id)]
+    assert len(course_ids) > 1
+
+    CourseService.register_user_for_course(user_id, course_ids[0])
+    with count_queries() as few:
+        progress = CourseService.get_user_course_progress(user_id, detailed=True)
+    assert len(progress) == 1
+
+    for course_id in course_ids[1:]:
+        CourseService.register_user_for_course(user_id, course_id)
+    with count_queries() as many:
+        progress = CourseService.get_user_course_progress(user_id, detailed=True)
+    assert len(progress) == len(course_ids)
+    assert all(item['total_modules'] and item['last_module'] for item in progress)
+
+    assert many.count == few.count == 1
@@ -0,0 +1,40 @@
+import csv
+import io
+
+from app.models.user import User
+from app.services.role_registry import role_registry
+from app.services.user_import import import_users
+
+
+def test_import_rejects_duplicate_and_invalid_rows(make_user):
+    existing = make_user('user')
+    source = io.StringIO('\n'.join([
+        'email,password,name,role',
+        f' {existing.email.upper()} ,Test@123,Đã có,user',
+        'Nhap.Moi@Test.Local,Test@123,Mới,user',
+        'nhap.moi@test.local ,Test@123,Trùng khác hoa thường,user',
+        'khong-phai-email,Test@123,Sai email,user',
+        'thieu.matkhau@test.local,,Thiếu mật khẩu,user',
+        'vai.tro.la@test.local,Test@123,Vai trò lạ,hacker',
+        'chuyen.vien.nhap@test.local,Test@123,Chuyên viên,counselor',
+    ]) + '\n')
+    rejects = io.StringIO()
+
+    report = import_users(source, rejects, batch_size=2, workers=1)
+
+    assert report['imported'] == 2
+    assert report['rejected'] == 5
+    rejected = list(csv.DictReader(io.StringIO(rejects.getvalue())))
+    assert sorted((int(row['line']), row['reason']) for row in rejected) == [
+        (2, 'Email đã tồn tại.'),
+        (4, 'Email bị trùng trong file.'),
+        (5, 'Email không hợp lệ.'),
+        (6, 'Thiếu mật khẩu.'),
+        (7, "Vai trò 'hacker' không tồn tại trong hệ thống."),
+    ]
+
+    imported = User.query.filter_by(email='nhap.moi@test.local').one()
+    assert imported.name == 'Mới'
+    assert imported.check_password('Test@123')
+    assert User.query.filter_by(email='chuyen.vien.nhap@test.local').one().role_id == role_registry.id_of('counselor')
+    assert User.query.filter(User.email.ilike(existing.email)).count() == 1
@@ -64,6 +64,9 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
           email: profileData.email,
           name: profileData.name || profileData.email.split('@')[0],
           role: profileData.role,
+          counselor_profile: profileData.counselor_profile,
+          courses: profileData.courses,
+          upcoming_appointment: profileData.upcoming_appointment,
       });
       setToken(storedToken);
 
@@ -1,5 +1,5 @@
 import { useEffect, useState } from "react";
-import { useParams } from "react-router-dom";
+import { Link, useParams } from "react-router-dom";
 import * as courseService from "../../services/courseService";
 import type { Course, CourseModule } from "../../types/course";
 import { useAuth } from "../../context/AuthContext";
@@ -14,6 +14,7 @@ const CourseDetailPage = () => {
     const [modules, setModules] = useState<CourseModule[]>([]);
     const [currentModule, setCurrentModule] = useState<CourseModule | null>(null);
     const [isCompleted, setIsCompleted] = useState(false);
+    const [recommendations, setRecommendations] = useState<Course[]>([]);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState<string | null>(null);
     const { user } = useAuth();
@@ -25,9 +26,16 @@ const CourseDetailPage = () => {
                 const res = await courseService.getCourseDetail(Number(courseId));
                 setCourse(res.course);
                 setModules(res.modules);
-                setCurrentModule(res.currentModule || null);
                 setIsCompleted(res.isCompleted || false);
 
+                // Chi tiết khóa học chỉ có dàn ý; tải nội dung module hiện tại riêng
+                if (res.currentModule) {
+                    const moduleContent = await courseService.getModuleContent(Number(courseId), res.currentModule.id);
+                    setCurrentModule(moduleContent);
+                } else {
+                    setCurrentModule(null);
+                }
+
             } catch (err) {
                 setError("Không thể tải thông tin khóa học");
             } finally {
@@ -35,8 +43,18 @@ const CourseDetailPage = () => {
             }
         };
 
+        // Gợi ý không bắt buộc: lỗi thì chỉ ẩn phần gợi ý
+        const fetchRecommendations = async () => {
+            try {
+                setRecommendations(await courseService.getCourseRecommendations(Number(courseId)));
+            } catch (err) {
+                setRecommendations([]);
+            }
+        };
+
         if (courseId) {
             fetchCourseDetail();
+            fetchRecommendations();
         }
     }, [courseId]);
 
@@ -112,6 +130,19 @@ const CourseDetailPage = () => {
                     </li>
                 ))}
             </ul>
+
+            {recommendations.length > 0 && (
+                <>
+                    <h3 className={styles.structureHeader}>Học viên hoàn thành khóa này cũng học</h3>
+                    <ul className={styles.moduleList}>
+                        {recommendations.map((recommended) => (
+                            <li key={recommended.id}>
+                                <Link to={`/courses/${recommended.id}`}>{recommended.title}</Link>
+                            </li>
+                        ))}
+                    </ul>
+                </>
+            )}
         </div>
     );
 };
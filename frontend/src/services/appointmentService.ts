@@ -1,5 +1,5 @@
 import api from './api';
-import type { CounselorProfile, AppointmentStatus } from '../types/appointment';
+import type { CounselorProfile, AppointmentStatus, FreeSlot } from '../types/appointment';
 
 const APPOINTMENT_ENDPOINTS = {
     // Lấy danh sách chuyên viên
@@ -8,6 +8,8 @@ const APPOINTMENT_ENDPOINTS = {
     GET_MY_APPOINTMENTS: '/appointments/', 
     // Endpoint cập nhật trạng thái
     UPDATE_APPOINTMENT_STATUS: (appointmentId: number) => `/appointments/${appointmentId}/status`,
+    // Khung giờ trống của chuyên viên
+    GET_FREE_SLOTS: (counselorUserId: number) => `/appointments/counselors/${counselorUserId}/free-slots`,
 };
 
 // Lấy danh sách chuyên viên
@@ -21,6 +23,18 @@ export const getAllCounselors = async (): Promise<CounselorProfile[]> => {
     }
 };
 
+// Lấy khung giờ trống của chuyên viên
+export const getCounselorFreeSlots = async (
+  counselorUserId: number,
+  from?: string,
+  to?: string
+): Promise<FreeSlot[]> => {
+  const response = await api.get(APPOINTMENT_ENDPOINTS.GET_FREE_SLOTS(counselorUserId), {
+    params: { from, to },
+  });
+  return response.data.slots;
+};
+
 // Đặt lịch hẹn mới
 export const createAppointment = async (data: {
   counselor_user_id: number;
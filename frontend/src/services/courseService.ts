@@ -1,10 +1,12 @@
 import api from './api';
-import type { Course, CourseProgress } from '../types/course';
+import type { Course, CourseModule, CourseProgress } from '../types/course';
 
 // Các endpoints:
 const COURSE_ENDPOINTS = {
     GET_ALL_COURSES: 'api/courses/',
     GET_COURSE_DETAIL: (courseId: number) => `api/courses/${courseId}`,
+    GET_MODULE_CONTENT: (courseId: number, moduleId: number) => `api/courses/${courseId}/modules/${moduleId}`,
+    GET_RECOMMENDATIONS: (courseId: number) => `api/courses/${courseId}/recommendations`,
     CREATE_COURSE: 'api/courses/',
     REGISTER_COURSE: '/api/courses/register',
     GET_MY_PROGRESS: '/api/courses/my-progress',
@@ -37,6 +39,18 @@ export const getCourseDetail = async (courseId: number) => {
     return res.data;
 };
 
+// Hàm lấy nội dung một module (chi tiết khóa học chỉ trả về dàn ý)
+export const getModuleContent = async (courseId: number, moduleId: number): Promise<CourseModule> => {
+    const res = await api.get(COURSE_ENDPOINTS.GET_MODULE_CONTENT(courseId, moduleId));
+    return res.data;
+};
+
+// Hàm lấy gợi ý "học viên hoàn thành khóa này cũng học..." (đã bỏ các khóa đã đăng ký)
+export const getCourseRecommendations = async (courseId: number): Promise<Course[]> => {
+    const res = await api.get(COURSE_ENDPOINTS.GET_RECOMMENDATIONS(courseId));
+    return res.data;
+};
+
 // Hàm hoàn thành module
 export const completeModule = async (courseId: number, moduleId: number): Promise<any> => {
     try {
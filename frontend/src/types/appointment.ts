@@ -28,3 +28,9 @@ export interface AppointmentPermissions {
   can_update_status: boolean;
   allowed_next_status: AppointmentStatus[];
 }
+
+// Khung giờ trống của chuyên viên
+export interface FreeSlot {
+  start_time: string;
+  end_time: string;
+}
@@ -10,6 +10,22 @@ export interface UserProfile {
   email: string;
   name: string;
   role: 'admin' | 'counselor' | 'user';
+  // Các trường tổng hợp từ /auth/profile
+  counselor_profile?: {
+    id: number;
+    user_id: number;
+    specialization: string;
+    qualifications: string;
+  } | null;
+  courses?: { enrolled: number; completed: number };
+  upcoming_appointment?: {
+    appointment_id: number;
+    start_time: string;
+    end_time: string;
+    status: string;
+    user_name: string | null;
+    counselor_name: string | null;
+  } | null;
 }
 
 export interface AuthContextType {
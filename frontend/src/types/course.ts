@@ -1,7 +1,9 @@
 export interface CourseModule {
     id: number;
     title: string;
-    content: string;
+    module_order?: number;
+    // Không có trong dàn ý của chi tiết khóa học; lấy qua getModuleContent
+    content?: string;
     // progress_status: 'completed' | 'pending'; 
 }
 
@@ -23,4 +25,9 @@ export interface CourseProgress {
     course_title?: string;
     last_module?: CourseModule | null;
     progress_id?: number;   
+    // Chỉ có khi gọi /my-progress?detailed=true
+    total_modules?: number;
+    current_module_position?: number | null;
+    completed_modules?: number;
+    progress_percent?: number;
 }
\ No newline at end of file